@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Union, Dict, List, Tuple, Callable, Optional, Any, TYPE_CHECKING
+from typing import Union, Dict, List, Tuple, Callable, Optional, Any, Sequence, TYPE_CHECKING
 from typing_extensions import Literal, TypedDict, TypeAlias
 from bottle import Bottle
 
@@ -21,7 +21,7 @@ OptionsDictT = TypedDict(
     {
         'mode': Optional[Union[str, Literal[False]]],
         'host': str,
-        'port': int,
+        'port': Optional[int],
         'block': bool,
         'jinja_templates': Optional[str],
         'cmdline_args': List[str],
@@ -37,6 +37,35 @@ OptionsDictT = TypedDict(
         'shutdown_delay': float,
         'suppress_error': bool,
         'jinja_env': JinjaEnvironmentT,
+        'max_concurrent_calls': Optional[int],
+        'monitor_loop_lag': bool,
+        'shed_load_lag': Optional[float],
+        'metrics': bool,
+        'metrics_route': bool,
+        'record_frames': Optional[str],
+        'resume_window': float,
+        'resume_buffer': int,
+        'heartbeat': Optional[float],
+        'heartbeat_timeout': float,
+        'mock_queue_size': int,
+        'mock_queue_ttl': Optional[float],
+        'mock_delivery': Union[str, Sequence[str]],
+        'path_prefix': str,
+        'serve': bool,
+        'workers': int,
+        'unix_socket': Optional[str],
+        'uvloop': bool,
+        'ws_max_msg_size': int,
+        'ws_compress': bool,
+        'ws_compress_threshold': int,
+        'ws_compress_level': int,
+        'ws_compress_shared_context': bool,
+        'ws_receive_timeout': Optional[float],
+        'keepalive_timeout': float,
+        'backlog': int,
+        'chunk_size': Optional[int],
+        'lane_weights': Optional[Dict[str, int]],
+        'bulk_window': Optional[int],
     },
     total=False
 )
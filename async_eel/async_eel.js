@@ -11,6 +11,11 @@ eel = {
 		console.log("EEL WebSocket connection error!", evt.code, evt.reason || "");
 	},
 
+	// Default onProgress callback (can be replaced anytime), for messages sent in chunks:
+	// {direction: 'in' or 'out', call: id of the call, or null, part: frames done, parts: frames in all}
+	onProgress: function defaultOnProgress(progress) {
+	},
+
     set_host: function (hostname) {
         eel._host = hostname
     },
@@ -29,9 +34,43 @@ eel = {
         return eel._guid;
     },
 
+    // Tags let Python find this page with `AsyncEel.connections(tag=...)`
+    set_tags: function(...tags) {
+        eel._tags = tags;
+        if(eel._websocket && eel._websocket.readyState === WebSocket.OPEN) {
+            eel._websocket.send(eel._toJSON({'tags': tags}));
+        }
+    },
+
+    // Reactive view of a Python `AsyncEel.shared_state()` object
+    state: function(name) {
+        if(!(name in eel._states)) {
+            eel._states[name] = {
+                value: null,
+                version: -1,
+                _syncing: false,
+                _listeners: [],
+                subscribe: function(listener) {
+                    let store = this;
+                    store._listeners.push(listener);
+                    if(store.version >= 0) {
+                        listener(store.value, null);
+                    }
+                    return function() {
+                        store._listeners = store._listeners.filter(l => l !== listener);
+                    };
+                }
+            };
+        }
+        return eel._states[name];
+    },
+
     // These get dynamically added by library when file is served
     /** _py_functions **/
     /** _start_geometry **/
+    /** _path_prefix **/
+    /** _chunk_size **/
+    /** _chunk_streams **/
 
     _guid: ([1e7]+-1e3+-4e3+-8e3+-1e11).replace(/[018]/g, c =>
             (c ^ crypto.getRandomValues(new Uint8Array(1))[0] & 15 >> c / 4).toString(16)
@@ -41,6 +80,32 @@ eel = {
 
     _mock_queue: [],
 
+    _tags: [],
+
+    // Chunked messages: being received, by id, and being sent
+    _chunks: {},
+    _outgoing: [],
+    _chunk_number: 0,
+    _pump_timer: null,
+
+    // Session resume: messages received from Python, and how many of them were acknowledged
+    _received: 0,
+    _acked: 0,
+    _received_chars: 0,     // Since the last acknowledgement
+    _ack_timer: null,
+    _connected_once: false,
+    _flushed: new Set(),
+    _reconnect_attempt: 0,
+    _reconnect_max_attempts: 20,
+    _reconnect_base_delay: 250,
+    _reconnect_max_delay: 10000,
+
+    _states: {},
+
+    // Releases Python objects once their JS handle is garbage collected
+    _handle_finalizer: (typeof FinalizationRegistry !== 'undefined') ?
+        new FinalizationRegistry(id => eel._release_handle(id)) : null,
+
     _mock_py_functions: function() {
         for(let i = 0; i < eel._py_functions.length; i++) {
             let name = eel._py_functions[i];
@@ -56,11 +121,151 @@ eel = {
         let func_name = name;
         eel[name] = function() {
             let call_object = eel._call_object(func_name, arguments);
-            eel._websocket.send(eel._toJSON(call_object));
+            eel._send_call(call_object);
             return eel._call_return(call_object);
         }
     },
 
+    _send_call: function(call_object) {
+        // Deferred to a microtask, so that e.g. withTimeout() can still amend the call
+        Promise.resolve().then(() => eel._send(call_object));
+    },
+
+    // Sends now, or once reconnected if the websocket is down
+    _send: function(message) {
+        if(eel._websocket && eel._websocket.readyState === WebSocket.OPEN) {
+            eel._send_text(eel._toJSON(message), message);
+        } else {
+            eel._mock_queue.push(message);
+        }
+    },
+
+    // Messages longer than the chunk size go out in frames, between which other messages are sent
+    _send_text: function(text, message) {
+        if(!eel._chunk_size || text.length <= eel._chunk_size) {
+            eel._websocket.send(text);
+            return;
+        }
+        let ends = [];
+        for(let start = 0; start < text.length; start = ends[ends.length - 1]) {
+            let end = Math.min(start + eel._chunk_size, text.length);
+            let code = text.charCodeAt(end - 1);
+            if(end < text.length && code >= 0xD800 && code <= 0xDBFF) {
+                end -= 1;       // Keep surrogate pairs in one frame
+            }
+            ends.push(end);
+        }
+        eel._chunk_number += 1;
+        eel._outgoing.push({id: eel._chunk_number, text: text, message: message, ends: ends, part: 0,
+                            ref: message.hasOwnProperty('call') ? message.call : message['return']});
+        if(eel._pump_timer === null) {
+            eel._pump();
+        }
+    },
+
+    // Sends the frames of chunked messages in turn, while the websocket's buffer is nearly empty.
+    // The server reassembles at most _chunk_streams messages at once, so no more are started.
+    _pump: function() {
+        eel._pump_timer = null;
+        while(eel._outgoing.length > 0 && eel._websocket.readyState === WebSocket.OPEN) {
+            if(eel._websocket.bufferedAmount > eel._chunk_size) {
+                eel._pump_timer = setTimeout(eel._pump, 5);
+                return;
+            }
+            let started = eel._outgoing.filter(s => s.part > 0).length;
+            let index = started < eel._chunk_streams ? 0 : eel._outgoing.findIndex(s => s.part > 0);
+            let stream = eel._outgoing.splice(index, 1)[0];
+            let start = stream.part === 0 ? 0 : stream.ends[stream.part - 1];
+            eel._websocket.send('chunk:' + stream.id + ':' + stream.part + ':' + stream.ends.length + ':' +
+                                (stream.ref === undefined ? '' : stream.ref) + ':' +
+                                stream.text.substring(start, stream.ends[stream.part]));
+            stream.part += 1;
+            eel.onProgress({direction: 'out', call: stream.ref === undefined ? null : stream.ref,
+                            part: stream.part, parts: stream.ends.length});
+            if(stream.part < stream.ends.length) {
+                eel._outgoing.push(stream);
+            }
+        }
+    },
+
+    // Returns the message once its last frame arrived, else null
+    _add_chunk: function(frame) {
+        let fields = [], start = 'chunk:'.length;
+        for(let i = 0; i < 4; i++) {
+            let end = frame.indexOf(':', start);
+            fields.push(frame.substring(start, end));
+            start = end + 1;
+        }
+        let id = fields[0], part = Number(fields[1]), parts = Number(fields[2]);
+        if(part === 0) {
+            eel._chunks[id] = [];
+        } else if(!(id in eel._chunks)) {
+            return null;        // Start lost with a session Python forgot
+        }
+        eel._chunks[id].push(frame.substring(start));
+        eel.onProgress({direction: 'in', call: fields[3] === '' ? null : Number(fields[3]),
+                        part: part + 1, parts: parts});
+        if(part + 1 < parts) {
+            return null;
+        }
+        let text = eel._chunks[id].join('');
+        delete eel._chunks[id];
+        return text;
+    },
+
+    _send_ack: function() {
+        clearTimeout(eel._ack_timer);
+        eel._ack_timer = null;
+        if(eel._acked !== eel._received && eel._websocket.readyState === WebSocket.OPEN) {
+            eel._acked = eel._received;
+            eel._received_chars = 0;
+            eel._websocket.send(eel._toJSON({'ack': eel._received}));
+        }
+    },
+
+    // Acknowledged every 32 messages or 256 KiB, as Python paces bulk replies on the acknowledgements
+    _count_received: function(size) {
+        eel._received += 1;
+        eel._received_chars += size;
+        if(eel._received - eel._acked >= 32 || eel._received_chars >= 256 * 1024) {
+            eel._send_ack();
+        } else if(eel._ack_timer === null) {
+            eel._ack_timer = setTimeout(eel._send_ack, 1000);
+        }
+    },
+
+    _on_session: function(session) {
+        if(!session.resumed) {
+            if(eel._connected_once) {
+                // Python forgot us: replies to calls sent before the drop will never come
+                for(let id in eel._call_return_callbacks) {
+                    let pending = eel._call_return_callbacks[id];
+                    if(!eel._flushed.has(Number(id))) {
+                        delete eel._call_return_callbacks[id];
+                        if(pending.reject) {
+                            pending.reject({'errorText': 'Connection lost', 'errorTraceback': ''});
+                        }
+                    }
+                }
+            }
+            eel._received = 0;
+            eel._acked = 0;
+            eel._received_chars = 0;
+            eel._chunks = {};
+        }
+        eel._connected_once = true;
+    },
+
+    _schedule_reconnect: function() {
+        if(eel._reconnect_attempt >= eel._reconnect_max_attempts) {
+            return;
+        }
+        let delay = Math.min(eel._reconnect_base_delay * Math.pow(2, eel._reconnect_attempt), eel._reconnect_max_delay);
+        delay = delay / 2 + Math.random() * delay / 2;      // Jitter, so windows do not reconnect in lockstep
+        eel._reconnect_attempt += 1;
+        setTimeout(eel._connect, delay);
+    },
+
     _call_number: 0,
 
     _call_return_callbacks: {},
@@ -75,6 +280,75 @@ eel = {
         return {'call': call_id, 'name': name, 'args': arg_array};
     },
 
+    _handle_call: function(id, name, args) {
+        let call_object = eel._call_object(name, args);
+        call_object.handle = id;
+        eel._send_call(call_object);
+        return eel._call_return(call_object);
+    },
+
+    _release_handle: function(id) {
+        if(eel._websocket && eel._websocket.readyState === WebSocket.OPEN) {
+            eel._send({'handle_release': id});
+        }
+    },
+
+    // Proxy for a Python object returned with `AsyncEel.handle()`
+    _make_handle: function(info) {
+        let id = info.__eel_handle__;
+        let handle = {
+            id: id,
+            type: info.type,
+            length: info.length,
+            call: function(method, ...args) { return eel._handle_call(id, method, args); },
+            get: function(key) { return eel._handle_call(id, '__getitem__', [key]); },
+            slice: function(start, stop) { return eel._handle_call(id, '__slice__', [start, stop]); },
+            len: function() { return eel._handle_call(id, '__len__', []); },
+            release: function() {
+                if(eel._handle_finalizer) {
+                    eel._handle_finalizer.unregister(handle);
+                }
+                eel._release_handle(id);
+            }
+        };
+        if(eel._handle_finalizer) {
+            eel._handle_finalizer.register(handle, id, handle);
+        }
+        return handle;
+    },
+
+    // Handle to a Python `AsyncEel.cursor()`, read one page at a time
+    _make_cursor: function(info) {
+        let cursor = eel._make_handle(info);
+        cursor.done = false;
+        cursor.next = function(n = 100) {
+            return eel._handle_call(cursor.id, 'next', [n])().then(function(page) {
+                cursor.done = page.done;
+                return page.items;
+            });
+        };
+        cursor.pages = async function*(n = 100) {
+            while(!cursor.done) {
+                let items = await cursor.next(n);
+                if(items.length > 0) {
+                    yield items;
+                }
+            }
+        };
+        cursor.close = function() {
+            cursor.done = true;
+            return eel._handle_call(cursor.id, 'close', [])();
+        };
+        return cursor;
+    },
+
+    _revive: function(value) {
+        if(value !== null && typeof value === 'object' && value.hasOwnProperty('__eel_handle__')) {
+            return value.kind === 'cursor' ? eel._make_cursor(value) : eel._make_handle(value);
+        }
+        return value;
+    },
+
     _sleep: function(ms) {
         return new Promise(resolve => setTimeout(resolve, ms));
     },
@@ -84,7 +358,19 @@ eel = {
     },
 
     _call_return: function(call) {
-        return function(callback = null) {
+        let call_return = function(callback = null) {
+            if(call.timeout !== undefined) {
+                setTimeout(function() {
+                    let pending = eel._call_return_callbacks[call.call];
+                    if(pending !== undefined) {
+                        delete eel._call_return_callbacks[call.call];
+                        if(pending.reject) {
+                            // Same shape as the rejection for a 'timeout' reply from Python
+                            pending.reject({'errorText': 'Deadline of ' + call.timeout + ' ms exceeded', 'errorTraceback': ''});
+                        }
+                    }
+                }, call.timeout);
+            }
             if(callback != null) {
                 eel._call_return_callbacks[call.call] = {resolve: callback};
             } else {
@@ -92,6 +378,71 @@ eel = {
                     eel._call_return_callbacks[call.call] = {resolve: resolve, reject: reject};
                 });
             }
+        };
+        // e.g. `await eel.slow_fn(x).withTimeout(500)()`
+        call_return.withTimeout = function(ms) {
+            call.timeout = ms;
+            return call_return;
+        };
+        // e.g. `await eel.export_csv(rows).withLane('bulk')()`: the reply takes turns with other messages
+        call_return.withLane = function(lane) {
+            call.lane = lane;
+            return call_return;
+        };
+        return call_return;
+    },
+
+    _unescape_pointer: function(token) {
+        return token.replace(/~1/g, '/').replace(/~0/g, '~');
+    },
+
+    _apply_patch: function(doc, ops) {
+        for(let i = 0; i < ops.length; i++) {
+            let op = ops[i];
+            let keys = op.path.split('/').slice(1).map(eel._unescape_pointer);
+            let last = keys.pop();
+            let target = doc;
+            for(let j = 0; j < keys.length; j++) {
+                target = target[keys[j]];
+            }
+            if(Array.isArray(target)) {
+                let index = last === '-' ? target.length : parseInt(last);
+                if(op.op === 'add') {
+                    target.splice(index, 0, op.value);
+                } else if(op.op === 'remove') {
+                    target.splice(index, 1);
+                } else {
+                    target[index] = op.value;
+                }
+            } else if(op.op === 'remove') {
+                delete target[last];
+            } else {
+                target[last] = op.value;
+            }
+        }
+        return doc;
+    },
+
+    _on_state: function(message) {
+        let store = eel.state(message.state);
+        let patch = null;
+        if(message.hasOwnProperty('value')) {
+            store.value = message.value;
+            store._syncing = false;
+        } else if(message.version === store.version + 1) {
+            patch = message.patch;
+            eel._apply_patch(store.value, patch);
+        } else {
+            if(message.version > store.version && !store._syncing) {
+                // Missed a delta (or got one before the snapshot): ask for a full resync
+                store._syncing = true;
+                eel._send({'state_sync': message.state});
+            }
+            return;
+        }
+        store.version = message.version;
+        for(let i = 0; i < store._listeners.length; i++) {
+            store._listeners[i](store.value, patch);
         }
     },
 
@@ -118,68 +469,109 @@ eel = {
         eel._mock_py_functions();
 
         document.addEventListener("DOMContentLoaded", function(event) {
-            let page = window.location.pathname.substring(1);
-            eel._position_window(page);
+            eel._page = window.location.pathname.substring(eel._prefix.length + 1);
+            eel._position_window(eel._page);
+            eel._connect();
+        });
+    },
 
-            let websocket_addr = (eel._host + '/eel').replace('http', 'ws');
-            websocket_addr += ('?page=' + page);
-            eel._websocket = new WebSocket(websocket_addr);
+    _connect: function() {
+        let websocket_addr = (eel._host + eel._prefix + '/eel').replace('http', 'ws');
+        websocket_addr += ('?page=' + eel._page + '&session=' + eel._guid + '&ack=' + eel._received);
+        if(eel._tags.length > 0) {
+            websocket_addr += '&tags=' + encodeURIComponent(eel._tags.join(','));
+        }
+        eel._websocket = new WebSocket(websocket_addr);
 
-            eel._websocket.onopen = function() {
-                for(let i = 0; i < eel._py_functions.length; i++){
-                    let py_function = eel._py_functions[i];
-                    eel._import_py_function(py_function);
-                }
+        eel._websocket.onopen = function() {
+            eel._reconnect_attempt = 0;
+            for(let i = 0; i < eel._py_functions.length; i++){
+                let py_function = eel._py_functions[i];
+                eel._import_py_function(py_function);
+            }
 
-                while(eel._mock_queue.length > 0) {
-                    let call = eel._mock_queue.shift();
-                    eel._websocket.send(eel._toJSON(call));
+            eel._flushed = new Set();
+            while(eel._mock_queue.length > 0) {
+                let call = eel._mock_queue.shift();
+                eel._flushed.add(call.call);
+                eel._send_text(eel._toJSON(call), call);
+            }
+        };
+
+        eel._websocket.onmessage = function (e) {
+            let data = e.data;
+            let chunked = data.startsWith('chunk:');
+            if(chunked) {
+                eel._count_received(data.length);       // Every frame counts, for session resume
+                data = eel._add_chunk(data);
+                if(data === null) {
+                    return;
                 }
-            };
-
-            eel._websocket.onmessage = function (e) {
-                let message = JSON.parse(e.data);
-                if(message.hasOwnProperty('call') ) {
-                    // Python making a function call into us
-                    if(message.name in eel._exposed_functions) {
-                        try {
-                            let return_val = eel._exposed_functions[message.name](...message.args);
-                            eel._websocket.send(eel._toJSON({'return': message.call, 'status':'ok', 'value': return_val}));
-                        } catch(err) {
-                            debugger
-                            eel._websocket.send(eel._toJSON(
-                                {'return': message.call,
-                                'status':'error',
-                                'error': err.message,
-                                'stack': err.stack}));
-                        }
+            }
+            let message = JSON.parse(data);
+            if(message.hasOwnProperty('session')) {
+                eel._on_session(message.session);
+                return;
+            }
+            if(!chunked) {
+                eel._count_received(data.length);
+            }
+            if(message.hasOwnProperty('call') ) {
+                // Python making a function call into us
+                if(message.name in eel._exposed_functions) {
+                    try {
+                        let return_val = eel._exposed_functions[message.name](...message.args);
+                        eel._send({'return': message.call, 'status':'ok', 'value': return_val});
+                    } catch(err) {
+                        debugger
+                        eel._send(
+                            {'return': message.call,
+                            'status':'error',
+                            'error': err.message,
+                            'stack': err.stack});
                     }
-                } else if(message.hasOwnProperty('return')) {
-                    // Python returning a value to us
-                    if(message['return'] in eel._call_return_callbacks) {
-                        if(message['status']==='ok'){
-                            eel._call_return_callbacks[message['return']].resolve(message.value);
-                        }
-                        else if(message['status']==='error' &&  eel._call_return_callbacks[message['return']].reject) {
-                                eel._call_return_callbacks[message['return']].reject(message['error']);
-                        }
+                }
+            } else if(message.hasOwnProperty('state')) {
+                // Python pushing a shared state snapshot or delta
+                eel._on_state(message);
+            } else if(message.hasOwnProperty('return')) {
+                // Python returning a value to us
+                let pending = eel._call_return_callbacks[message['return']];
+                if(pending !== undefined) {
+                    delete eel._call_return_callbacks[message['return']];
+                    if(message['status']==='ok'){
+                        pending.resolve(eel._revive(message.value));
+                    }
+                    else if(pending.reject) {
+                        pending.reject(message['error']);
                     }
-                } else {
-                    throw 'Invalid message ' + message;
                 }
+            } else {
+                throw 'Invalid message ' + message;
+            }
 
-            };
-			
-			// Fired when the connection is lost *for any reason*
-			eel._websocket.addEventListener("close", (evt) => {
-				eel.onClose(evt);
-			});
-
-			// Optional: detect abrupt network failures
-			eel._websocket.addEventListener("error", (evt) => {
-				eel.onError(evt);
-			});
-			
+        };
+
+        // Fired when the connection is lost *for any reason*
+        eel._websocket.addEventListener("close", (evt) => {
+            // Messages cut off halfway are sent again whole after reconnecting
+            for(let stream of eel._outgoing) {
+                eel._mock_queue.push(stream.message);
+            }
+            eel._outgoing = [];
+            clearTimeout(eel._pump_timer);
+            eel._pump_timer = null;
+            eel.onClose(evt);
+            // 1001: Python is shutting down (or the page is unloading), so there is nothing to resume.
+            // Any other code, such as 4000 for a connection Python gave up on as silent, reconnects.
+            if(evt.code !== 1001) {
+                eel._schedule_reconnect();
+            }
+        });
+
+        // Optional: detect abrupt network failures
+        eel._websocket.addEventListener("error", (evt) => {
+            eel.onError(evt);
         });
     },
 
@@ -191,6 +583,11 @@ eel = {
 	// Helper to replace the onError callback at any time
 	setOnError: function(handler) {
 		eel.onError = typeof handler === "function" ? handler : eel.onError;
+	},
+
+	// Helper to replace the onProgress callback at any time
+	setOnProgress: function(handler) {
+		eel.onProgress = typeof handler === "function" ? handler : eel.onProgress;
 	}
 
 };
@@ -9,18 +9,45 @@ import json as jsn
 import re as rgx
 import os
 from . import browsers as brw
+from .state import SharedState
+from .handles import Handle, HandleRegistry
+from .cursors import Cursor
+from .cache import ResultCache
+from .scheduler import CallScheduler, SchedulerBusy, priority_value, PRIORITIES
+from .loop_monitor import LoopLagMonitor
+from .metrics import MetricsRegistry
+from .tracing import tracer
+from .recording import FrameRecorder
+from .sessions import ACK_CHARS, Session
+from .heartbeat import RECONNECT, HeartbeatMonitor, Liveness
+from .connections import Connection, ConnectionRegistry
+from .mock_queue import DeliveryT, MockQueue, PendingCall
+from .registry import FunctionRegistry, hybridmethod
+from .compression import CompressionStats, DeflateWebSocket
+from . import chunking
+from .lanes import LaneScheduler, LaneStats, LANES, check_lane
+from . import cluster
+from . import loops
+from .cluster import Channel, Cluster
 import pyparsing as pp
 import random as rnd
 import sys
+import time
+import math
 import importlib_resources
 import socket
 import mimetypes
+from contextlib import nullcontext
 
 # from quart import Quart, websocket, Response, send_from_directory
-from aiohttp import web
+from aiohttp import web, WSCloseCode
 import aiofiles
 import asyncio
 import signal
+import stat
+import threading
+import functools
+import warnings
 
 from . import ic_instances
 ic = ic_instances.create_ic(prefix=f"async_eel|")
@@ -28,15 +55,33 @@ ic_instances.disable_all()
 
 import logging
 
-def shutdown(signum, frame):
-    print(f"Signal {signum} received! Exiting...")
-    sys.exit(0)
+# Instances started and not shut down yet; the process exits when the last one closes
+_running: Set[AsyncEel] = set()
+
+
+class _DeadlineExceeded(Exception):
+    '''The caller's deadline passed before the call finished.'''
+
 
 class AsyncEel:
     
-    _exposed_functions: Dict[Any, Any] = {} # Expose at class level instead of instance level.
+    # Functions exposed on the class are shared by every instance, see `expose`.
+    _functions: FunctionRegistry = FunctionRegistry()
+
+    # Options of `start` tuned for message-heavy apps whose pages run on the same machine
+    THROUGHPUT_OPTIONS: Dict[str, Any] = {'uvloop': True, 'ws_compress': False, 'backlog': 1024}
     
-    def __init__(self):
+    def __init__(self, shared_functions: bool = True):
+        '''An Eel front end: web folder, server, pages and exposed functions.
+
+        Several instances can run in one process, on different ports or path
+        prefixes (see :func:`start`).
+
+        :param shared_functions: Also expose the functions exposed on the
+            class with :code:`@AsyncEel.expose`, besides those exposed on
+            this instance with :code:`@eel.expose`. *Default:* `True`.
+        '''
+        self._functions = FunctionRegistry(AsyncEel._functions if shared_functions else None)
         mimetypes.add_type('application/javascript', '.js')
 
         # https://setuptools.pypa.io/en/latest/pkg_resources.html
@@ -46,14 +91,36 @@ class AsyncEel:
         with importlib_resources.as_file(self._eel_js_reference) as _eel_js_path:
             self._eel_js: str = _eel_js_path.read_text(encoding='utf-8')
 
-        self._websockets: List[Tuple[Any, WebSocketT]] = []
+        self._connections: ConnectionRegistry = ConnectionRegistry()
         self._call_return_values: Dict[Any, Any] = {}
         self._call_return_callbacks: Dict[float, Tuple[Callable[..., Any], Optional[Callable[..., Any]]]] = {}
         self._call_number: int = 0
         
         self._js_functions: List[Any] = []
-        self._mock_queue: List[Any] = []
-        self._mock_queue_done: Set[Any] = set()
+        self._mock_queue: MockQueue = MockQueue()
+        self._shared_states: Dict[str, SharedState] = {}
+        self._worker_state_warnings: Set[str] = set()
+        self._handles: HandleRegistry = HandleRegistry()
+        self._inflight_calls: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._coalesced_counts: Dict[str, int] = {}
+        self._scheduler: CallScheduler = CallScheduler()
+        self._call_tasks: Set[asyncio.Task] = set()
+        self._lag_monitor: Optional[LoopLagMonitor] = None
+        self._shed_calls: int = 0
+        self._metrics: Optional[MetricsRegistry] = None
+        self._js_calls_started: Dict[float, Tuple[str, float, int]] = {}
+        self._recorder: Optional[FrameRecorder] = None
+        self._send_tasks: Set[asyncio.Task] = set()
+        self._draining: bool = False
+        self._closed: Optional[asyncio.Future] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None     # The loop serving pages, once started
+        self._close_waiters: int = 0
+        self._heartbeats: HeartbeatMonitor = HeartbeatMonitor(None, 10.0, self._reap)
+        self._cluster: Optional[Cluster] = None
+        self._listen_socket: Optional[socket.socket] = None
+        self._compression: CompressionStats = CompressionStats()
+        self._chunk_number: int = 0
+        self._lane_stats: LaneStats = LaneStats()
         self.app: web.Application = web.Application()#Quart(__name__)
         # self._shutdown: Optional[gvt.Greenlet] = None    # Later assigned as global by _websocket_close()
         self.root_path: str                              # Later assigned as global by init()
@@ -101,8 +168,18 @@ class AsyncEel:
     # ===============================================================================================
     # Public methods
     
-    @classmethod
-    def expose(cls, name_or_function: Optional[Callable[..., Any]] = None) -> Callable[..., Any]:
+    @hybridmethod
+    def expose(target,
+            name_or_function: Optional[Union[str, Callable[..., Any]]] = None,
+            *,
+            cache: Union[bool, int] = False,
+            cache_ttl: Optional[float] = None,
+            coalesce: bool = False,
+            max_concurrency: Optional[int] = None,
+            priority: Union[str, int] = 'normal',
+            max_queue: Optional[int] = None,
+            coordinator: bool = False,
+            lane: str = 'control') -> Callable[..., Any]:
         '''Decorator to expose Python callables via Eel's JavaScript API.
 
         When an exposed function is called, a callback function can be passed
@@ -136,23 +213,412 @@ class AsyncEel:
 
             Alice said hello from the JavaScript world!
 
+        Exposed on the class (:code:`@AsyncEel.expose`), a function is
+        available to every instance; exposed on an instance
+        (:code:`@eel.expose`), to that instance only.
+
+        :param cache: Cache the results of a pure function, keyed by its
+            arguments. `True` keeps up to 128 results, an integer sets the
+            maximum number of results (least recently used are evicted).
+            Cached replies are stored already JSON encoded. See
+            :func:`invalidate_cache` and :func:`cache_stats`.
+            *Default:* `False`.
+        :param cache_ttl: Seconds a cached result stays valid. *Default:*
+            `None` (until evicted or invalidated).
+        :param coalesce: Share one execution between identical calls (same
+            arguments) that arrive while the first one is still running, e.g.
+            from several windows. Each caller still gets its own reply. See
+            :func:`coalesce_stats`. *Default:* `False`.
+        :param max_concurrency: Maximum number of calls of this function
+            running at the same time; further calls wait in the scheduler
+            queue. *Default:* `None` (unlimited).
+        :param priority: Priority class of the calls, :code:`'high'`,
+            :code:`'normal'` or :code:`'low'` (or an int, lower runs first).
+            Waiting calls are started in priority order across all
+            connections. *Default:* :code:`'normal'`.
+        :param max_queue: Maximum number of waiting calls of this function.
+            When the queue is full, new calls are rejected at once with the
+            status :code:`'busy'`. *Default:* `None` (unbounded).
+        :param coordinator: With :code:`start(workers=N)`, always run the
+            function in the coordinator process, so the state it reads and
+            changes is the same whichever worker a page is connected to.
+            Such functions cannot return :func:`handle` or :func:`cursor`
+            objects to pages of workers: those calls fail with an error.
+            *Default:* `False`.
+        :param lane: Lane of the replies, :code:`'control'` or
+            :code:`'bulk'`. Bulk replies, e.g. exports, take turns with the
+            control messages to the page instead of holding them up (see the
+            *lane_weights* option of :func:`start`). A call can ask for
+            another lane with :code:`withLane()`. *Default:*
+            :code:`'control'`.
+
         '''
+        options: Dict[str, Any] = {
+            'cache': cache,
+            'cache_ttl': cache_ttl,
+            'coalesce': coalesce,
+            'max_concurrency': max_concurrency,
+            'priority': priority,
+            'max_queue': max_queue,
+            'coordinator': coordinator,
+            'lane': lane,
+        }
+
+        def decorator(function: Callable[..., Any], name: Optional[str] = None) -> Any:
+            target._expose(name or function.__name__, function, options)
+            return function
 
         # Deal with '@eel.expose()' - treat as '@eel.expose'
         if name_or_function is None:
-            return expose
+            return decorator
 
         if isinstance(name_or_function, str):   # Called as '@eel.expose("my_name")'
             name = name_or_function
-
-            def decorator(function: Callable[..., Any]) -> Any:
-                cls._expose(name, function)
-                return function
-            return decorator
+            return lambda function: decorator(function, name)
         else:
-            function = name_or_function
-            cls._expose(function.__name__, function)
-            return function
+            return decorator(name_or_function)
+
+    @hybridmethod
+    def invalidate_cache(target, name: str, *args: Any) -> None:
+        '''Drop cached results of the exposed function *name*.
+
+        With *args*, only the result for exactly these arguments is dropped;
+        without, the whole cache of the function is cleared.
+        '''
+        cache = target._functions.cache(name)
+        if cache is None:
+            raise KeyError(name)
+        cache.invalidate(cache.key(list(args)) if args else None)
+
+    @hybridmethod
+    def cache_stats(target, name: Optional[str] = None) -> Dict[str, Any]:
+        '''Hit/miss/eviction counters and size of the result caches.
+
+        Returns the stats of the function *name*, or a dict of the stats of
+        every cached function keyed by name.
+        '''
+        caches = target._functions.caches()
+        if name is not None:
+            return caches[name].stats()
+        return {n: c.stats() for n, c in caches.items()}
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        '''Call statistics recorded since :code:`start(metrics=True)`.
+
+        Returns a dict keyed by kind (:code:`'py'` for exposed Python
+        functions, :code:`'js'` for JavaScript functions called from Python,
+        :code:`'static'` for static files by extension), then by name, with
+        :code:`calls`, :code:`errors`, :code:`bytes_in`, :code:`bytes_out`
+        and a :code:`latency` summary in seconds. The latency of a Python
+        function runs from receiving the call to its reply being ready, not
+        counting the time sending the reply. Calls to names that are not
+        exposed, and requests for files that are not served, are counted
+        under :code:`'unknown'`.
+        '''
+        if self._metrics is None:
+            raise RuntimeError('Metrics are not enabled, see start(metrics=True)')
+        return self._metrics.snapshot()
+
+    def metrics_text(self) -> str:
+        '''The metrics in the Prometheus text exposition format.'''
+        if self._metrics is None:
+            raise RuntimeError('Metrics are not enabled, see start(metrics=True)')
+        histograms = {}
+        if self._lag_monitor is not None:
+            histograms['async_eel_loop_lag_seconds'] = self._lag_monitor.histogram
+        return self._metrics.prometheus(histograms)
+
+    def loop_lag_stats(self) -> Dict[str, Any]:
+        '''Event loop lag percentiles (seconds), recent stalls and shed calls.
+
+        Requires :code:`start(monitor_loop_lag=True)` or *shed_load_lag*.
+        Each stall lists the activities started during it and those running.
+        '''
+        if self._lag_monitor is None:
+            raise RuntimeError('Loop lag monitoring is not enabled, see start(monitor_loop_lag=True)')
+        stats = self._lag_monitor.stats()
+        stats['shed'] = self._shed_calls
+        return stats
+
+    def start_recording(self, path: str) -> None:
+        '''Record every websocket frame, in and out, to the log file *path*.
+
+        Frames are stored with their timing and connection, and can be
+        re-driven against a local instance with :code:`python -m
+        async_eel.replay`. Paths ending in :file:`.gz` are compressed.
+        '''
+        self.stop_recording()
+        self._recorder = FrameRecorder(path)
+        for connection in self._connections:
+            self._recorder.opened(connection.conn, connection.page)
+
+    def stop_recording(self) -> None:
+        '''Stop recording frames and close the log file.'''
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+
+    async def shutdown(self, timeout: float = 5.0) -> None:
+        '''Shut down the app in an orderly way.
+
+        New calls from JavaScript are answered with the status
+        :code:`'busy'`, calls already running get up to *timeout* seconds to
+        finish (and are cancelled after that), pending messages are sent, then
+        every websocket is closed with code 1001 (going away) so pages do not
+        try to reconnect, and the web server is cleaned up.
+
+        Called automatically, followed by an exit, on Ctrl+C and once the
+        last page has closed. See :func:`wait_closed` to exit by returning
+        from your main coroutine instead.
+        '''
+        if self._draining:
+            if self._closed is not None:
+                await asyncio.shield(self._closed)
+            return
+        self._draining = True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        if self._call_tasks:
+            _, running = await asyncio.wait(set(self._call_tasks), timeout=timeout)
+            for task in running:
+                task.cancel()
+        if self._send_tasks:
+            await asyncio.wait(set(self._send_tasks), timeout=max(deadline - loop.time(), 0.1))
+
+        for connection in self._connections:
+            conn = connection.conn
+            if isinstance(conn, Session) and conn.expiry is not None:
+                conn.expiry.cancel()
+            ws = conn.ws if isinstance(conn, Session) else conn
+            if ws is not None:
+                await ws.close(code=WSCloseCode.GOING_AWAY, message=b'Server shutdown')
+            self._release_handle_objects(self._handles.release_all(conn))
+        self._connections.clear()
+
+        if self._lag_monitor is not None:
+            self._lag_monitor.stop()
+        self._heartbeats.stop()
+        self.stop_recording()
+        if self._cluster is not None:
+            self._cluster.close()
+            await self._cluster.join(max(deadline - loop.time(), 1.0))
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+        self._listen_socket = None
+        unix_socket = self._start_args.get('unix_socket')
+        if unix_socket is not None and os.path.exists(unix_socket) and not (self._cluster and self._cluster.is_worker):
+            os.remove(unix_socket)
+        _running.discard(self)
+        if self._closed is not None and not self._closed.done():
+            self._closed.set_result(None)
+
+    async def wait_closed(self) -> None:
+        '''Wait until the app has shut down.
+
+        While something waits here, the automatic shutdown (last page closed,
+        Ctrl+C) does not exit the process, so the main coroutine can return
+        normally:
+
+        .. code-block:: python
+
+            await eel.start('main.html')
+            await eel.wait_closed()
+        '''
+        if self._closed is None:
+            raise RuntimeError('wait_closed() must be called after start()')
+        self._close_waiters += 1
+        try:
+            await asyncio.shield(self._closed)
+        finally:
+            self._close_waiters -= 1
+
+    def _on_exit_signal(self) -> None:
+        if self._draining:
+            sys.exit(1)     # Second Ctrl+C: do not wait for the drain
+        print('Shutting down...')
+        # The handler is per process, so it stops every front end running in it
+        for eel in list(_running | {self}):
+            asyncio.ensure_future(eel._shutdown_and_exit())
+
+    async def _shutdown_and_exit(self) -> None:
+        await self.shutdown()
+        if self._close_waiters == 0 and not _running:
+            sys.exit(0)
+
+    def connection_stats(self) -> Dict[str, Any]:
+        '''Traffic and liveness of the connected pages, and the number of dead connections reaped.
+
+        Each connection lists its page, session id, tags, connect time,
+        messages and bytes in and out and calls still running. While its
+        websocket is open it also lists seconds connected and idle (since the
+        last message or pong), pings sent, pongs received and the smoothed
+        ping round trip in seconds.
+        '''
+        liveness = self._heartbeats.by_conn()
+        connections = []
+        for connection in self._connections:
+            stats = connection.as_dict()
+            if connection.conn in liveness:
+                stats.update(liveness[connection.conn].as_dict())
+            connections.append(stats)
+        return {'connections': connections, 'reaped': self._heartbeats.reaped}
+
+    def connections(self, page: Optional[str] = None, tag: Optional[str] = None) -> List[Connection]:
+        '''The connected pages, optionally only those showing *page* or tagged *tag*.
+
+        Pages tag themselves with :code:`eel.set_tags('admin', ...)`, which
+        replaces their tags, before or after connecting.
+        '''
+        if page is not None:
+            found = self._connections.by_page(page)
+            return [c for c in found if tag is None or tag in c.tags]
+        if tag is not None:
+            return self._connections.by_tag(tag)
+        return list(self._connections)
+
+    def scheduler_stats(self) -> Dict[str, Any]:
+        '''Running and queued calls, and queue wait times, per exposed function.'''
+        return self._scheduler.stats()
+
+    def mock_queue_stats(self) -> Dict[str, Any]:
+        '''Calls to JavaScript waiting for a page, and how many were delivered, expired or evicted.'''
+        return self._mock_queue.stats()
+
+    def compression_stats(self) -> Dict[str, Any]:
+        '''Messages sent over websockets that negotiated compression.
+
+        Counts the connections that did, the messages compressed and those
+        under *ws_compress_threshold* sent as they are, the bytes before
+        and after compression and their :code:`ratio`, and the CPU time
+        spent compressing, in total and per message (seconds).
+        '''
+        return self._compression.stats()
+
+    def lane_stats(self) -> Dict[str, Any]:
+        '''Frames and characters sent in the control and bulk lanes, and how
+        long frames waited for their turn (seconds), per lane.'''
+        return self._lane_stats.stats()
+
+    def coalesce_stats(self) -> Dict[str, int]:
+        '''Number of executions saved by call coalescing, per exposed function.'''
+        return dict(self._coalesced_counts)
+
+    @staticmethod
+    def handle(obj: Any) -> Handle:
+        '''Return *obj* from an exposed function by reference instead of by value.
+
+        The object stays in a registry owned by the calling page, and
+        JavaScript receives a handle to call its methods or fetch items and
+        slices, so a large dataset can be paged from the UI without ever
+        being serialized as a whole. Handles are released when JavaScript
+        calls :code:`release()`, when the JS handle is garbage collected, or
+        when the page disconnects.
+
+        :Example:
+
+        In Python do:
+
+        .. code-block:: python
+
+            @AsyncEel.expose
+            def open_table(path):
+                return AsyncEel.handle(load_table(path))
+
+        In JavaScript do:
+
+        .. code-block:: javascript
+
+            let table = await eel.open_table('data.csv')();
+            let rows = await table.slice(0, 100)();
+            let total = await table.call('sum', 'price')();
+        '''
+        return Handle(obj)
+
+    @staticmethod
+    def cursor(iterable: Any, idle_timeout: Optional[float] = 60.0) -> Cursor:
+        '''Return a large sequence from an exposed function one page at a time.
+
+        *iterable* (a list, generator or async generator) is consumed lazily
+        as JavaScript requests pages, so only one page is held in memory and
+        serialized at a time. The cursor is freed once exhausted, on
+        :code:`close()`, when the page disconnects, or after *idle_timeout*
+        seconds without a request.
+
+        :Example:
+
+        In Python do:
+
+        .. code-block:: python
+
+            @AsyncEel.expose
+            def search(term):
+                return AsyncEel.cursor(row for row in db.scan() if term in row)
+
+        In JavaScript do:
+
+        .. code-block:: javascript
+
+            let rows = await eel.search('foo')();
+            let first = await rows.next(50);
+            for await (const page of rows.pages(50)) { append(page); }
+        '''
+        return Cursor(iterable, idle_timeout)
+
+    @staticmethod
+    def run(main: Any, uvloop: bool = True) -> Any:
+        '''Run the coroutine *main* like :func:`asyncio.run`, on uvloop if it is installed.
+
+        uvloop is a faster event loop for POSIX systems (:code:`pip install
+        uvloop`); without it, asyncio's loop is used.
+
+        :Example:
+
+        .. code-block:: python
+
+            async def main():
+                eel = AsyncEel()
+                eel.init('web')
+                await eel.start('main.html', **AsyncEel.THROUGHPUT_OPTIONS)
+                await eel.wait_closed()
+
+            AsyncEel.run(main())
+        '''
+        return loops.run(main, uvloop)
+
+    def shared_state(self, name: str, initial: Optional[Dict[str, Any]] = None) -> SharedState:
+        '''Get or create an observable state object mirrored into the browser.
+
+        Mutations of the returned dict (including nested dicts and lists) are
+        sent to every connected page as versioned JSON-patch deltas, so the
+        cost of an update scales with the size of the change rather than with
+        the size of the state. Pages get a full snapshot on connect and
+        whenever they detect a missing version.
+
+        :param name: Name under which the state is available in JavaScript
+            as :code:`eel.state(name)`.
+        :param initial: Initial content, only used when the state is created.
+
+        :Example:
+
+        In Python do:
+
+        .. code-block:: python
+
+            state = eel.shared_state('progress', {'done': 0, 'log': []})
+            state['done'] += 1
+            state['log'].append('step 1')
+
+        In JavaScript do:
+
+        .. code-block:: javascript
+
+            eel.state('progress').subscribe(value => render(value.done));
+        '''
+        if name not in self._shared_states:
+            self._shared_states[name] = SharedState(name, initial, on_patch=self._schedule_state_flush)
+        return self._shared_states[name]
 
     def init(self, 
             path: str,
@@ -213,7 +679,7 @@ class AsyncEel:
             *start_urls: str,
             mode: Optional[Union[str, Literal[False]]] = 'chrome',
             host: str = '127.0.0.1',
-            port: int = 8000,
+            port: Optional[int] = 8000,
             jinja_templates: Optional[str] = None,
             cmdline_args: List[str] = ['--disable-http-cache', '--disable-features=DevToolsAutoWorkspace'],
             size: Optional[Tuple[int, int]] = None,
@@ -224,9 +690,39 @@ class AsyncEel:
             all_interfaces: bool = False,
             disable_cache: bool = True,
             default_path: str = 'index.html',
-            app: web.Application = web.Application(), # btl.default_app(),
+            app: Optional[web.Application] = None,
             shutdown_delay: float = 1.0,
-            suppress_error: bool = False) -> bool:
+            suppress_error: bool = False,
+            max_concurrent_calls: Optional[int] = None,
+            monitor_loop_lag: bool = False,
+            shed_load_lag: Optional[float] = None,
+            metrics: bool = False,
+            metrics_route: bool = False,
+            record_frames: Optional[str] = None,
+            resume_window: float = 10.0,
+            resume_buffer: int = 1000,
+            resume_buffer_chars: int = 64 * 1024 * 1024,
+            heartbeat: Optional[float] = 20.0,
+            heartbeat_timeout: float = 10.0,
+            mock_queue_size: int = 1000,
+            mock_queue_ttl: Optional[float] = 60.0,
+            mock_delivery: DeliveryT = 'every',
+            path_prefix: str = '',
+            serve: bool = True,
+            workers: int = 1,
+            unix_socket: Optional[str] = None,
+            uvloop: bool = False,
+            ws_max_msg_size: int = 4 * 1024 * 1024,
+            ws_compress: bool = True,
+            ws_compress_threshold: int = 1024,
+            ws_compress_level: int = 1,
+            ws_compress_shared_context: bool = True,
+            ws_receive_timeout: Optional[float] = None,
+            keepalive_timeout: float = 75.0,
+            backlog: int = 128,
+            chunk_size: Optional[int] = 64 * 1024,
+            lane_weights: Optional[Dict[str, int]] = None,
+            bulk_window: Optional[int] = 1024 * 1024) -> bool:
         '''Start the Eel app.
 
         Suppose you put all the frontend files in a directory called
@@ -253,7 +749,10 @@ class AsyncEel:
         :param host: Hostname used for Bottle server. *Default:*
             :code:`'localhost'`.
         :param port: Port used for Bottle server. Use :code:`0` for port to be
-            picked automatically. *Default:* :code:`8000`.
+            picked automatically, or `None` to serve on *unix_socket* only,
+            with *mode* `None` or `False`: pages, including Electron's, load
+            over TCP.
+            *Default:* :code:`8000`.
         :param jinja_templates: Folder for :mod:`jinja2` templates, e.g.
             :file:`my_templates`. *Default:* `None`.
         :param cmdline_args: A list of strings to pass to the command starting the
@@ -286,17 +785,136 @@ class AsyncEel:
         :param app: An instance of :class:`aiohttp web.Application()` which will be used rather
             than creating a fresh one. This can be used to install middleware on
             the instance before starting Eel, e.g. for session management,
-            authentication, etc. If *app* is not a :class:`bottle.Bottle` instance,
-            you will need to call :code:`eel.register_eel_routes(app)` on your
-            custom app instance.
+            authentication, etc., or to serve several Eel instances from one
+            server (see *serve*). *Default:* `None` (a new application).
         :param shutdown_delay: Timer configurable for Eel's shutdown detection
             mechanism, whereby when any websocket closes, it waits *shutdown_delay*
             seconds, and then checks if there are now any websocket connections.
-            If not, then Eel closes. In case the user has closed the browser and
-            wants to exit the program. *Default:* :code:`1.0` seconds.
+            If not, then Eel shuts down with :func:`shutdown` and exits. In case
+            the user has closed the browser and wants to exit the program.
+            *Default:* :code:`1.0` seconds.
         :param suppress_error: Temporary (suppressible) error message to inform
             users of breaking API change for v1.0.0. Set to `True` to suppress
             the error message.
+        :param max_concurrent_calls: Limit of exposed function calls running at
+            the same time over all functions. Calls beyond it wait and are
+            started by priority (see the *priority* option of :func:`expose`).
+            *Default:* `None` (unlimited).
+        :param monitor_loop_lag: Sample the event loop lag in the background
+            and record which exposed functions or handlers were running during
+            long stalls. See :func:`loop_lag_stats`. *Default:* `False`.
+        :param shed_load_lag: Admission control: while the smoothed loop lag
+            is above this many seconds, new calls to :code:`'low'` priority
+            functions are rejected with the status :code:`'busy'`. Implies
+            *monitor_loop_lag*. *Default:* `None` (disabled).
+        :param metrics: Record call counts, error counts, latency histograms
+            and payload sizes of exposed Python functions, of JavaScript
+            functions called from Python and of static files. See
+            :func:`metrics`. *Default:* `False`.
+        :param metrics_route: Serve the metrics in the Prometheus text format
+            on :code:`/eel/metrics`. Implies *metrics*. *Default:* `False`.
+        :param record_frames: Path of a log file recording every websocket
+            frame for later replay, see :func:`start_recording`.
+            *Default:* `None`.
+        :param resume_window: Seconds a page whose websocket dropped has to
+            reconnect and resume its session. Messages sent to it meanwhile
+            are buffered and delivered on reconnect, and the page counts as
+            open for shutdown detection. `0` disables resuming.
+            *Default:* `10.0`.
+        :param resume_buffer: Maximum number of messages not yet acknowledged
+            by a page that are kept for resuming. *Default:* `1000`.
+        :param resume_buffer_chars: Maximum number of characters in those
+            messages. Past either limit the oldest are dropped, and a page
+            that had not received them starts a new session instead of
+            resuming. *Default:* `64 * 1024 * 1024`.
+        :param heartbeat: Seconds between pings sent to every websocket, or
+            `None` to disable. A connection silent for *heartbeat* +
+            *heartbeat_timeout* seconds is treated as closed: it stops
+            receiving calls and the close callback fires. See
+            :func:`connection_stats`. *Default:* `20.0`.
+        :param heartbeat_timeout: Extra seconds to wait for an answer to a
+            ping. *Default:* `10.0`.
+        :param mock_queue_size: Maximum number of calls to JavaScript kept
+            while no page is connected to run them. The oldest are dropped,
+            and their error callbacks run. *Default:* `1000`.
+        :param mock_queue_ttl: Seconds such a call is kept, or `None` for no
+            limit. *Default:* `60.0`.
+        :param mock_delivery: Which pages get the queued calls: `'first'`,
+            the first page to connect; `'every'`, each page name once; or a
+            list of page names. *Default:* `'every'`.
+        :param path_prefix: Serve the pages and Eel's routes under this path,
+            e.g. :code:`'/admin'` serves :file:`main.html` at
+            :code:`/admin/main.html`. Pages then load :file:`eel.js` by a
+            relative URL. *Default:* `''`.
+        :param serve: Start a web server for *app*. With `False`, only Eel's
+            routes are added to *app*, for another instance started later
+            with the same *app* and *port* to serve; give each instance its
+            own *path_prefix*. *Default:* `True`.
+        :param workers: Number of processes serving pages. With more than
+            one, this process forks the others, which listen on the same
+            port (:code:`SO_REUSEPORT`, POSIX only) and run their own event
+            loop. Calls to JavaScript and shared state changes reach the
+            pages of every process, functions exposed with
+            :code:`coordinator=True` run in this process, and the close
+            callback and statistics are per process. So are the call
+            scheduler (*max_concurrent_calls*, *max_concurrency* and
+            *max_queue* of :func:`expose`), the result cache and call
+            coalescing. Shared states changed in a worker are not sent to
+            pages, with a warning. *Default:* `1`.
+        :param unix_socket: Also serve on this Unix domain socket path, or on
+            Windows on this named pipe (:code:`\\\\.\\pipe\\name`), for
+            local clients that skip the TCP loopback. The path is handed to
+            Electron as :code:`--eel-socket=<path>` and in the
+            :code:`EEL_SOCKET` environment variable. *Default:* `None`.
+        :param uvloop: Run worker processes (see *workers*) on uvloop, if it
+            is installed. This process's own loop already exists when
+            :func:`start` runs: create it with :func:`run` to use uvloop
+            here too. *Default:* `False`.
+        :param ws_max_msg_size: Largest message, in bytes, accepted from a
+            page; a larger one closes its websocket. `0` for no limit.
+            *Default:* :code:`4 * 1024 * 1024`.
+        :param ws_compress: Accept the permessage-deflate compression that
+            browsers offer. Compression saves bandwidth but costs CPU time
+            on both sides, which rarely pays off for pages on the same
+            machine. See :func:`compression_stats`. *Default:* `True`.
+        :param ws_compress_threshold: Smallest message, in bytes, that is
+            compressed; smaller ones are sent as they are.
+            *Default:* :code:`1024`.
+        :param ws_compress_level: zlib level, from :code:`1` (fastest) to
+            :code:`9` (smallest). *Default:* :code:`1`.
+        :param ws_compress_shared_context: Keep the compression context
+            from one message to the next, so repeated content compresses
+            better, at the cost of a window kept per connection on both
+            sides. *Default:* `True`.
+        :param ws_receive_timeout: Seconds a websocket may stay silent
+            before it is closed, or `None` for no limit. With *heartbeat*
+            on, pages answer pings, so this must be longer than
+            *heartbeat*. *Default:* `None`.
+        :param keepalive_timeout: Seconds an idle HTTP connection is kept
+            open for further requests, e.g. of static files.
+            *Default:* :code:`75.0`.
+        :param backlog: Length of the listening sockets' queue of
+            connections not accepted yet. Raise it when many pages connect
+            at once. *Default:* :code:`128`.
+        :param chunk_size: Messages longer than this many characters, in
+            either direction, are sent in frames of that size, between which
+            other messages to the same page go out, so a large return value
+            does not hold up the replies to other calls. Pages reassemble
+            them and report progress (see :code:`eel.setOnProgress()` in
+            JavaScript). Frames must fit in *ws_max_msg_size*. `None` sends
+            every message whole. *Default:* :code:`64 * 1024`.
+        :param lane_weights: Shares of the control and bulk lanes (see the
+            *lane* option of :func:`expose`) in the frames sent to a page
+            while both have frames waiting, e.g. :code:`{'bulk': 4}` for
+            faster exports at some cost in the latency of other calls.
+            *Default:* `None` (:code:`{'control': 16, 'bulk': 1}`).
+        :param bulk_window: Most characters sent to a page and not
+            acknowledged yet before its bulk lane frames wait, so control
+            messages queue behind at most this much bulk data in the
+            network buffers. Pages acknowledge every 256 KiB, which is the
+            least allowed. Needs sessions (*resume_window*). `None` sends
+            bulk frames as fast as the websocket takes them.
+            *Default:* :code:`1024 * 1024`.
         '''
         self._start_args.update({
             'mode': mode,
@@ -316,16 +934,40 @@ class AsyncEel:
             'app': app,
             'shutdown_delay': shutdown_delay,
             'suppress_error': suppress_error,
+            'max_concurrent_calls': max_concurrent_calls,
+            'monitor_loop_lag': monitor_loop_lag,
+            'shed_load_lag': shed_load_lag,
+            'metrics': metrics,
+            'metrics_route': metrics_route,
+            'record_frames': record_frames,
+            'resume_window': resume_window,
+            'resume_buffer': resume_buffer,
+            'resume_buffer_chars': resume_buffer_chars,
+            'heartbeat': heartbeat,
+            'heartbeat_timeout': heartbeat_timeout,
+            'mock_queue_size': mock_queue_size,
+            'mock_queue_ttl': mock_queue_ttl,
+            'mock_delivery': mock_delivery,
+            'path_prefix': path_prefix,
+            'serve': serve,
+            'workers': workers,
+            'unix_socket': unix_socket,
+            'uvloop': uvloop,
+            'ws_max_msg_size': ws_max_msg_size,
+            'ws_compress': ws_compress,
+            'ws_compress_threshold': ws_compress_threshold,
+            'ws_compress_level': ws_compress_level,
+            'ws_compress_shared_context': ws_compress_shared_context,
+            'ws_receive_timeout': ws_receive_timeout,
+            'keepalive_timeout': keepalive_timeout,
+            'backlog': backlog,
+            'chunk_size': chunk_size,
+            'lane_weights': lane_weights,
+            'bulk_window': bulk_window,
         })
         ic(self._start_args)
         self.wait_ws_started = asyncio.Future() # Can only be used after start() is called.
 
-        if self._start_args['port'] == 0:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.bind(('localhost', 0))
-            self._start_args['port'] = sock.getsockname()[1]
-            sock.close()
-
         if self._start_args['jinja_templates'] is not None:
             from jinja2 import Environment, FileSystemLoader, select_autoescape
             if not isinstance(self._start_args['jinja_templates'], str):
@@ -336,6 +978,37 @@ class AsyncEel:
                 autoescape=select_autoescape(['html', 'xml'])
             )
 
+        if max_concurrent_calls is not None and max_concurrent_calls < 1:
+            raise ValueError('`max_concurrent_calls` must be at least 1, got %r' % max_concurrent_calls)
+        self._scheduler.max_concurrency = max_concurrent_calls
+
+        if shed_load_lag is not None and not isinstance(shed_load_lag, (int, float)):
+            raise ValueError('`shed_load_lag` must be a number or None, got a {}'.format(type(shed_load_lag)))
+        if metrics or metrics_route:
+            self._metrics = MetricsRegistry()
+
+        if not isinstance(resume_window, (int, float)) or resume_window < 0:
+            raise ValueError('`resume_window` must be a non-negative number, got %r' % (resume_window,))
+        if not isinstance(resume_buffer, int) or resume_buffer < 1:
+            raise ValueError('`resume_buffer` must be a positive int, got %r' % (resume_buffer,))
+        if not isinstance(resume_buffer_chars, int) or resume_buffer_chars < ACK_CHARS:
+            # Pages acknowledge every ACK_CHARS at most, so less would drop messages in flight
+            raise ValueError('`resume_buffer_chars` must be an int of at least %d, got %r'
+                             % (ACK_CHARS, resume_buffer_chars))
+
+        if heartbeat is not None and (not isinstance(heartbeat, (int, float)) or heartbeat <= 0):
+            raise ValueError('`heartbeat` must be a positive number or None, got %r' % (heartbeat,))
+        if not isinstance(heartbeat_timeout, (int, float)) or heartbeat_timeout < 0:
+            raise ValueError('`heartbeat_timeout` must be a non-negative number, got %r' % (heartbeat_timeout,))
+        self._heartbeats.interval = heartbeat
+        self._heartbeats.timeout = heartbeat_timeout
+
+        self._drop_mock_calls(self._mock_queue.configure(mock_queue_size, mock_queue_ttl, mock_delivery))
+
+        if not isinstance(path_prefix, str) or (path_prefix and not path_prefix.startswith('/')):
+            raise ValueError("`path_prefix` must be '' or a path starting with '/', got %r" % (path_prefix,))
+        self._start_args['path_prefix'] = path_prefix.rstrip('/')
+
         # verify shutdown_delay is correct value
         if not isinstance(self._start_args['shutdown_delay'], (int, float)):
             raise ValueError(
@@ -343,8 +1016,47 @@ class AsyncEel:
                 'got a {}'.format(type(self._start_args['shutdown_delay']))
             )
 
-        # Launch the browser to the starting URLs
-        self.show(*start_urls)
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError('`workers` must be a positive int, got %r' % (workers,))
+        if workers > 1 and not cluster.supported():
+            raise ValueError('`workers` above 1 needs os.fork() and SO_REUSEPORT, not available on this platform')
+        if workers > 1 and not serve:
+            raise ValueError('`workers` above 1 needs `serve=True`')
+        if port is None and unix_socket is None:
+            raise ValueError('`port=None` needs a `unix_socket` to serve on')
+        if port is None and mode not in (False, None):
+            # Browsers and Electron's renderer load pages and connect their websocket over TCP
+            raise ValueError('`port=None` leaves no URL for mode %r to open, use mode=None or a port' % (mode,))
+
+        if not isinstance(ws_max_msg_size, int) or ws_max_msg_size < 0:
+            raise ValueError('`ws_max_msg_size` must be a non-negative int, got %r' % (ws_max_msg_size,))
+        if not isinstance(ws_compress_threshold, int) or ws_compress_threshold < 0:
+            raise ValueError('`ws_compress_threshold` must be a non-negative int, got %r' % (ws_compress_threshold,))
+        if not isinstance(ws_compress_level, int) or not 1 <= ws_compress_level <= 9:
+            raise ValueError('`ws_compress_level` must be an int from 1 to 9, got %r' % (ws_compress_level,))
+        if ws_receive_timeout is not None:
+            if not isinstance(ws_receive_timeout, (int, float)) or ws_receive_timeout <= 0:
+                raise ValueError('`ws_receive_timeout` must be a positive number or None, got %r' % (ws_receive_timeout,))
+            if heartbeat is not None and ws_receive_timeout <= heartbeat:
+                raise ValueError('`ws_receive_timeout` must be longer than `heartbeat`, got %r' % (ws_receive_timeout,))
+        if not isinstance(keepalive_timeout, (int, float)) or keepalive_timeout < 0:
+            raise ValueError('`keepalive_timeout` must be a non-negative number, got %r' % (keepalive_timeout,))
+        if not isinstance(backlog, int) or backlog < 1:
+            raise ValueError('`backlog` must be a positive int, got %r' % (backlog,))
+        if chunk_size is not None:
+            if not isinstance(chunk_size, int) or chunk_size < 1:
+                raise ValueError('`chunk_size` must be a positive int or None, got %r' % (chunk_size,))
+            if ws_max_msg_size and 3 * chunk_size + 64 > ws_max_msg_size:
+                # A character sent by the browser takes up to 3 bytes in UTF-8
+                raise ValueError('`chunk_size` frames must fit in `ws_max_msg_size`, got %r' % (chunk_size,))
+        for lane, weight in (lane_weights or {}).items():
+            check_lane(lane)
+            if not isinstance(weight, int) or weight < 1:
+                raise ValueError('`lane_weights` must be positive ints, got %r for %r' % (weight, lane))
+        if bulk_window is not None and (not isinstance(bulk_window, int) or bulk_window < ACK_CHARS):
+            raise ValueError('`bulk_window` must be an int of at least %d or None, got %r' % (ACK_CHARS, bulk_window))
+        if uvloop and not loops.uvloop_available():
+            warnings.warn('uvloop is not installed, workers use the asyncio event loop', RuntimeWarning)
 
         if self._start_args['all_interfaces'] is True:
             HOST = '0.0.0.0'
@@ -353,7 +1065,18 @@ class AsyncEel:
                 raise TypeError("'host' start_arg/option must be of type str")
             HOST = self._start_args['host']
 
-        self.app = self._start_args['app']
+        if port == 0 and serve:
+            # Bind now and serve on this very socket: probing for a free port and binding it later is racy
+            # The family follows the host, e.g. IPv6 for '::1'
+            family, type_, proto, _, address = socket.getaddrinfo(HOST, 0, type=socket.SOCK_STREAM,
+                                                                  flags=socket.AI_PASSIVE)[0]
+            self._listen_socket = socket.socket(family, type_, proto)
+            if workers > 1:
+                self._listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self._listen_socket.bind(address)
+            self._start_args['port'] = self._listen_socket.getsockname()[1]
+
+        self.app = app if app is not None else web.Application()
 
         if isinstance(self.app, web.Application):
             self.register_eel_routes(self.app)
@@ -361,17 +1084,137 @@ class AsyncEel:
             # self.register_eel_routes(btl.default_app())
             raise Exception("Wrong server app type")
 
-        self.runner = web.AppRunner(self.app)
-        await self.runner.setup()
+        if workers > 1:
+            # Before anything starts running in this loop, which the workers must not inherit
+            self._cluster = cluster.fork_workers(workers - 1, functools.partial(self._run_worker, host=HOST), uvloop)
+
+        self._start_services()
 
-        # Bind to host/port
-        site = web.TCPSite(self.runner, host=HOST, port=self._start_args['port'])
-        await site.start()
+        # Launch the browser to the starting URLs
+        self.show(*start_urls)
+
+        await self._serve(HOST)
+        if self._cluster is not None:
+            await self._cluster.open(self._on_cluster_message, self._on_cluster_closed)
+        for state in self._shared_states.values():
+            if state.changed:
+                self._schedule_state_flush(state)   # Changed before start(), with no loop to flush on
+
+    def _start_services(self) -> None:
+        # Per process: also run by each worker of a multi-worker setup
+        if self._start_args.get('monitor_loop_lag') or self._start_args.get('shed_load_lag') is not None:
+            self._lag_monitor = LoopLagMonitor()
+            self._lag_monitor.start()
+
+        record_frames = self._start_args.get('record_frames')
+        if record_frames is not None:
+            if self._cluster is not None and self._cluster.is_worker:
+                root, ext = os.path.splitext(record_frames)
+                record_frames = '%s.worker%d%s' % (root, self._cluster.index, ext)
+            self.start_recording(record_frames)
+
+    async def _serve(self, host: str) -> None:
+        if self._start_args.get('serve', True):
+            self.runner = web.AppRunner(self.app, keepalive_timeout=self._start_args['keepalive_timeout'])
+            await self.runner.setup()
+
+            backlog = self._start_args['backlog']
+            is_worker = self._cluster is not None and self._cluster.is_worker
+            if self._listen_socket is not None and not is_worker:
+                await web.SockSite(self.runner, self._listen_socket, backlog=backlog).start()
+            elif self._start_args['port'] is not None:
+                # Bind to host/port; workers share it, and the kernel spreads connections over them
+                site = web.TCPSite(self.runner, host=host, port=self._start_args['port'], backlog=backlog,
+                                   reuse_port=True if self._cluster is not None else None)
+                await site.start()
+            unix_socket = self._start_args.get('unix_socket')
+            if unix_socket is not None and not is_worker:
+                await self._unix_site(unix_socket, backlog).start()
+        _running.add(self)
             
 
         # Register custom signal handler with asyncio to exit
-        signal.signal(signal.SIGINT, shutdown)   # Ctrl+C
-        signal.signal(signal.SIGBREAK, shutdown) # Ctrl+Break
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._closed = loop.create_future()
+        if threading.current_thread() is not threading.main_thread():
+            return      # Workers, stopped by the coordinator
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._on_exit_signal)   # Ctrl+C
+        except NotImplementedError:     # Windows event loops
+            signal.signal(signal.SIGINT, lambda signum, frame: loop.call_soon_threadsafe(self._on_exit_signal))
+        if hasattr(signal, 'SIGBREAK'):          # Windows only
+            signal.signal(signal.SIGBREAK, lambda signum, frame: loop.call_soon_threadsafe(self._on_exit_signal)) # Ctrl+Break
+
+    def _unix_site(self, path: str, backlog: int) -> web.BaseSite:
+        if path.startswith('\\\\.\\pipe\\'):
+            return web.NamedPipeSite(self.runner, path)     # Windows, with the proactor event loop
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.remove(path)     # Left over by a previous run that did not shut down
+        return web.UnixSite(self.runner, path, backlog=backlog)
+
+    async def _run_worker(self, index: int, sock: Any, host: str) -> None:
+        # Runs in a forked worker, in a new event loop
+        self._cluster = Cluster(index, [Channel(sock, 0)])
+        if self._listen_socket is not None:
+            self._listen_socket.close()     # The coordinator's; this worker binds its own
+        self.wait_ws_started = asyncio.get_running_loop().create_future()
+        self._heartbeats = HeartbeatMonitor(self._heartbeats.interval, self._heartbeats.timeout, self._reap)
+        self._start_services()
+        await self._serve(host)
+        await self._cluster.open(self._on_cluster_message, self._on_cluster_closed)
+        await self.wait_closed()
+
+    async def _on_cluster_message(self, channel: Channel, message: Dict[str, Any]) -> Any:
+        assert self._cluster is not None
+        op = message['op']
+        if op == 'broadcast':
+            if not self._cluster.is_worker:
+                self._cluster.relay(message['msg'], channel, message.get('call'))
+            for ws in self._connections.senders():
+                self._spawn_send(ws, message['msg'])
+        elif op == 'return':
+            if self._cluster.is_worker or not self._cluster.route_return(message['message']):
+                await self._process_message(message['message'], None)
+        elif op == 'connections':
+            channel.connections = message['count']
+            if not channel.connections:
+                self._schedule_detect_shutdown()
+        elif op == 'call':
+            options = self._functions.options(message['name'])
+            value = await self._invoke({'name': message['name'], 'args': message['args']}, None, options)
+            if isinstance(value, (Handle, Cursor)):
+                # Registered here, while the page calls on it through its own worker
+                raise TypeError('%r returned a handle or cursor, which a function exposed with '
+                                'coordinator=True cannot return to pages of workers' % (message['name'],))
+            return value
+        elif op == 'states':
+            names = [message['name']] if message.get('name') else list(self._shared_states)
+            snapshots = []
+            for name in names:
+                state = self._shared_states.get(name)
+                if state is not None:
+                    self._flush_state(state)
+                    snapshots.append(self._safe_json(state.snapshot()))
+            return snapshots
+        return None
+
+    def _on_cluster_closed(self, channel: Channel) -> None:
+        assert self._cluster is not None
+        if self._cluster.is_worker:
+            asyncio.ensure_future(self.shutdown())      # The coordinator is gone
+        elif not self._draining:
+            print('Worker %d exited' % channel.index)
+            channel.connections = 0
+            self._schedule_detect_shutdown()
+
+    def _report_connections(self) -> None:
+        if self._cluster is not None and self._cluster.is_worker:
+            self._cluster.coordinator.send({'op': 'connections', 'count': len(self._connections)})
+
+    def _pages_elsewhere(self) -> bool:
+        # Pages connected to other processes of a multi-worker setup
+        return self._cluster is not None and (self._cluster.is_worker or self._cluster.worker_connections() > 0)
 
     def show(self, *start_urls: str) -> None:
         ic(start_urls)
@@ -417,7 +1260,12 @@ class AsyncEel:
                               'pages':   self._start_args['geometry']}
 
             page = self._eel_js.replace('/** _py_functions **/',
-                                   '_py_functions: %s,' % list(self.__class__._exposed_functions.keys()))
+                                   '_py_functions: %s,' % self._functions.names())
+            page = page.replace('/** _path_prefix **/',
+                                '_prefix: %s,' % self._safe_json(self._start_args.get('path_prefix', '')))
+            page = page.replace('/** _chunk_size **/',
+                                '_chunk_size: %s,' % self._safe_json(self._start_args.get('chunk_size')))
+            page = page.replace('/** _chunk_streams **/', '_chunk_streams: %d,' % chunking.MAX_PENDING)
             page = page.replace('/** _start_geometry **/',
                                 '_start_geometry: %s,' % self._safe_json(start_geometry))
             result = web.Response(text=page, content_type="application/javascript")
@@ -431,7 +1279,7 @@ class AsyncEel:
         try:
             if not isinstance(self._start_args['default_path'], str):
                 raise TypeError("'default_path' start_arg/option must be of type str")
-            return self._static(path=self._start_args['default_path'])
+            return await self._static(args[0] if args else None, path=self._start_args['default_path'])
         except Exception as e:
             result = web.Response(text=f"(_root) Internal Server Error: {e}", status=500)
             sys.exit(1)
@@ -441,7 +1289,19 @@ class AsyncEel:
     async def _static(self, request, path=None):
         if path == None:
             path = request.match_info['path']
-        ic(f"_static: {path}, {request}")
+        started = time.perf_counter()
+        with self._activity('static'):
+            response = await self._serve_static(path)
+        if self._metrics is not None:
+            series = (os.path.splitext(path)[1] or '/') if response.status < 400 else 'unknown'
+            self._metrics.record('static', series, time.perf_counter() - started,
+                                 0, response.content_length or 0, response.status >= 400)
+        if tracer.enabled:
+            tracer.emit('static', path=path, status=response.status, duration=time.perf_counter() - started,
+                        bytes_out=response.content_length or 0)
+        return response
+
+    async def _serve_static(self, path: str):
         try:
             mime_type, _ = mimetypes.guess_type(path)
             response = None
@@ -465,7 +1325,6 @@ class AsyncEel:
             self._set_response_headers(response)
             
         except FileNotFoundError as file_not_found:
-            ic(file_not_found)
             # traceback.print_exc()  # Prints the full stack trace to stderr
             response = web.Response(text=f"Resource not found: {file_not_found}", status=404)
         except Exception as e:
@@ -475,13 +1334,20 @@ class AsyncEel:
             # sys.exit(1)
         return response
 
-    async def _websocket(self, request: web.Request) -> None:
-        websocket_loop_id = id(asyncio.get_event_loop)
-        ic(websocket_loop_id)
-        
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        conn: Any = None
+        liveness: Optional[Liveness] = None
         try:
             # ws = websocket._get_current_object()
-            ws = web.WebSocketResponse()
+            # Pongs are handled below, so the heartbeat monitor sees them
+            ws = DeflateWebSocket(autoping=False,
+                                  max_msg_size=self._start_args['ws_max_msg_size'],
+                                  compress=self._start_args['ws_compress'],
+                                  threshold=self._start_args['ws_compress_threshold'],
+                                  level=self._start_args['ws_compress_level'],
+                                  shared_context=self._start_args['ws_compress_shared_context'],
+                                  stats=self._compression,
+                                  receive_timeout=self._start_args['ws_receive_timeout'])
             await ws.prepare(request)
 
             for js_function in self._js_functions:
@@ -489,31 +1355,155 @@ class AsyncEel:
 
             # Get query param (like page)
             page = request.query.get("page", "default")
-            if page not in self._mock_queue_done:
-                for call in self._mock_queue:
-                    await self._repeated_send(ws, self._safe_json(call))
-                self._mock_queue_done.add(page)
-
-            self._websockets.append((page, ws))
+            # Pages sending a session id get a Session standing in for the websocket, which survives reconnects
+            conn, resumed = await self._open_session(request, ws, page)
+            if tracer.enabled:
+                tracer.emit('connect', conn='%x' % id(conn), page=page, resumed=resumed)
+            if self._recorder is not None:
+                self._recorder.opened(conn, page)
+            liveness = self._heartbeats.add(ws, conn, page)
+            reassembler = chunking.Reassembler(self._start_args['ws_max_msg_size'])
+
+            if not resumed:
+                messages, expired = self._mock_queue.take(page)
+                self._drop_mock_calls(expired)
+                for msg in messages:
+                    await self._repeated_send(conn, msg)
+
+                await self._send_state_snapshots(conn)
+
+                tags = [tag for tag in request.query.get('tags', '').split(',') if tag]
+                connection = self._connections.add(conn, page, conn.id if isinstance(conn, Session) else None, tags)
+                connection.lanes = LaneScheduler(self._start_args.get('lane_weights'), self._lane_stats)
+                self._report_connections()
 
             if not self.wait_ws_started.done():
                 self.wait_ws_started.set_result(True)
 
             async for msg in ws:
+                liveness.last_seen = time.monotonic()
                 if msg.type == web.WSMsgType.TEXT:
                     # await ws.send_str(f"Echo: {msg.data}")
-                    message = jsn.loads(msg.data)
-                    await self._process_message(message, ws)
+                    data = msg.data
+                    if data.startswith(chunking.PREFIX):
+                        try:
+                            data = reassembler.feed(data)
+                        except chunking.ChunkError:
+                            await ws.close(code=WSCloseCode.MESSAGE_TOO_BIG)
+                            break
+                        if data is None:
+                            continue    # More frames to come
+                    if self._recorder is not None:
+                        self._recorder.frame(conn, '>', data)
+                    connection = self._connections.get(conn)
+                    if connection is not None:
+                        connection.messages_in += 1
+                        connection.bytes_in += len(data)
+                    message = jsn.loads(data)
+                    if 'return' in message and self._cluster is not None and self._cluster.route_return(message):
+                        continue    # Reply to a call made by another process
+                    if 'call' in message:
+                        # Run calls concurrently so a slow call does not hold up the page's other calls
+                        self._spawn_call(self._process_message(message, conn, len(data)))
+                    else:
+                        await self._process_message(message, conn, len(data))
+                elif msg.type == web.WSMsgType.PING:
+                    await ws.pong(msg.data)
+                elif msg.type == web.WSMsgType.PONG:
+                    liveness.pong()
                 elif msg.type == web.WSMsgType.ERROR:
-                    self._websockets.remove((page, ws))
-                    break
+                    break       # Cleaned up below, like any other disconnect
+        except asyncio.TimeoutError:
+            await ws.close()    # Silent for longer than `ws_receive_timeout`
         except Exception as e:
+            if not ws.prepared:
+                raise       # Not a websocket handshake: aiohttp answers with the error
             print(f"_websocket Exception = {e}")
             # traceback.print_exc()  # Prints the full stack trace to stderr
         # finally:
-        self._websockets.remove((page, ws))
+        if conn is None:
+            await ws.close()    # Failed before the connection was set up
+            return ws
+        if tracer.enabled:
+            tracer.emit('disconnect', conn='%x' % id(conn), page=page)
+        if self._recorder is not None:
+            self._recorder.closed(conn)
+        self._heartbeats.remove(ws)
+        if conn in self._connections and (liveness is None or not liveness.reaped):
+            await self._connection_lost(page, conn, ws)
+        return ws
+
+    async def _connection_lost(self, page: str, conn: Any, ws: web.WebSocketResponse) -> None:
+        if self._draining:
+            pass    # shutdown() is closing everything
+        elif isinstance(conn, Session):
+            if conn.ws is ws:
+                conn.detach()
+                if ws.close_code == WSCloseCode.GOING_AWAY:
+                    # The page was closed or navigated away, so it will not be back to resume
+                    await self._connection_gone(page, conn)
+                else:
+                    # Keep the session for a while, so the page can reconnect and resume
+                    conn.expiry = asyncio.get_running_loop().call_later(
+                        self._start_args.get('resume_window', 10.0),
+                        lambda: asyncio.ensure_future(self._expire_session(conn)))
+        else:
+            await self._connection_gone(page, conn)
+
+    def _reap(self, liveness: Liveness) -> None:
+        # No message or pong for too long: treat the connection as closed now, the socket may never say so
+        if tracer.enabled:
+            tracer.emit('reap', conn='%x' % id(liveness.conn), page=liveness.page,
+                        idle=time.monotonic() - liveness.last_seen)
+        asyncio.ensure_future(self._connection_lost(liveness.page, liveness.conn, liveness.ws))
+        asyncio.ensure_future(liveness.ws.close(code=RECONNECT, message=b'Heartbeat timeout'))
+
+    async def _open_session(self, request: web.Request, ws: web.WebSocketResponse, page: str) -> Tuple[Any, bool]:
+        session_id = request.query.get('session')
+        if session_id is None or not self._start_args.get('resume_window', 10.0):
+            return ws, False
+        received = int(request.query.get('ack', 0))
+        connection = self._connections.by_session(session_id)
+        session = connection.conn if connection is not None else None
+        resumed = False
+        if session is not None and session.page == page:
+            if session.ws is not None:
+                # The page reconnected before its old websocket was seen to drop, so that one is dead
+                asyncio.ensure_future(session.ws.close())
+                session.detach()
+            resumed = await session.attach(ws, received)
+        # Not counted in the session's sequence, so it is sent on the websocket directly
+        await ws.send_str(jsn.dumps({'session': {'id': session_id, 'resumed': resumed}}))
+        if resumed:
+            return session, True
+        if session is not None:
+            await self._expire_session(session)
+        session = Session(session_id, page, ws, self._start_args.get('resume_buffer', 1000),
+                          self._start_args.get('resume_buffer_chars', 64 * 1024 * 1024))
+        return session, False
+
+    async def _expire_session(self, session: Session) -> None:
+        if session.expiry is not None:
+            session.expiry.cancel()
+            session.expiry = None
+        if session in self._connections:
+            await self._connection_gone(session.page, session)
+
+    async def _connection_gone(self, page: str, conn: Any) -> None:
+        self._release_handle_objects(self._handles.release_all(conn))
+        self._connections.remove(conn)
+        self._report_connections()
+        if not self._connections and not self._pages_elsewhere():
+            self._fail_pending_js_calls()
         await self._websocket_close(page)
 
+    def _fail_pending_js_calls(self) -> None:
+        # Every page gets every call, so calls still waiting once the last page is gone will never be answered
+        lost = {'status': 'error', 'error': 'Connection lost', 'stack': ''}
+        callbacks, self._call_return_callbacks = self._call_return_callbacks, {}
+        for callback, error_callback in callbacks.values():
+            asyncio.ensure_future(self._run_return_callback(lost, callback, error_callback))
+
     def register_eel_routes(self, app: web.Application) -> None:
         # print(f"register_eel_routes:")
         '''Register the required eel routes with `app`.
@@ -534,69 +1524,395 @@ class AsyncEel:
             >>> eel.start(app=middleware)
 
         '''
-        for add_route_path, route_params in self.BOTTLE_ROUTES.items():
+        routes = self.BOTTLE_ROUTES
+        if self._start_args.get('metrics_route'):
+            # Must come before the catch-all static route
+            routes = {'/eel/metrics': (self._metrics_route, dict()), **routes}
+        prefix = self._start_args.get('path_prefix', '')
+        for add_route_path, route_params in routes.items():
             route_func, route_kwargs = route_params
             ic(add_route_path)
-            app.router.add_get(add_route_path, route_func, **route_kwargs)
+            app.router.add_get(prefix + add_route_path, route_func, **route_kwargs)
+
+
+    async def _metrics_route(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.metrics_text(),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
 
 
     def _safe_json(self, obj: Any) -> str:
         return jsn.dumps(obj, default=lambda o: None)
 
 
-    async def _repeated_send(self, ws: Websocket, msg: str) -> None:
+    async def _repeated_send(self, ws: Websocket, msg: str, ref: Optional[str] = None, lane: str = 'control') -> None:
         # print(f"_repeated_send: {msg}")
+        # *ref*: id of the call *msg* answers, for the page's progress reports on chunked messages
+        if self._recorder is not None:
+            self._recorder.frame(ws, '<', msg)
+        connection = self._connections.get(ws)
+        lanes = None
+        if connection is not None:
+            connection.messages_out += 1
+            connection.bytes_out += len(msg)
+            lanes = connection.lanes
+        chunk_size = self._start_args.get('chunk_size')
+        if chunk_size is None or len(msg) <= chunk_size:
+            await self._send_frame(ws, msg, lanes, lane)
+            return
+        self._chunk_number += 1
+        for frame in chunking.frames(msg, chunk_size, self._chunk_number, ref):
+            await self._send_frame(ws, frame, lanes, lane)
+            await asyncio.sleep(0)      # Other messages to this page go out in between
+
+    async def _send_frame(self, ws: Websocket, frame: str, lanes: Optional[LaneScheduler] = None,
+            lane: str = 'control') -> None:
+        window = self._start_args.get('bulk_window')
+        if lane == 'bulk' and window is not None and isinstance(ws, Session):
+            await ws.wait_window(window)    # Before the turn, which control frames can take meanwhile
+        # Pages not registered yet (messages queued for them, state snapshots) are sent to directly
+        if lanes is None:
+            await self._write_frame(ws, frame)
+            return
+        async with lanes.turn(lane, len(frame)):
+            await self._write_frame(ws, frame)
+
+    async def _write_frame(self, ws: Websocket, frame: str) -> None:
         for attempt in range(100):
             try:
-                await ws.send_str(msg)
+                await ws.send_str(frame)
                 break
             except Exception:
                 await asyncio.sleep(0.001)
 
 
-    async def _process_message(self, rcv_message: Dict[str, Any], ws: Websocket) -> None:
-        ic(rcv_message)
-
+    async def _process_message(self, rcv_message: Dict[str, Any], ws: Websocket, size: int = 0) -> None:
         if 'call' in rcv_message:
-            error_info = {}
-            try:
-                callback = self.__class__._exposed_functions[rcv_message['name']]
-                if asyncio.iscoroutinefunction(callback):
-                    return_val = await callback(*rcv_message['args'])
-                else:
-                    return_val = callback(*rcv_message['args'])
-                status = 'ok'
-            except Exception as e:
-                err_traceback = traceback.format_exc()
-                traceback.print_exc()
-                return_val = None
-                status = 'error'
-                error_info['errorText'] = repr(e)
-                error_info['errorTraceback'] = err_traceback
-            await self._repeated_send(ws, self._safe_json({ 'return': rcv_message['call'],
-                                            'status': status,
-                                            'value': return_val,
-                                            'error': error_info,}))
+            await self._process_call(rcv_message, ws, size)
         elif 'return' in rcv_message:
             call_id = rcv_message['return']
+            if call_id in self._js_calls_started:
+                name, started, sent = self._js_calls_started.pop(call_id)
+                duration = time.perf_counter() - started
+                failed = rcv_message.get('status') != 'ok'
+                if self._metrics is not None:
+                    self._metrics.record('js', name, duration, size, sent, failed)
+                if tracer.enabled:
+                    tracer.emit('js_call', call=call_id, name=name, conn='%x' % id(ws), duration=duration,
+                                status=rcv_message.get('status'), bytes_in=size, bytes_out=sent)
             if call_id in self._call_return_callbacks:
                 callback, error_callback = self._call_return_callbacks.pop(call_id)
-
-                if rcv_message['status'] == 'ok':
-                    if asyncio.iscoroutinefunction(callback):
-                        await callback(rcv_message['value'])
-                    else:
-                        callback(rcv_message['value'])
-                elif rcv_message['status'] == 'error' and error_callback is not None:
-                    if asyncio.iscoroutinefunction(callback):
-                        await error_callback(rcv_message['error'], rcv_message['stack'])
-                    else:
-                        error_callback(rcv_message['error'], rcv_message['stack'])
+                with self._activity('return_callback'):
+                    await self._run_return_callback(rcv_message, callback, error_callback)
             else:
                 self._call_return_values[call_id] = rcv_message['value']
 
+        elif 'ack' in rcv_message:
+            if isinstance(ws, Session):
+                ws.ack(rcv_message['ack'])
+
+        elif 'tags' in rcv_message:
+            connection = self._connections.get(ws)
+            if connection is not None:
+                self._connections.untag(ws, *connection.tags)
+                self._connections.tag(ws, *rcv_message['tags'])
+
+        elif 'handle_release' in rcv_message:
+            self._release_handle_objects([self._handles.release(ws, rcv_message['handle_release'])])
+
+        elif 'state_sync' in rcv_message:
+            await self._send_state_snapshots(ws, rcv_message['state_sync'])
+
         else:
-            print ('  _process_message: Invalid message received: ', message)
+            print ('  _process_message: Invalid message received: ', rcv_message)
+
+
+    async def _run_return_callback(self, rcv_message: Dict[str, Any], callback: Callable[..., Any],
+            error_callback: Optional[Callable[..., Any]]) -> None:
+        if rcv_message['status'] == 'ok':
+            if asyncio.iscoroutinefunction(callback):
+                await callback(rcv_message['value'])
+            else:
+                callback(rcv_message['value'])
+        elif rcv_message['status'] == 'error' and error_callback is not None:
+            if asyncio.iscoroutinefunction(error_callback):
+                await error_callback(rcv_message['error'], rcv_message['stack'])
+            else:
+                error_callback(rcv_message['error'], rcv_message['stack'])
+
+    def _spawn_send(self, ws: WebSocketT, msg: str) -> None:
+        # Tracked, so shutdown() can flush them
+        task = asyncio.ensure_future(self._repeated_send(ws, msg))
+        self._send_tasks.add(task)
+        task.add_done_callback(self._send_tasks.discard)
+
+    def _spawn_call(self, coro: Any) -> None:
+        task = asyncio.ensure_future(coro)
+        self._call_tasks.add(task)
+        task.add_done_callback(self._call_tasks.discard)
+
+    async def _process_call(self, rcv_message: Dict[str, Any], ws: WebSocketT, size: int = 0) -> None:
+        started = time.perf_counter()
+        # Before the call, which may release the handle it is made on
+        series = self._call_series(rcv_message, ws) if self._metrics is not None else ''
+        connection = self._connections.get(ws)
+        if connection is not None:
+            connection.pending_calls += 1
+        try:
+            status, reply = await self._call_reply(rcv_message, ws)
+        finally:
+            if connection is not None:
+                connection.pending_calls -= 1
+        if self._metrics is not None:
+            # Up to the reply being ready: sending it depends on the page and the lanes, not on the function
+            self._metrics.record('py', series, time.perf_counter() - started, size, len(reply), status != 'ok')
+        await self._repeated_send(ws, reply, self._safe_json(rcv_message['call']), self._reply_lane(rcv_message))
+        if tracer.enabled:
+            tracer.emit('py_call', call=rcv_message['call'], name=rcv_message['name'], handle=rcv_message.get('handle'),
+                        conn='%x' % id(ws), status=status, duration=time.perf_counter() - started,
+                        bytes_in=size, bytes_out=len(reply))
+
+    def _call_series(self, rcv_message: Dict[str, Any], ws: WebSocketT) -> str:
+        # Metrics are kept per name the app defines; any other name a page sends shares one series
+        name = rcv_message['name']
+        if 'handle' not in rcv_message:
+            return name if name in self._functions else 'unknown'
+        if name in ('__len__', '__getitem__', '__slice__'):
+            return 'handle.' + name
+        try:
+            obj = self._handles.get(ws, rcv_message['handle'])
+        except (KeyError, TypeError):
+            return 'unknown'
+        if isinstance(name, str) and not name.startswith('_') and hasattr(obj, name):
+            return 'handle.' + name
+        return 'unknown'
+
+    def _reply_lane(self, rcv_message: Dict[str, Any]) -> str:
+        # The call's own lane, else its function's; unknown lanes from the page are ignored
+        lane = rcv_message.get('lane')
+        if lane in LANES:
+            return lane
+        if 'handle' in rcv_message:
+            return 'control'
+        return self._functions.options(rcv_message['name']).get('lane', 'control')
+
+    async def _call_reply(self, rcv_message: Dict[str, Any], ws: WebSocketT) -> Tuple[str, str]:
+        # Return the status and the encoded 'return' message for a call.
+        name = rcv_message['name']
+        deadline = None
+        timeout = rcv_message.get('timeout')
+        if timeout is not None:
+            if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not math.isfinite(timeout):
+                # Replied to, like any failed call, so the caller does not wait forever
+                error_info = {'errorText': 'Invalid timeout %r, expected a number of milliseconds' % (timeout,)}
+                return 'error', self._encode_return(rcv_message['call'], 'error', 'null', error_info)
+            # The caller's budget (ms) starts when the call is received
+            deadline = asyncio.get_running_loop().time() + timeout / 1000.0
+        options = {} if 'handle' in rcv_message else self._functions.options(name)
+
+        if self._draining:
+            error_info = {'errorText': 'Server shutting down'}
+            return 'busy', self._encode_return(rcv_message['call'], 'busy', 'null', error_info)
+
+        cache = self._functions.cache(name) if options.get('cache') else None
+        if cache is not None:
+            cache_key = cache.key(rcv_message['args'])
+            encoded = cache.get(cache_key)
+            if encoded is not None:
+                return 'ok', self._encode_return(rcv_message['call'], 'ok', encoded)
+
+        shed_lag = self._start_args.get('shed_load_lag')
+        if shed_lag is not None and self._lag_monitor is not None and self._lag_monitor.lag > shed_lag \
+                and priority_value(options.get('priority', 'normal')) >= PRIORITIES['low']:
+            self._shed_calls += 1
+            error_info = {'errorText': 'Server busy (event loop lag %.0f ms)' % (self._lag_monitor.lag * 1000)}
+            return 'busy', self._encode_return(rcv_message['call'], 'busy', 'null', error_info)
+
+        if options.get('coalesce'):
+            flight_key = (name, ResultCache.key(rcv_message['args']))
+            flight = self._inflight_calls.get(flight_key)
+            if flight is not None:
+                # Identical call already running: share its outcome
+                self._coalesced_counts[name] = self._coalesced_counts.get(name, 0) + 1
+            else:
+                # Detached and without a deadline: the callers wait for it each with their own,
+                # and cancelling the first caller does not cancel it for the others
+                flight = asyncio.ensure_future(self._run_call(rcv_message, ws, options))
+                self._inflight_calls[flight_key] = flight
+                flight.add_done_callback(lambda _: self._inflight_calls.pop(flight_key, None))
+                self._call_tasks.add(flight)
+                flight.add_done_callback(self._call_tasks.discard)
+            outcome = await self._wait_flight(flight, rcv_message, deadline)
+        else:
+            outcome = await self._run_call(rcv_message, ws, options, deadline)
+
+        status, return_val, encoded, error_info = outcome
+        if encoded is None:
+            # By-reference values are registered for each receiving connection
+            encoded = self._safe_json(self._wrap_return_value(return_val, ws))
+        elif cache is not None and status == 'ok':
+            cache.put(cache_key, encoded)
+        return status, self._encode_return(rcv_message['call'], status, encoded, error_info)
+
+    async def _wait_flight(self, flight: asyncio.Future, rcv_message: Dict[str, Any],
+            deadline: Optional[float]) -> Tuple[str, Any, Optional[str], Dict[str, Any]]:
+        # Outcome of a shared execution, or a timeout once this caller's deadline passed
+        try:
+            if deadline is None:
+                return await asyncio.shield(flight)
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            return await asyncio.wait_for(asyncio.shield(flight), remaining)
+        except asyncio.TimeoutError:
+            # _run_call returns every error as an outcome, so this is the deadline
+            return 'timeout', None, 'null', {'errorText': 'Deadline of %s ms exceeded' % rcv_message.get('timeout')}
+
+    async def _run_call(self, rcv_message: Dict[str, Any], ws: WebSocketT, options: Dict[str, Any],
+            deadline: Optional[float] = None) -> Tuple[str, Any, Optional[str], Dict[str, Any]]:
+        # Execute a call and return (status, value, encoded value, error info).
+        # The encoded value is None for values returned by reference.
+        error_info: Dict[str, Any] = {}
+        try:
+            invocation = self._invoke(rcv_message, ws, options)
+            if deadline is None:
+                return_val = await invocation
+            else:
+                return_val = await self._invoke_until(invocation, deadline)
+            status = 'ok'
+        except _DeadlineExceeded:
+            return_val = None
+            status = 'timeout'
+            error_info['errorText'] = 'Deadline of %s ms exceeded' % rcv_message.get('timeout')
+        except SchedulerBusy as e:
+            return_val = None
+            status = 'busy'
+            error_info['errorText'] = str(e)
+        except Exception as e:
+            err_traceback = traceback.format_exc()
+            traceback.print_exc()
+            return_val = None
+            status = 'error'
+            error_info['errorText'] = repr(e)
+            error_info['errorTraceback'] = err_traceback
+
+        if isinstance(return_val, (Handle, Cursor)):
+            return status, return_val, None, error_info
+        return status, return_val, self._safe_json(return_val), error_info
+
+    async def _invoke_until(self, invocation: Any, deadline: float) -> Any:
+        # Unlike wait_for, tells the deadline apart from a TimeoutError raised by the function itself
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            invocation.close()      # Expired while queued: nobody is waiting for the result anymore
+            raise _DeadlineExceeded()
+        task = asyncio.ensure_future(invocation)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=remaining)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if not done:
+            task.cancel()
+            await asyncio.wait({task})      # Let it unwind, e.g. release its scheduler slot
+            raise _DeadlineExceeded()
+        return task.result()
+
+    async def _invoke(self, rcv_message: Dict[str, Any], ws: WebSocketT, options: Dict[str, Any]) -> Any:
+        if 'handle' in rcv_message:
+            with self._activity('handle.' + rcv_message['name']):
+                return_val = self._handles.invoke(ws, rcv_message['handle'], rcv_message['name'], rcv_message['args'])
+                if asyncio.iscoroutine(return_val):
+                    return_val = await return_val
+            return return_val
+
+        if options.get('coordinator') and self._cluster is not None and self._cluster.is_worker:
+            return await self._cluster.coordinator.request({'op': 'call', 'name': rcv_message['name'],
+                                                            'args': rcv_message['args']})
+
+        callback = self._functions.function(rcv_message['name'])
+        async with self._scheduler.slot(rcv_message['name'], options):
+            with self._activity(rcv_message['name']):
+                if asyncio.iscoroutinefunction(callback):
+                    return await callback(*rcv_message['args'])
+                else:
+                    return callback(*rcv_message['args'])
+
+    def _activity(self, label: str) -> Any:
+        if self._lag_monitor is None:
+            return nullcontext()
+        return self._lag_monitor.activity(label)
+
+    def _encode_return(self, call_id: Any, status: str, encoded_value: str, error_info: Optional[Dict[str, Any]] = None) -> str:
+        # Assemble the reply around an already encoded value, so cached values
+        # are not serialized again.
+        return '{"return": %s, "status": "%s", "value": %s, "error": %s}' % (
+            self._safe_json(call_id), status, encoded_value, self._safe_json(error_info or {}))
+
+    def _wrap_return_value(self, value: Any, ws: WebSocketT) -> Any:
+        # Replace by-reference return values with their wire representation.
+        if isinstance(value, Handle):
+            return self._handles.add(ws, value.obj)
+        if isinstance(value, Cursor):
+            info = self._handles.add(ws, value, kind='cursor')
+            value._bind(lambda: self._handles.release(ws, info['__eel_handle__']))
+            return info
+        return value
+
+    def _release_handle_objects(self, objs: List[Any]) -> None:
+        for obj in objs:
+            if isinstance(obj, Cursor):
+                asyncio.ensure_future(obj.close())
+
+
+    def _schedule_state_flush(self, state: SharedState) -> None:
+        # Batch all mutations done in the current loop iteration into one patch.
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return      # Not started: the changes stay pending, and start() flushes them
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.call_soon(self._flush_state, state)
+        else:
+            loop.call_soon_threadsafe(self._flush_state, state)     # Changed from another thread
+
+    def _flush_state(self, state: SharedState) -> None:
+        patch = state.take_patch()
+        if patch is None:
+            return
+        if self._cluster is not None:
+            if self._cluster.is_worker:
+                # Pages of workers mirror the coordinator's states, so the change reaches no page
+                if state.name not in self._worker_state_warnings:
+                    self._worker_state_warnings.add(state.name)
+                    warnings.warn('Shared state %r was changed in worker %d and pages will not see it: change shared '
+                                  'states in the coordinator, e.g. in functions exposed with coordinator=True'
+                                  % (state.name, self._cluster.index), RuntimeWarning)
+                return
+            self._cluster.publish(self._safe_json(patch))
+        if not self._connections:
+            return
+        msg = self._safe_json(patch)
+        for ws in self._connections.senders():
+            self._spawn_send(ws, msg)
+
+    async def _send_state_snapshot(self, ws: WebSocketT, state: SharedState) -> None:
+        self._flush_state(state)
+        await self._repeated_send(ws, self._safe_json(state.snapshot()))
+
+    async def _send_state_snapshots(self, ws: WebSocketT, name: Optional[str] = None) -> None:
+        # All states, or the state *name*
+        if self._cluster is not None and self._cluster.is_worker:
+            # Pages of workers mirror the coordinator's states
+            for msg in await self._cluster.coordinator.request({'op': 'states', 'name': name}):
+                await self._repeated_send(ws, msg)
+            return
+        states = self._shared_states.values() if name is None else [self._shared_states.get(name)]
+        for state in states:
+            if state is not None:
+                await self._send_state_snapshot(ws, state)
 
 
     def _get_real_path(self, path: str) -> str:
@@ -606,6 +1922,27 @@ class AsyncEel:
             return os.path.abspath(path)
 
 
+    def declare_js_functions(self, *names: str) -> None:
+        '''Make JavaScript functions callable from Python by name.
+
+        :func:`init` finds the functions exposed with :code:`eel.expose` by
+        scanning the web folder. Functions exposed in code that is not there,
+        e.g. generated at runtime or by a
+        :class:`async_eel.headless.HeadlessPage`, are declared with this.
+
+        :Example:
+
+            >>> eel.declare_js_functions('show_progress')
+            >>> eel.show_progress(50)
+        '''
+        for name in names:
+            if name not in self._js_functions:
+                self._js_functions.append(name)
+            if self._connections:
+                self._import_js_function(name)
+            else:
+                self._mock_js_function(name)
+
     def _mock_js_function(self, js_function: str) -> None:
         ic(js_function)
         # exec('%s = lambda *args: _mock_call("%s", args)' % (js_function, js_function), globals())
@@ -633,16 +1970,38 @@ class AsyncEel:
 
 
     def _mock_call(self, name: str, args: Any) -> Callable[[Optional[Callable[..., Any]], Optional[Callable[..., Any]]], Any]:
-        ic(f"_mock_call: {name}, {args}")
         call_object = self._call_object(name, args)
-        self._mock_queue += [call_object]
+        if tracer.enabled:
+            tracer.emit('js_mock_call', call=call_object['call'], name=name)
+        self._drop_mock_calls(self._mock_queue.push(call_object['call'], name, self._safe_json(call_object)))
         return self._call_return(call_object)
 
+    def _drop_mock_calls(self, dropped: List[PendingCall]) -> None:
+        # Calls no page received will never be answered
+        expired = {'status': 'error', 'error': 'Expired before a page connected', 'stack': ''}
+        for call in dropped:
+            if tracer.enabled:
+                tracer.emit('js_mock_drop', call=call.call_id, name=call.name, delivered=len(call.delivered))
+            if call.delivered:
+                continue
+            callbacks = self._call_return_callbacks.pop(call.call_id, None)
+            if callbacks is not None:
+                asyncio.ensure_future(self._run_return_callback(expired, *callbacks))
+
 
     def _js_call(self, name: str, args: Any) -> Callable[[Optional[Callable[..., Any]], Optional[Callable[..., Any]]], Any]:
         call_object = self._call_object(name, args)
-        for _, ws in self._websockets:
-            asyncio.create_task(self._repeated_send(ws, self._safe_json(call_object)))
+        msg = self._safe_json(call_object)
+        senders = self._connections.senders()
+        for ws in senders:
+            self._spawn_send(ws, msg)
+        if self._cluster is not None:
+            self._cluster.publish(msg, call_object['call'])
+        if self._metrics is not None or tracer.enabled:
+            if len(self._js_calls_started) >= 10000:
+                # Calls never answered (e.g. function not exposed in JS): forget the oldest
+                del self._js_calls_started[next(iter(self._js_calls_started))]
+            self._js_calls_started[call_object['call']] = (name, time.perf_counter(), len(msg) * len(senders))
         return self._call_return(call_object)
 
     class CallAnswer:
@@ -672,7 +2031,6 @@ class AsyncEel:
 
 
     def _call_return(self, call: Dict[str, Any]) -> Callable[[Optional[Callable[..., Any]], Optional[Callable[..., Any]]], Any]:
-        ic(call)
         call_id = call['call']
 
         # async def return_func(callback: Optional[Callable[..., Any]] = None,
@@ -688,21 +2046,28 @@ class AsyncEel:
         # return return_func
         return AsyncEel.CallAnswer(self, call_id)
 
-    @classmethod
-    def _expose(cls, expose_name: str, function: Callable[..., Any]) -> None:
+    @hybridmethod
+    def _expose(target, expose_name: str, function: Callable[..., Any], options: Optional[Dict[str, Any]] = None) -> None:
         ic(expose_name)
-        msg = 'Already exposed function with name "%s"' % expose_name
-        assert expose_name not in cls._exposed_functions, msg
-        cls._exposed_functions[expose_name] = function
+        options = options or {}
+        priority_value(options.get('priority', 'normal'))    # Validate
+        check_lane(options.get('lane', 'control'))
+        if options.get('max_concurrency') is not None and options['max_concurrency'] < 1:
+            raise ValueError('max_concurrency must be at least 1, got %r' % options['max_concurrency'])
+        cache = None
+        if options.get('cache'):
+            maxsize = 128 if options['cache'] is True else options['cache']
+            cache = ResultCache(maxsize, options.get('cache_ttl'))
+        target._functions.add(expose_name, function, options, cache)
 
 
     def _detect_shutdown(self) -> None:
         etect_shutdown = True
         ic(etect_shutdown)
 
-        if len(self._websockets) == 0:
+        if not self._connections and not self._pages_elsewhere() and not self._draining:
             # sys.exit()
-            quit()
+            asyncio.ensure_future(self._shutdown_and_exit())
 
 
     async def _websocket_close(self, page: str) -> None:
@@ -714,7 +2079,7 @@ class AsyncEel:
         if close_callback is not None:
             if not callable(close_callback):
                 raise TypeError("'close_callback' start_arg/option must be callable or None")
-            sockets = [p for _, p in self._websockets]
+            sockets = self._connections.senders()
 
             if asyncio.iscoroutinefunction(close_callback):
                 await close_callback(page, sockets)
@@ -723,8 +2088,15 @@ class AsyncEel:
         # if self.runner:
             # await self.runner.cleanup()  # Clean up aiohttp resources
         # sys.exit(0)
+        self._schedule_detect_shutdown()
+
+    def _schedule_detect_shutdown(self) -> None:
+        # Give a reloading page, or one opening the next page, time to connect before checking
+        asyncio.get_running_loop().call_later(self._start_args.get('shutdown_delay', 1.0), self._try_detect_shutdown)
+
+    def _try_detect_shutdown(self) -> None:
         try:
-            quit()
+            self._detect_shutdown()     # Only quit when the last page is gone
         except Exception as e: 
             print(f"_websocket_close Exception = {e}")
 
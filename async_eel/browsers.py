@@ -28,15 +28,19 @@ def _build_url_from_dict(page: Dict[str, str], options: OptionsDictT) -> str:
     host = page.get('host', 'localhost')
     port = page.get('port', options["port"])
     path = page.get('path', '')
+    if port is None:    # Served on a Unix socket only
+        return '%s://%s%s/%s' % (scheme, host, options.get('path_prefix', ''), path)
     if not isinstance(port, (int, str)):
         raise TypeError("'port' option must be an integer")
-    return '%s://%s:%d/%s' % (scheme, host, int(port), path)
+    return '%s://%s:%d%s/%s' % (scheme, host, int(port), options.get('path_prefix', ''), path)
 
 
 def _build_url_from_string(page: str, options: OptionsDictT) -> str:
+    if options['port'] is None:     # Served on a Unix socket only
+        return 'http://localhost%s/%s' % (options.get('path_prefix', ''), page)
     if not isinstance(options['port'], (int, str)):
         raise TypeError("'port' option must be an integer")
-    base_url = 'http://%s:%d/' % (options['host'], int(options['port']))
+    base_url = 'http://%s:%d%s/' % (options['host'], int(options['port']), options.get('path_prefix', ''))
     return base_url + page
 
 
@@ -0,0 +1,73 @@
+from __future__ import annotations
+import json as jsn
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Result cache for exposed functions.
+#
+# Entries are keyed by the canonical JSON encoding of the call arguments and
+# hold the already JSON-encoded return value, so a hit skips both the call
+# and the serialization of the reply.
+
+
+class ResultCache:
+    '''LRU cache with optional time-to-live for the encoded results of one function.
+
+    :param maxsize: Maximum number of entries before the least recently used
+        one is evicted.
+    :param ttl: Seconds an entry stays valid, or `None` for no expiry.
+    '''
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        if maxsize <= 0:
+            raise ValueError('Cache maxsize must be positive, got %r' % maxsize)
+        if ttl is not None and ttl <= 0:
+            raise ValueError('Cache ttl must be positive or None, got %r' % ttl)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(args: Any) -> str:
+        '''Canonical key for a list of JSON arguments.'''
+        return jsn.dumps(args, sort_keys=True, separators=(',', ':'), default=repr)
+
+    def get(self, key: str) -> Optional[str]:
+        '''Return the encoded value stored for *key*, or `None` on a miss.'''
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, encoded = entry
+            if expires >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return encoded
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, encoded: str) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float('inf')
+        self._entries[key] = (expires, encoded)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        '''Drop the entry for *key*, or every entry if *key* is `None`.'''
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl}
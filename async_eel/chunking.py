@@ -0,0 +1,73 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional
+
+# Large messages in bounded frames.
+#
+# A message longer than the chunk size (in characters) is sent as a series of
+# frames
+#
+#     chunk:<id>:<part>:<parts>:<ref>:<next piece of the message>
+#
+# where <ref> is the id of the call the message answers, if any, so the page
+# can report progress on it. Messages are JSON objects, so they never start
+# with 'chunk:'. Senders yield between frames: small messages, and the frames
+# of other large messages, go out in between instead of queueing behind one
+# giant frame. Every frame counts as a message for session resume, so a page
+# that reconnects gets the rest of a message it was receiving. async_eel.js
+# splits and reassembles messages the same way. Receivers hold at most
+# MAX_PENDING messages part-way, so senders start no more than that at once.
+
+PREFIX = 'chunk:'
+MAX_PENDING = 16
+
+
+class ChunkError(ValueError):
+    '''A chunked message that is out of order or too large.'''
+
+
+def frames(msg: str, chunk_size: int, stream_id: int, ref: Optional[str] = None) -> Iterator[str]:
+    '''The frames carrying *msg*, in order.'''
+    parts = -(-len(msg) // chunk_size)
+    ref = ref if ref is not None else ''
+    for part in range(parts):
+        yield '%s%d:%d:%d:%s:' % (PREFIX, stream_id, part, parts, ref) + msg[part * chunk_size:(part + 1) * chunk_size]
+
+
+class Reassembler:
+    '''Puts chunked messages back together, for one connection.
+
+    :param max_size: Largest message, in characters, or `0` for no limit.
+    :param max_pending: Most messages being received at the same time.
+    '''
+
+    def __init__(self, max_size: int = 0, max_pending: int = MAX_PENDING):
+        self.max_size = max_size
+        self.max_pending = max_pending
+        self._pending: Dict[str, List[Any]] = {}   # id -> [pieces, characters so far]
+
+    def feed(self, frame: str) -> Optional[str]:
+        '''Add *frame*; returns the message it completes, else `None`.'''
+        try:
+            stream_id, part, parts, _ref, piece = frame[len(PREFIX):].split(':', 4)
+            part_number, part_count = int(part), int(parts)
+        except ValueError:
+            raise ChunkError('Malformed chunk header') from None
+        if part_number == 0:
+            if len(self._pending) >= self.max_pending:
+                raise ChunkError('More than %d chunked messages at once' % self.max_pending)
+            self._pending[stream_id] = [[], 0]
+        entry = self._pending.get(stream_id)
+        if entry is None or len(entry[0]) != part_number:
+            raise ChunkError('Chunk %s of message %s out of order' % (part, stream_id))
+        entry[0].append(piece)
+        entry[1] += len(piece)
+        if self.max_size and entry[1] > self.max_size:
+            del self._pending[stream_id]
+            raise ChunkError('Chunked message larger than %d characters' % self.max_size)
+        if part_number + 1 < part_count:
+            return None
+        del self._pending[stream_id]
+        return ''.join(entry[0])
+
+    def __len__(self) -> int:
+        return len(self._pending)
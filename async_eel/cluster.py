@@ -0,0 +1,212 @@
+from __future__ import annotations
+import asyncio
+import itertools
+import json as jsn
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from . import loops
+
+# Multi-worker serving.
+#
+# With `start(workers=N)` the process forks N - 1 workers before opening its
+# server, and every process listens on the same port with SO_REUSEPORT, so
+# the kernel spreads connections over them. The original process is the
+# coordinator. Each worker talks to it over a socketpair, with one JSON
+# message per line:
+#
+# * broadcasts (calls to JS, state patches) are sent to the coordinator, which
+#   relays them to its own pages and every other worker;
+# * replies to a call to JS go back to the process that made the call;
+# * calls of functions exposed with `coordinator=True`, and shared state
+#   snapshots, are requests answered by the coordinator.
+
+MAX_TRACKED_CALLS = 10000
+
+MessageHandlerT = Callable[['Channel', Dict[str, Any]], Awaitable[Any]]
+
+
+class ClusterCallError(Exception):
+    '''Raised in a worker when a request to the coordinator fails.'''
+
+
+def supported() -> bool:
+    return hasattr(os, 'fork') and hasattr(socket, 'SO_REUSEPORT')
+
+
+class Channel:
+    '''Newline delimited JSON messages over a socket, with requests and replies.'''
+
+    def __init__(self, sock: socket.socket, index: int):
+        self.index = index      # Worker number
+        self.connections = 0    # Pages connected to that worker, as last reported
+        self._sock = sock
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._requests: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count(1)
+
+    async def open(self, on_message: MessageHandlerT, on_close: Callable[[Channel], None]) -> None:
+        reader, self._writer = await asyncio.open_unix_connection(sock=self._sock, limit=2 ** 26)
+        self._reader_task = asyncio.ensure_future(self._read(reader, on_message, on_close))
+
+    def send(self, message: Dict[str, Any]) -> None:
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(jsn.dumps(message, default=lambda o: None).encode() + b'\n')
+
+    async def request(self, message: Dict[str, Any]) -> Any:
+        request_id = next(self._request_ids)
+        future = self._requests[request_id] = asyncio.get_running_loop().create_future()
+        self.send(dict(message, request=request_id))
+        return await future
+
+    async def _read(self, reader: asyncio.StreamReader, on_message: MessageHandlerT,
+                    on_close: Callable[[Channel], None]) -> None:
+        try:
+            async for line in reader:
+                message = jsn.loads(line)
+                if 'reply' in message:
+                    future = self._requests.pop(message['reply'], None)
+                    if future is not None and not future.done():
+                        if 'error' in message:
+                            future.set_exception(ClusterCallError(message['error']))
+                        else:
+                            future.set_result(message.get('value'))
+                elif 'request' in message:
+                    asyncio.ensure_future(self._answer(message, on_message))
+                else:
+                    await on_message(self, message)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for future in self._requests.values():
+                if not future.done():
+                    future.set_exception(ClusterCallError('Coordinator connection closed'))
+            self._requests.clear()
+            on_close(self)
+
+    async def _answer(self, message: Dict[str, Any], on_message: MessageHandlerT) -> None:
+        try:
+            self.send({'reply': message['request'], 'value': await on_message(self, message)})
+        except Exception as e:
+            self.send({'reply': message['request'], 'error': '%s: %s' % (type(e).__name__, e)})
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        else:
+            self._sock.close()
+
+
+class Cluster:
+    '''This process's side of a multi-worker setup: the coordinator, or a worker.'''
+
+    def __init__(self, index: int, channels: List[Channel], processes: Optional[List[Any]] = None):
+        self.index = index
+        self.channels = channels
+        self.processes = processes or []
+        self._own: OrderedDict[Any, None] = OrderedDict()          # Calls to JS made in this process
+        self._origins: OrderedDict[Any, Channel] = OrderedDict()   # Coordinator: worker that made a call
+
+    @property
+    def is_worker(self) -> bool:
+        return self.index > 0
+
+    @property
+    def coordinator(self) -> Channel:
+        return self.channels[0]
+
+    async def open(self, on_message: MessageHandlerT, on_close: Callable[[Channel], None]) -> None:
+        for channel in self.channels:
+            await channel.open(on_message, on_close)
+
+    def publish(self, msg: str, call_id: Any = None) -> None:
+        '''Send *msg* to the pages of every other process.'''
+        if call_id is not None:
+            _remember(self._own, call_id, None)
+        if self.is_worker:
+            self.coordinator.send({'op': 'broadcast', 'msg': msg, 'call': call_id})
+        else:
+            self.relay(msg)
+
+    def relay(self, msg: str, source: Optional[Channel] = None, call_id: Any = None) -> None:
+        '''Coordinator: pass a broadcast from *source* on to the other workers.'''
+        if source is not None and call_id is not None:
+            _remember(self._origins, call_id, source)
+        for channel in self.channels:
+            if channel is not source:
+                channel.send({'op': 'broadcast', 'msg': msg})
+
+    def route_return(self, message: Dict[str, Any]) -> bool:
+        '''Send a reply to the process that made the call; `False` if that is this one.'''
+        call_id = message['return']
+        if call_id in self._own:
+            return False
+        if self.is_worker:
+            self.coordinator.send({'op': 'return', 'message': message})
+            return True
+        origin = self._origins.get(call_id)
+        if origin is None:
+            return False
+        origin.send({'op': 'return', 'message': message})
+        return True
+
+    def worker_connections(self) -> int:
+        return sum(channel.connections for channel in self.channels) if not self.is_worker else 0
+
+    def close(self) -> None:
+        for channel in self.channels:
+            channel.close()
+
+    async def join(self, timeout: float) -> None:
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+def _remember(table: OrderedDict, key: Any, value: Any) -> None:
+    table[key] = value
+    if len(table) > MAX_TRACKED_CALLS:
+        table.popitem(last=False)
+
+
+def fork_workers(count: int, run_worker: Callable[[int, socket.socket], Awaitable[None]],
+                 use_uvloop: bool = False) -> Cluster:
+    '''Fork *count* workers running the coroutine *run_worker(index, sock)*; returns the coordinator side.
+
+    Workers run their own event loop in a new thread, as the forked copy of
+    the coordinator's loop must not be used, and ignore Ctrl+C: the
+    coordinator shuts them down by closing their channel. With *use_uvloop*,
+    that loop is a uvloop one if uvloop is installed.
+    '''
+    context = multiprocessing.get_context('fork')
+    channels: List[Channel] = []
+    processes = []
+    for index in range(1, count + 1):
+        ours, theirs = socket.socketpair()
+        process = context.Process(target=_worker_main,
+                                  args=(run_worker, index, theirs, channels + [Channel(ours, index)], use_uvloop),
+                                  name='async_eel-worker-%d' % index, daemon=True)
+        process.start()
+        theirs.close()
+        channels.append(Channel(ours, index))
+        processes.append(process)
+    return Cluster(0, channels, processes)
+
+
+def _worker_main(run_worker: Callable[[int, socket.socket], Awaitable[None]], index: int, sock: socket.socket,
+                 inherited: List[Channel], use_uvloop: bool) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for channel in inherited:
+        # Other workers must see the coordinator's end close when it exits
+        channel._sock.close()
+    thread = threading.Thread(target=lambda: loops.run(run_worker(index, sock), use_uvloop), name='async_eel-worker')
+    thread.start()
+    thread.join()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+import asyncio
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import hdrs, web, WSMsgType
+
+try:
+    from aiohttp.http_websocket import ws_ext_gen
+except ImportError:     # Moved in an aiohttp this was not written for
+    ws_ext_gen = None
+
+from .metrics import Histogram
+
+# permessage-deflate on the /eel websocket.
+#
+# aiohttp compresses every message of a connection that negotiated the
+# extension. DeflateWebSocket takes that over: messages under a size threshold
+# go out as they are, which the extension allows message by message, and
+# larger ones are deflated here, so the CPU time and the bytes saved can be
+# measured. Deflating relies on aiohttp's frame writer, as aiohttp has no
+# public way to send a frame compressed by the caller. pyproject.toml pins
+# the aiohttp versions this was tested with. With any other aiohttp lacking
+# the parts used here, aiohttp compresses every message itself, as stock
+# websockets do.
+#
+# With the shared context (context takeover), a message can refer back to
+# the ones sent before it, which suits repetitive JSON. Without it, every
+# message is compressed on its own, and the page needs no window kept
+# between messages.
+
+SYNC_LIMIT = 16 * 1024      # Larger messages are deflated in the executor, off the event loop
+
+# Upper bounds in seconds of the CPU time spent deflating one message
+CPU_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+_DEFLATE_TAIL = b'\x00\x00\xff\xff'     # Ends every sync flush; left out of the frame, see RFC 7692
+
+# Private parts of aiohttp's WebSocketWriter used to send frames deflated here
+_WRITER_INTERNALS = ('compress', 'notakeover', 'send_frame', '_write_websocket_frame', '_closing')
+
+
+class CompressionStats:
+    '''Totals of the messages sent over connections that negotiated compression.'''
+
+    def __init__(self) -> None:
+        self.connections = 0    # Connections that negotiated permessage-deflate
+        self.compressed = 0     # Messages deflated
+        self.skipped = 0        # Messages under the threshold, sent as they are
+        self.bytes_in = 0       # Size of the deflated messages before compression
+        self.bytes_out = 0      # and after
+        self.cpu = Histogram(CPU_BUCKETS)
+
+    def record(self, size: int, compressed_size: int, cpu: float) -> None:
+        self.compressed += 1
+        self.bytes_in += size
+        self.bytes_out += compressed_size
+        self.cpu.observe(cpu)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'connections': self.connections,
+                'compressed': self.compressed,
+                'skipped': self.skipped,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'ratio': self.bytes_out / self.bytes_in if self.bytes_in else 1.0,
+                'cpu_seconds': self.cpu.total,
+                'cpu_per_message': self.cpu.summary()}
+
+
+class DeflateWebSocket(web.WebSocketResponse):
+    '''Websocket deflating only the messages of at least *threshold* bytes.
+
+    :param threshold: Smallest message, in bytes (UTF-8), that is compressed.
+    :param level: zlib compression level, from 1 (fastest) to 9 (smallest).
+    :param shared_context: Keep the compression context from message to
+        message. Without it, the server asks for
+        :code:`server_no_context_takeover` in the handshake.
+    :param stats: Totals to add this connection's messages to.
+    '''
+
+    def __init__(self, *, threshold: int = 1024, level: int = 1, shared_context: bool = True,
+                 stats: Optional[CompressionStats] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.threshold = threshold
+        self.level = level
+        self.shared_context = shared_context
+        self.stats = stats if stats is not None else CompressionStats()
+        self._wbits = 0             # Negotiated window bits; 0 when not compressing
+        self._flush_mode = zlib.Z_SYNC_FLUSH
+        self._deflater: Any = None
+        self._send_lock = asyncio.Lock()
+
+    def _handshake(self, request: web.BaseRequest) -> Any:
+        result = super()._handshake(request)
+        if ws_ext_gen is None or not isinstance(result, tuple) or len(result) != 4:
+            return result       # Not the aiohttp this was written for: left as it is
+        headers, protocol, compress, notakeover = result
+        if compress and not self.shared_context and not notakeover:
+            notakeover = True
+            headers[hdrs.SEC_WEBSOCKET_EXTENSIONS] = ws_ext_gen(compress=compress, isserver=True,
+                                                                server_notakeover=True)
+        return headers, protocol, compress, notakeover
+
+    async def prepare(self, request: web.BaseRequest) -> Any:
+        writer = await super().prepare(request)
+        if not all(hasattr(self._writer, name) for name in _WRITER_INTERNALS) or not hasattr(self, '_payload_writer'):
+            return writer       # Left to aiohttp's own compression
+        self._wbits = self._writer.compress
+        if self._wbits:
+            self._writer.compress = 0       # Deflated by send_str instead
+            if self._writer.notakeover:
+                self._flush_mode = zlib.Z_FULL_FLUSH    # Resets the context after every message
+            self._deflater = zlib.compressobj(self.level, zlib.DEFLATED, -self._wbits)
+            self.stats.connections += 1
+        return writer
+
+    @property
+    def compressing(self) -> bool:
+        '''Whether the page accepted permessage-deflate.'''
+        return self._wbits != 0 or bool(getattr(self._writer, 'compress', 0))
+
+    async def send_str(self, data: str, compress: Optional[int] = None) -> None:
+        if not self._wbits or not isinstance(data, str) or self._writer._closing:
+            await super().send_str(data, compress)     # Raises as aiohttp does for bad input or a closing socket
+            return
+        payload = data.encode('utf-8')
+        if len(payload) < self.threshold:
+            self.stats.skipped += 1
+            async with self._send_lock:     # Behind deflated messages still being compressed
+                await super().send_str(data)
+        else:
+            # Shielded: a message deflated but never sent would leave the page's context out of step
+            await asyncio.shield(self._send_deflated(payload))
+
+    async def _send_deflated(self, payload: bytes) -> None:
+        async with self._send_lock:
+            if len(payload) > SYNC_LIMIT:
+                deflated, cpu = await asyncio.get_running_loop().run_in_executor(None, self._deflate, payload)
+            else:
+                deflated, cpu = self._deflate(payload)
+            self.stats.record(len(payload), len(deflated), cpu)
+            self._writer._write_websocket_frame(deflated, WSMsgType.TEXT, 0x40)    # RSV1: compressed
+        await self._payload_writer.drain()
+
+    def _deflate(self, payload: bytes) -> Tuple[bytes, float]:
+        started = time.thread_time()
+        deflated = self._deflater.compress(payload) + self._deflater.flush(self._flush_mode)
+        if deflated.endswith(_DEFLATE_TAIL):
+            deflated = deflated[:-len(_DEFLATE_TAIL)]
+        return deflated, time.thread_time() - started
@@ -0,0 +1,124 @@
+from __future__ import annotations
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+# Registry of the pages connected to AsyncEel.
+#
+# A connection is keyed by the object messages are sent through: the
+# websocket, or the Session standing in for it. Adding and removing are O(1),
+# removing twice is harmless, and connections can be looked up by page,
+# session id and tag without scanning.
+
+
+class Connection:
+    '''A connected page and its traffic counters.'''
+
+    __slots__ = ('conn', 'page', 'session_id', 'tags', 'connected_at', 'messages_in', 'messages_out',
+                 'bytes_in', 'bytes_out', 'pending_calls', 'lanes')
+
+    def __init__(self, conn: Any, page: str, session_id: Optional[str] = None, tags: Iterable[str] = ()):
+        self.conn = conn
+        self.page = page
+        self.session_id = session_id
+        self.tags: Set[str] = set(tags)
+        self.connected_at = time.time()
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.pending_calls = 0      # Calls from the page to Python still running
+        self.lanes: Any = None      # LaneScheduler of the frames sent to the page, see lanes.py
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'page': self.page,
+                'session': self.session_id,
+                'tags': sorted(self.tags),
+                'connected_at': self.connected_at,
+                'messages_in': self.messages_in,
+                'messages_out': self.messages_out,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'pending_calls': self.pending_calls}
+
+
+class ConnectionRegistry:
+    '''Connections indexed by sending object, page, session id and tag.'''
+
+    def __init__(self) -> None:
+        self._all: Dict[Any, Connection] = {}
+        self._by_page: Dict[str, Dict[Any, Connection]] = {}
+        self._by_session: Dict[str, Connection] = {}
+        self._by_tag: Dict[str, Dict[Any, Connection]] = {}
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def __iter__(self) -> Iterator[Connection]:
+        return iter(list(self._all.values()))
+
+    def __contains__(self, conn: Any) -> bool:
+        return conn in self._all
+
+    def senders(self) -> List[Any]:
+        '''The objects to send to, for broadcasting to every page.'''
+        return list(self._all)
+
+    def add(self, conn: Any, page: str, session_id: Optional[str] = None, tags: Iterable[str] = ()) -> Connection:
+        self.remove(conn)
+        connection = self._all[conn] = Connection(conn, page, session_id, tags)
+        self._by_page.setdefault(page, {})[conn] = connection
+        if session_id is not None:
+            self._by_session[session_id] = connection
+        for tag in connection.tags:
+            self._by_tag.setdefault(tag, {})[conn] = connection
+        return connection
+
+    def remove(self, conn: Any) -> Optional[Connection]:
+        '''Forget *conn*; returns its connection, or `None` if it was not registered.'''
+        connection = self._all.pop(conn, None)
+        if connection is None:
+            return None
+        _discard(self._by_page, connection.page, conn)
+        if connection.session_id is not None and self._by_session.get(connection.session_id) is connection:
+            del self._by_session[connection.session_id]
+        for tag in connection.tags:
+            _discard(self._by_tag, tag, conn)
+        return connection
+
+    def get(self, conn: Any) -> Optional[Connection]:
+        return self._all.get(conn)
+
+    def by_page(self, page: str) -> List[Connection]:
+        return list(self._by_page.get(page, {}).values())
+
+    def by_session(self, session_id: str) -> Optional[Connection]:
+        return self._by_session.get(session_id)
+
+    def by_tag(self, tag: str) -> List[Connection]:
+        return list(self._by_tag.get(tag, {}).values())
+
+    def tag(self, conn: Any, *tags: str) -> None:
+        connection = self._all[conn]
+        for tag in tags:
+            connection.tags.add(tag)
+            self._by_tag.setdefault(tag, {})[conn] = connection
+
+    def untag(self, conn: Any, *tags: str) -> None:
+        connection = self._all[conn]
+        for tag in tags:
+            connection.tags.discard(tag)
+            _discard(self._by_tag, tag, conn)
+
+    def clear(self) -> None:
+        self._all.clear()
+        self._by_page.clear()
+        self._by_session.clear()
+        self._by_tag.clear()
+
+
+def _discard(index: Dict[str, Dict[Any, Connection]], key: str, conn: Any) -> None:
+    bucket = index.get(key)
+    if bucket is not None:
+        bucket.pop(conn, None)
+        if not bucket:
+            del index[key]
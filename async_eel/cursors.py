@@ -0,0 +1,84 @@
+from __future__ import annotations
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Union, Iterable, AsyncIterable
+
+# Remote paginated cursors.
+#
+# An exposed function can return `Cursor(iterable)` to hand a lazy iterator to
+# JavaScript. The cursor lives in the handle registry of the calling page and
+# JS pulls one page at a time with `cursor.next(n)`, so only one page of the
+# result is ever materialized and serialized.
+
+
+class Cursor:
+    '''A lazily consumed (sync or async) iterable that JS reads page by page.
+
+    The cursor is released when it is exhausted, when JS closes it, when the
+    page disconnects, or after *idle_timeout* seconds without a request.
+
+    :param iterable: Any iterable or async iterable, typically a generator.
+    :param idle_timeout: Seconds of inactivity after which the iterator is
+        closed and its memory freed. `None` disables the timeout.
+    '''
+
+    def __init__(self, iterable: Union[Iterable[Any], AsyncIterable[Any]], idle_timeout: Optional[float] = 60.0):
+        if hasattr(iterable, '__aiter__'):
+            self._aiter = iterable.__aiter__()      # type: ignore[union-attr]
+            self._iter = None
+        else:
+            self._aiter = None
+            self._iter = iter(iterable)             # type: ignore[arg-type]
+        self.idle_timeout = idle_timeout
+        self.done = False
+        self._on_release: Optional[Callable[[], None]] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _bind(self, on_release: Callable[[], None]) -> None:
+        '''Attach the registry release callback and start the idle timer.'''
+        self._on_release = on_release
+        self._touch()
+
+    def _touch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        if self.idle_timeout is not None and not self.done:
+            self._timer = asyncio.get_running_loop().call_later(self.idle_timeout, self._expire)
+
+    def _expire(self) -> None:
+        self._timer = None
+        asyncio.ensure_future(self.close())
+
+    async def next(self, n: int = 100) -> Dict[str, Any]:
+        '''Return the next page of at most *n* items and whether the cursor is exhausted.'''
+        if n <= 0:
+            raise ValueError('Cursor page size must be positive, got %r' % n)
+        items: List[Any] = []
+        try:
+            if self._aiter is not None:
+                while len(items) < n:
+                    items.append(await self._aiter.__anext__())
+            else:
+                assert self._iter is not None
+                while len(items) < n:
+                    items.append(next(self._iter))
+        except (StopIteration, StopAsyncIteration):
+            await self.close()
+        else:
+            self._touch()
+        return {'items': items, 'done': self.done}
+
+    async def close(self) -> None:
+        '''Close the underlying iterator and release the cursor.'''
+        if self.done:
+            return
+        self.done = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._aiter is not None and hasattr(self._aiter, 'aclose'):
+            await self._aiter.aclose()
+        elif self._iter is not None and hasattr(self._iter, 'close'):
+            self._iter.close()
+        self._aiter = self._iter = None
+        if self._on_release is not None:
+            self._on_release()
@@ -13,8 +13,13 @@ def run(path: str, options: OptionsDictT, start_urls: List[str]) -> None:
     if not isinstance(options['cmdline_args'], list):
         raise TypeError("'cmdline_args' option must be of type List[str]")
     cmd = [path] + options['cmdline_args']
+    env = None
+    if options.get('unix_socket') is not None:
+        # The main process can reach Eel there without going through TCP
+        cmd += ['--eel-socket=%s' % options['unix_socket']]
+        env = dict(os.environ, EEL_SOCKET=options['unix_socket'])
     cmd += ['.', ';'.join(start_urls)]
-    sps.Popen(cmd, stdout=sys.stdout, stderr=sys.stderr, stdin=sps.PIPE)
+    sps.Popen(cmd, stdout=sys.stdout, stderr=sys.stderr, stdin=sps.PIPE, env=env)
 
 
 def find_path() -> Optional[str]:
@@ -0,0 +1,91 @@
+from __future__ import annotations
+import itertools
+from typing import Any, Dict, List, Optional
+
+# Server-side object handles.
+#
+# An exposed function can return `Handle(obj)` instead of `obj`. The object is
+# then kept in a per-connection registry and JavaScript receives a small
+# reference it can use to call methods or fetch items/slices, so large Python
+# objects never have to be serialized as a whole.
+
+
+class Handle:
+    '''Marks a return value to be kept in Python and passed to JS by reference.
+
+    :Example:
+
+        >>> @AsyncEel.expose
+        ... def open_dataset(path):
+        ...     return AsyncEel.handle(load_huge_table(path))
+    '''
+
+    __slots__ = ('obj',)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+
+def _to_wire(value: Any) -> Any:
+    # Array-likes such as numpy arrays are not JSON serializable but know how
+    # to turn themselves into lists.
+    tolist = getattr(value, 'tolist', None)
+    if callable(tolist) and not isinstance(value, (list, tuple, dict, str)):
+        return tolist()
+    return value
+
+
+class HandleRegistry:
+    '''Objects referenced by JavaScript, grouped by owning websocket.'''
+
+    def __init__(self) -> None:
+        self._ids = itertools.count(1)
+        self._owned: Dict[Any, Dict[int, Any]] = {}
+
+    def add(self, owner: Any, obj: Any, kind: str = 'object') -> Dict[str, Any]:
+        '''Register *obj* for *owner* and return its wire representation.'''
+        handle_id = next(self._ids)
+        self._owned.setdefault(owner, {})[handle_id] = obj
+        info: Dict[str, Any] = {'__eel_handle__': handle_id, 'kind': kind, 'type': type(obj).__name__}
+        try:
+            info['length'] = len(obj)
+        except TypeError:
+            pass
+        return info
+
+    def get(self, owner: Any, handle_id: int) -> Any:
+        try:
+            return self._owned[owner][handle_id]
+        except KeyError:
+            raise KeyError('Unknown or released handle %r' % handle_id) from None
+
+    def invoke(self, owner: Any, handle_id: int, name: str, args: List[Any]) -> Any:
+        '''Run the operation *name* requested by JS on the object behind *handle_id*.
+
+        ``__len__``, ``__getitem__`` and ``__slice__`` give access to the
+        content; any other name must be a public method of the object.
+        '''
+        obj = self.get(owner, handle_id)
+        if name == '__len__':
+            return len(obj)
+        if name == '__getitem__':
+            return _to_wire(obj[args[0]])
+        if name == '__slice__':
+            return _to_wire(obj[slice(*args)])
+        if name.startswith('_'):
+            raise AttributeError('Private attribute %r is not accessible through a handle' % name)
+        return getattr(obj, name)(*args)
+
+    def release(self, owner: Any, handle_id: int) -> Any:
+        '''Forget *handle_id* and return the object it referenced, if any.'''
+        return self._owned.get(owner, {}).pop(handle_id, None)
+
+    def release_all(self, owner: Any) -> List[Any]:
+        '''Forget all handles of *owner* and return the objects they referenced.'''
+        return list(self._owned.pop(owner, {}).values())
+
+    def count(self, owner: Optional[Any] = None) -> int:
+        '''Number of live handles, for *owner* or in total.'''
+        if owner is not None:
+            return len(self._owned.get(owner, {}))
+        return sum(len(handles) for handles in self._owned.values())
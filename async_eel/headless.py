@@ -0,0 +1,248 @@
+from __future__ import annotations
+import asyncio
+import inspect
+import itertools
+import json as jsn
+import random as rnd
+import traceback
+from urllib.parse import quote
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import aiohttp
+
+from . import chunking
+from .sessions import ACK_CHARS, ACK_MESSAGES
+
+# Headless stand-in for a browser page.
+#
+# HeadlessPage speaks the same protocol over /eel as async_eel.js, so the
+# server side of AsyncEel can be driven from Python without a browser, e.g.
+# for benchmarks and CI.
+
+
+class HeadlessCallError(Exception):
+    '''Raised when a call made by a :class:`HeadlessPage` does not return 'ok'.'''
+
+    def __init__(self, status: str, error: Any):
+        super().__init__('%s: %s' % (status, error.get('errorText') if isinstance(error, dict) else error))
+        self.status = status
+        self.error = error
+
+
+class HeadlessPage:
+    '''A page connected to AsyncEel's websocket without a browser.
+
+    :param url: Base URL of the Eel server, e.g. :code:`http://127.0.0.1:8000`.
+    :param page: Page name sent on connect, as :code:`window.location.pathname`
+        would be by async_eel.js.
+    :param session: Optional :class:`aiohttp.ClientSession` to share between
+        many pages.
+    :param session_id: Eel session id, like :code:`eel._guid` in async_eel.js.
+        With one, the page acknowledges the messages it receives and can
+        :func:`drop` its connection and :func:`connect` again to resume.
+    :param tags: Tags sent on connect, like :code:`eel.set_tags()` in
+        async_eel.js.
+    :param unix_socket: Connect through this Unix domain socket, for apps
+        started with :code:`unix_socket=`; *url* then only names the host,
+        e.g. :code:`http://localhost`.
+    :param compress: Offer permessage-deflate compression, as browsers do.
+    :param chunk_size: Send messages longer than this many characters in
+        chunks, like async_eel.js with the app's :code:`chunk_size`.
+        Chunked messages from Python are reassembled either way.
+
+    Functions exposed on the page with :func:`expose` answer calls from
+    Python like functions exposed with :code:`eel.expose` in JavaScript.
+
+    :Example:
+
+        >>> page = HeadlessPage('http://127.0.0.1:8000', 'main.html')
+        >>> page.expose(lambda a, b: a + b, 'js_add')
+        >>> await page.connect()
+        >>> await page.call('py_random')
+    '''
+
+    def __init__(self, url: str, page: str = 'index.html', session: Optional[aiohttp.ClientSession] = None,
+                 session_id: Optional[str] = None, tags: Sequence[str] = (), unix_socket: Optional[str] = None,
+                 compress: bool = False, chunk_size: Optional[int] = None):
+        self.url = url.rstrip('/')
+        self.page = page
+        self.session_id = session_id
+        self.tags = list(tags)
+        self.unix_socket = unix_socket
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.received = 0
+        self.resumed: Optional[bool] = None
+        self._acked = 0
+        self._acked_chars = 0
+        self._session = session
+        self._own_session = session is None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._session_ready: Optional[asyncio.Future] = None
+        self._call_numbers = itertools.count(1)
+        self._chunk_numbers = itertools.count(1)
+        self._chunk_streams: Optional[asyncio.Semaphore] = None     # Made in connect(), in the loop using it
+        self._reassembler = chunking.Reassembler()
+        self._pending: Dict[float, asyncio.Future] = {}
+        self._exposed: Dict[str, Callable[..., Any]] = {}
+        self.calls_received = 0
+        self.on_message: List[Callable[[Dict[str, Any]], None]] = []
+
+    def expose(self, function: Callable[..., Any], name: Optional[str] = None) -> Callable[..., Any]:
+        '''Answer Python's calls to *name* (default: the function's name) with *function*.
+
+        Coroutine functions are awaited. Python only knows the names of JS
+        functions found in the web folder, others are declared with
+        :func:`AsyncEel.declare_js_functions`.
+        '''
+        self._exposed[name or function.__name__] = function
+        return function
+
+    async def connect(self) -> None:
+        if self._chunk_streams is None:
+            self._chunk_streams = asyncio.Semaphore(chunking.MAX_PENDING)    # As many as the server reassembles at once
+        if self._session is None:
+            connector = aiohttp.UnixConnector(self.unix_socket) if self.unix_socket is not None else None
+            self._session = aiohttp.ClientSession(connector=connector)
+        ws_url = self.url.replace('http', 'ws', 1) + '/eel?page=' + self.page
+        if self.session_id is not None:
+            ws_url += '&session=%s&ack=%d' % (self.session_id, self.received)
+        if self.tags:
+            ws_url += '&tags=' + quote(','.join(self.tags))
+        self._ws = await self._session.ws_connect(ws_url, max_msg_size=0, compress=15 if self.compress else 0)
+        if self.session_id is None:
+            self._reassembler = chunking.Reassembler()      # Else resumed along with the session
+        self._reader = asyncio.ensure_future(self._read())
+        if self.session_id is not None:
+            self._session_ready = asyncio.get_running_loop().create_future()
+            await self._session_ready
+
+    async def drop(self) -> None:
+        '''Close the websocket only, as a network failure would.'''
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def close(self) -> None:
+        '''Close the page, as a browser does when it is closed or navigated away.'''
+        if self._ws is not None:
+            await self._ws.close(code=aiohttp.WSCloseCode.GOING_AWAY)
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+        if self._own_session and self._session is not None:
+            await self._session.close()
+
+    async def send_raw(self, text: str) -> None:
+        assert self._ws is not None, 'HeadlessPage is not connected'
+        if self.chunk_size is None or len(text) <= self.chunk_size:
+            await self._ws.send_str(text)
+            return
+        assert self._chunk_streams is not None, 'HeadlessPage is not connected'
+        async with self._chunk_streams:
+            for frame in chunking.frames(text, self.chunk_size, next(self._chunk_numbers)):
+                await self._ws.send_str(frame)
+                await asyncio.sleep(0)
+
+    async def call(self, name: str, *args: Any, timeout: Optional[int] = None, lane: Optional[str] = None) -> Any:
+        '''Call the exposed Python function *name* and return its value.
+
+        :param timeout: Deadline in milliseconds sent with the call, like
+            :code:`withTimeout()` in async_eel.js.
+        :param lane: Lane of the reply, :code:`'control'` or :code:`'bulk'`,
+            like :code:`withLane()` in async_eel.js.
+        '''
+        call_id = next(self._call_numbers) + rnd.random()
+        message: Dict[str, Any] = {'call': call_id, 'name': name, 'args': list(args)}
+        if timeout is not None:
+            message['timeout'] = timeout
+        if lane is not None:
+            message['lane'] = lane
+        future = asyncio.get_running_loop().create_future()
+        self._pending[call_id] = future
+        try:
+            await self.send_raw(jsn.dumps(message))
+            return await future
+        finally:
+            self._pending.pop(call_id, None)
+
+    async def _read(self) -> None:
+        assert self._ws is not None
+        async for msg in self._ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            data = msg.data
+            if data.startswith(chunking.PREFIX):
+                data = self._reassembler.feed(data)
+                if data is None:
+                    await self._count_received(len(msg.data))
+                    continue
+            message = jsn.loads(data)
+            if 'session' in message:
+                self.resumed = message['session']['resumed']
+                if not self.resumed:
+                    self.received = self._acked = self._acked_chars = 0
+                    self._reassembler = chunking.Reassembler()
+                self._session_ready.set_result(self.resumed)
+                continue
+            await self._count_received(len(msg.data))
+            self._dispatch(message)
+        if self._session_ready is not None and not self._session_ready.done():
+            self._session_ready.set_exception(ConnectionError('Websocket closed'))
+        if self.session_id is None:
+            # With a session, replies still arrive after the page reconnects
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('Websocket closed'))
+
+    async def _count_received(self, size: int) -> None:
+        # Every frame of a chunked message counts, as in async_eel.js
+        if self.session_id is not None:
+            self.received += 1
+            self._acked_chars += size
+            if self.received - self._acked >= ACK_MESSAGES or self._acked_chars >= ACK_CHARS:
+                self._acked = self.received
+                self._acked_chars = 0
+                await self.send_raw(jsn.dumps({'ack': self.received}))
+
+    def _answer(self, call_id: float, function: Callable[..., Any], args: List[Any]) -> None:
+        try:
+            value = function(*args)
+        except Exception as e:
+            self._send_reply(self._error_reply(call_id, e))
+            return
+        if inspect.isawaitable(value):
+            asyncio.ensure_future(self._answer_later(call_id, value))
+        else:
+            self._send_reply({'return': call_id, 'status': 'ok', 'value': value})
+
+    async def _answer_later(self, call_id: float, awaitable: Any) -> None:
+        try:
+            reply = {'return': call_id, 'status': 'ok', 'value': await awaitable}
+        except Exception as e:
+            reply = self._error_reply(call_id, e)
+        await self.send_raw(jsn.dumps(reply))
+
+    def _error_reply(self, call_id: float, error: Exception) -> Dict[str, Union[float, str]]:
+        # Same shape as async_eel.js sends for a JS exception
+        return {'return': call_id, 'status': 'error', 'error': str(error), 'stack': traceback.format_exc()}
+
+    def _send_reply(self, reply: Dict[str, Any]) -> None:
+        asyncio.ensure_future(self.send_raw(jsn.dumps(reply)))
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        if 'return' in message:
+            future = self._pending.get(message['return'])
+            if future is not None and not future.done():
+                if message['status'] == 'ok':
+                    future.set_result(message['value'])
+                else:
+                    future.set_exception(HeadlessCallError(message['status'], message.get('error')))
+        elif 'call' in message:
+            self.calls_received += 1
+            function = self._exposed.get(message.get('name'))
+            if function is not None:
+                self._answer(message['call'], function, message.get('args', []))
+        for listener in self.on_message:
+            listener(message)
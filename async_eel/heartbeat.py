@@ -0,0 +1,116 @@
+from __future__ import annotations
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Heartbeats for page websockets.
+#
+# A sleeping laptop or a killed renderer leaves a half-open connection that
+# never reports an error, and sends to it are wasted. The monitor pings every
+# websocket each interval and hands connections that showed no sign of life
+# (message or pong) for interval + timeout seconds to a reaper callback.
+#
+# Reaped websockets are closed with RECONNECT, an application close code
+# (RFC 6455 leaves 4000-4999 to applications): unlike 1001, which async_eel.js
+# reads as Python shutting down, it tells the page to reconnect and resume.
+
+RECONNECT = 4000
+
+
+class Liveness:
+    '''Liveness of one websocket, and the logical connection it serves.'''
+
+    __slots__ = ('ws', 'conn', 'page', 'connected_at', 'last_seen', 'pings', 'pongs', 'rtt', 'reaped',
+                 '_ping_sent')
+
+    def __init__(self, ws: Any, conn: Any, page: str):
+        now = time.monotonic()
+        self.ws = ws
+        self.conn = conn
+        self.page = page
+        self.connected_at = now
+        self.last_seen = now
+        self.pings = 0
+        self.pongs = 0
+        self.rtt: Optional[float] = None      # Smoothed ping round trip, in seconds
+        self.reaped = False
+        self._ping_sent: Optional[float] = None
+
+    def pong(self) -> None:
+        now = time.monotonic()
+        self.last_seen = now
+        self.pongs += 1
+        if self._ping_sent is not None:
+            sample = now - self._ping_sent
+            self.rtt = sample if self.rtt is None else 0.8 * self.rtt + 0.2 * sample
+            self._ping_sent = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {'page': self.page,
+                'connected_for': now - self.connected_at,
+                'idle_for': now - self.last_seen,
+                'pings': self.pings,
+                'pongs': self.pongs,
+                'rtt': self.rtt}
+
+
+class HeartbeatMonitor:
+    '''Pings websockets and reports the dead ones to *on_dead*.
+
+    :param interval: Seconds between pings, or `None` to only track liveness.
+    :param timeout: Extra seconds of silence after a missed ping before a
+        connection is declared dead.
+    '''
+
+    def __init__(self, interval: Optional[float], timeout: float, on_dead: Callable[[Liveness], None]):
+        self.interval = interval
+        self.timeout = timeout
+        self.reaped = 0
+        self._on_dead = on_dead
+        self._connections: Dict[Any, Liveness] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, ws: Any, conn: Any, page: str) -> Liveness:
+        liveness = self._connections[ws] = Liveness(ws, conn, page)
+        if self._task is None and self.interval:
+            self._task = asyncio.ensure_future(self._run())
+        return liveness
+
+    def remove(self, ws: Any) -> None:
+        self._connections.pop(ws, None)
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        assert self.interval
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            for ws, liveness in list(self._connections.items()):
+                if now - liveness.last_seen > self.interval + self.timeout:
+                    del self._connections[ws]
+                    liveness.reaped = True
+                    self.reaped += 1
+                    self._on_dead(liveness)
+                else:
+                    liveness.pings += 1
+                    liveness._ping_sent = now
+                    asyncio.ensure_future(self._ping(ws))
+
+    @staticmethod
+    async def _ping(ws: Any) -> None:
+        try:
+            await ws.ping()
+        except Exception:
+            pass        # Closing already; the handler or the next round cleans up
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [liveness.as_dict() for liveness in self._connections.values()]
+
+    def by_conn(self) -> Dict[Any, Liveness]:
+        '''Liveness of each open websocket, keyed by the connection it serves.'''
+        return {liveness.conn: liveness for liveness in self._connections.values()}
@@ -0,0 +1,129 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple
+
+from .metrics import Histogram
+
+# Control and bulk lanes of the messages sent to a page.
+#
+# All messages to a page share one websocket, and a frame being written holds
+# up the frames after it. Each message travels in a lane: 'control' for calls,
+# state updates and the replies of interactive functions, 'bulk' for the
+# replies of functions exposed or called with lane='bulk'. Frames waiting for
+# the websocket go out in weighted fair queue order (self-clocked: a frame's
+# tag is where its lane's previous frame finished, or the frame being sent if
+# later, plus its size divided by the lane's weight). While both lanes have
+# frames waiting, they share the bytes sent in proportion to their weights; a
+# lane with nothing waiting leaves its share to the other. Frames keep their
+# order within a lane. Large messages are split into frames (see
+# chunking.py), so a control reply waits behind about one frame of bulk data.
+
+LANES = ('control', 'bulk')
+
+WEIGHTS: Dict[str, int] = {'control': 16, 'bulk': 1}
+
+# Upper bounds in seconds of the time a frame waits for its turn
+WAIT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def check_lane(lane: str) -> str:
+    '''Return *lane*, or raise ValueError if there is no such lane.'''
+    if lane not in LANES:
+        raise ValueError('Unknown lane %r, expected one of %s' % (lane, list(LANES)))
+    return lane
+
+
+class _LaneTotals:
+    __slots__ = ('frames', 'bytes', 'wait')
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.bytes = 0
+        self.wait = Histogram(WAIT_BUCKETS)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'frames': self.frames,
+                'bytes': self.bytes,
+                'wait': self.wait.summary()}
+
+
+class LaneStats:
+    '''Frames and characters sent in each lane, and the time they waited for their turn.'''
+
+    def __init__(self) -> None:
+        self.lanes: Dict[str, _LaneTotals] = {lane: _LaneTotals() for lane in LANES}
+
+    def stats(self) -> Dict[str, Any]:
+        return {lane: totals.as_dict() for lane, totals in self.lanes.items()}
+
+
+# (finish tag, sequence, granted future)
+_WaitingT = Tuple[float, int, 'asyncio.Future[None]']
+
+
+class LaneScheduler:
+    '''Weighted fair queue of the frames sent to one page.
+
+    :param weights: Relative share of each lane, e.g. :code:`{'bulk': 2}`;
+        lanes left out keep their weight from :data:`WEIGHTS`.
+    :param stats: Totals to add this page's frames to.
+    '''
+
+    def __init__(self, weights: Optional[Mapping[str, int]] = None, stats: Optional[LaneStats] = None):
+        self.weights: Dict[str, int] = dict(WEIGHTS, **(weights or {}))
+        self.stats = stats if stats is not None else LaneStats()
+        self._busy = False
+        self._virtual = 0.0     # Tag of the frame being sent
+        self._finish: Dict[str, float] = {lane: 0.0 for lane in LANES}     # Tag of each lane's last frame
+        self._waiting: List[_WaitingT] = []
+        self._sequence = itertools.count()
+
+    @asynccontextmanager
+    async def turn(self, lane: str, size: int) -> AsyncIterator[None]:
+        '''Wait until a frame of *size* characters in *lane* may be sent, and send it in the block.'''
+        finish = max(self._virtual, self._finish[lane]) + max(size, 1) / self.weights[lane]
+        self._finish[lane] = finish
+        totals = self.stats.lanes[lane]
+
+        if not self._busy:
+            # Nothing is waiting while the websocket is free
+            self._busy = True
+            self._virtual = finish
+            totals.wait.observe(0.0)
+        else:
+            granted: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (finish, next(self._sequence), granted))
+            queued_at = time.perf_counter()
+            try:
+                await granted
+            except asyncio.CancelledError:
+                if granted.done() and not granted.cancelled():
+                    self._release()     # Turn was granted just before the cancellation
+                else:
+                    granted.cancel()
+                raise
+            totals.wait.observe(time.perf_counter() - queued_at)
+        totals.frames += 1
+        totals.bytes += size
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        while self._waiting:
+            finish, _, granted = heapq.heappop(self._waiting)
+            if not granted.cancelled():
+                self._virtual = finish
+                granted.set_result(None)
+                return
+        self._busy = False
+
+    def __len__(self) -> int:
+        '''Number of frames waiting for their turn.'''
+        return sum(1 for entry in self._waiting if not entry[2].cancelled())
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .metrics import Histogram
+
+# Event loop lag monitor.
+#
+# A background task sleeps for a fixed interval and measures how late it
+# wakes up. Everything in AsyncEel runs on one loop, so this lag is the delay
+# every call, reply and static file request currently suffers. Activities
+# (exposed calls, handlers) are noted as they start, so long stalls can be
+# attributed to what was running.
+
+
+class LoopLagMonitor:
+    '''Samples event loop lag and remembers what was running during stalls.
+
+    :param interval: Seconds between samples.
+    :param stall_threshold: Lag in seconds from which a sample is recorded as
+        a stall, together with the activities that were running.
+    '''
+
+    def __init__(self, interval: float = 0.05, stall_threshold: float = 0.1, max_stalls: int = 50):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.histogram = Histogram()
+        self.lag = 0.0          # Smoothed recent lag, in seconds
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=max_stalls)
+        self._started: List[str] = []    # Activities started since the last sample
+        self._running: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._sample())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @contextmanager
+    def activity(self, label: str) -> Iterator[None]:
+        '''Mark *label* as running on the loop for the duration of the block.'''
+        if len(self._started) < 32:
+            self._started.append(label)
+        self._running[label] = self._running.get(label, 0) + 1
+        try:
+            yield
+        finally:
+            if self._running[label] == 1:
+                del self._running[label]
+            else:
+                self._running[label] -= 1
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._started = []
+            before = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - before - self.interval, 0.0)
+            self.histogram.observe(lag)
+            self.lag = lag if lag > self.lag else 0.7 * self.lag + 0.3 * lag
+            if lag >= self.stall_threshold:
+                self.stalls.append({'lag': lag,
+                                    'time': time.time(),
+                                    'started': list(self._started),
+                                    'running': sorted(self._running)})
+
+    def stats(self) -> Dict[str, Any]:
+        summary = self.histogram.summary()
+        summary['lag'] = self.lag
+        summary['stalls'] = list(self.stalls)
+        return summary
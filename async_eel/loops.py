@@ -0,0 +1,71 @@
+from __future__ import annotations
+import asyncio
+import functools
+import sys
+from typing import Any, Coroutine, Optional, TypeVar
+
+# Event loop selection.
+#
+# uvloop is an optional, faster drop-in replacement for asyncio's event loop
+# (POSIX only). A loop is picked when it is created, before `start()` runs, so
+# the program's own loop is chosen by `AsyncEel.run()`, and the workers of a
+# multi-worker setup create theirs with `run()` too. Without uvloop installed
+# everything falls back to asyncio's loop.
+
+T = TypeVar('T')
+
+
+def uvloop_available() -> bool:
+    try:
+        import uvloop     # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def new_event_loop(use_uvloop: bool = True) -> asyncio.AbstractEventLoop:
+    '''A uvloop loop if *use_uvloop* and uvloop is installed, else an asyncio one.'''
+    if use_uvloop and uvloop_available():
+        import uvloop
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def run(main: Coroutine[Any, Any, T], use_uvloop: bool = True) -> T:
+    '''Like :func:`asyncio.run`, on a loop made by :func:`new_event_loop`.'''
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=functools.partial(new_event_loop, use_uvloop)) as runner:
+            return runner.run(main)
+    # As asyncio.Runner does, without installing a loop policy for the whole process
+    loop = new_event_loop(use_uvloop)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            _cancel_all_tasks(loop)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            if hasattr(loop, 'shutdown_default_executor'):      # Python 3.9+
+                loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+def _cancel_all_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    tasks = asyncio.all_tasks(loop)
+    if not tasks:
+        return
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            loop.call_exception_handler({'message': 'unhandled exception during loops.run() shutdown',
+                                         'exception': task.exception(), 'task': task})
+
+
+def loop_name(loop: Optional[Any] = None) -> str:
+    '''`'uvloop'` or `'asyncio'`, for *loop* or the running loop.'''
+    loop = loop if loop is not None else asyncio.get_running_loop()
+    return 'uvloop' if type(loop).__module__.startswith('uvloop') else 'asyncio'
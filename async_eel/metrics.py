@@ -0,0 +1,149 @@
+from __future__ import annotations
+import bisect
+from typing import Any, Dict, List, Optional, Sequence
+
+# Lightweight metric primitives shared by the loop lag monitor and the call
+# statistics. Recording a value is a bisect and two additions.
+
+# Upper bounds in seconds, roughly logarithmic from 0.5 ms to 10 s.
+LATENCY_BUCKETS: Sequence[float] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                                    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    '''Fixed-bucket histogram of non-negative values.
+
+    :param buckets: Sorted upper bounds of the buckets; larger values go to
+        an implicit overflow bucket.
+    '''
+
+    __slots__ = ('buckets', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        '''Estimate the *q* quantile as the upper bound of the bucket holding it.'''
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {'count': self.count,
+                'avg': self.total / self.count if self.count else 0.0,
+                'p50': self.quantile(0.5),
+                'p99': self.quantile(0.99),
+                'max': self.max}
+
+
+class CallStats:
+    '''Counters and latency histogram of one function (or handler).'''
+
+    __slots__ = ('calls', 'errors', 'bytes_in', 'bytes_out', 'latency')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.latency = Histogram()
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {'calls': self.calls,
+                   'errors': self.errors,
+                   'bytes_in': self.bytes_in,
+                   'bytes_out': self.bytes_out}
+        summary['latency'] = self.latency.summary()
+        return summary
+
+
+class MetricsRegistry:
+    '''Call statistics keyed by kind and name.
+
+    Kinds used by AsyncEel are ``'py'`` (exposed Python functions called from
+    JS), ``'js'`` (JS functions called from Python) and ``'static'`` (files
+    served over HTTP).
+    '''
+
+    def __init__(self) -> None:
+        self._stats: Dict[str, Dict[str, CallStats]] = {}
+
+    def record(self, kind: str, name: str, duration: float, bytes_in: int = 0, bytes_out: int = 0,
+               error: bool = False) -> None:
+        by_name = self._stats.get(kind)
+        if by_name is None:
+            by_name = self._stats[kind] = {}
+        stats = by_name.get(name)
+        if stats is None:
+            stats = by_name[name] = CallStats()
+        stats.calls += 1
+        stats.errors += error
+        stats.bytes_in += bytes_in
+        stats.bytes_out += bytes_out
+        stats.latency.observe(duration)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {kind: {name: stats.summary() for name, stats in by_name.items()}
+                for kind, by_name in self._stats.items()}
+
+    def prometheus(self, histograms: Optional[Dict[str, Histogram]] = None) -> str:
+        '''Render all metrics in the Prometheus text exposition format.
+
+        :param histograms: Extra unlabelled histograms to include, by metric name.
+        '''
+        lines: List[str] = []
+        series = [(kind, name, stats) for kind, by_name in sorted(self._stats.items())
+                  for name, stats in sorted(by_name.items())]
+        counters = (('calls_total', 'Calls handled.', 'calls'),
+                    ('errors_total', 'Calls that did not complete successfully.', 'errors'),
+                    ('received_bytes_total', 'Payload bytes received.', 'bytes_in'),
+                    ('sent_bytes_total', 'Payload bytes sent.', 'bytes_out'))
+        for metric, help_text, attr in counters:
+            lines.append('# HELP async_eel_%s %s' % (metric, help_text))
+            lines.append('# TYPE async_eel_%s counter' % metric)
+            for kind, name, stats in series:
+                lines.append('async_eel_%s{%s} %d' % (metric, _labels(kind, name), getattr(stats, attr)))
+
+        lines.append('# HELP async_eel_call_duration_seconds Call latency.')
+        lines.append('# TYPE async_eel_call_duration_seconds histogram')
+        for kind, name, stats in series:
+            _histogram_lines(lines, 'async_eel_call_duration_seconds', stats.latency, _labels(kind, name))
+
+        for metric, histogram in (histograms or {}).items():
+            lines.append('# TYPE %s histogram' % metric)
+            _histogram_lines(lines, metric, histogram, '')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(kind: str, name: str) -> str:
+    escaped = name.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return 'kind="%s",name="%s"' % (kind, escaped)
+
+
+def _histogram_lines(lines: List[str], metric: str, histogram: Histogram, labels: str) -> None:
+    prefix = labels + ',' if labels else ''
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append('%s_bucket{%sle="%g"} %d' % (metric, prefix, bound, cumulative))
+    lines.append('%s_bucket{%sle="+Inf"} %d' % (metric, prefix, histogram.count))
+    suffix = '{%s}' % labels if labels else ''
+    lines.append('%s_sum%s %.6f' % (metric, suffix, histogram.total))
+    lines.append('%s_count%s %d' % (metric, suffix, histogram.count))
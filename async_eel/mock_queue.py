@@ -0,0 +1,102 @@
+from __future__ import annotations
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+# Calls to JS made before the page that should run them has connected.
+#
+# Each call is serialized once when queued and sent as is to the pages it is
+# delivered to. The queue holds at most `max_size` calls (the oldest are
+# evicted) for at most `ttl` seconds, so early pushes at startup cannot grow
+# without bound, and a new page is sent at most `max_size` calls.
+
+DeliveryT = Union[str, Sequence[str]]
+
+
+class PendingCall:
+    __slots__ = ('call_id', 'name', 'msg', 'queued_at', 'delivered')
+
+    def __init__(self, call_id: Any, name: str, msg: str):
+        self.call_id = call_id
+        self.name = name
+        self.msg = msg
+        self.queued_at = time.monotonic()
+        self.delivered: Set[str] = set()
+
+
+class MockQueue:
+    '''Bounded queue of calls to JS waiting for a page.
+
+    :param max_size: Maximum number of calls kept; the oldest are evicted.
+    :param ttl: Seconds a call is kept, or `None` to keep it until evicted.
+    :param delivery: `'first'` to send each call to the first page that
+        connects only, `'every'` to send it once to every page name that
+        connects while it is queued, or a list of page names to send it to
+        those pages only.
+    '''
+
+    def __init__(self, max_size: int = 1000, ttl: Optional[float] = 60.0, delivery: DeliveryT = 'every'):
+        self._calls: OrderedDict[Any, PendingCall] = OrderedDict()
+        self.expired = 0
+        self.evicted = 0
+        self.delivered = 0
+        self.configure(max_size, ttl, delivery)
+
+    def configure(self, max_size: int, ttl: Optional[float], delivery: DeliveryT) -> List[PendingCall]:
+        '''Change the limits; returns the calls dropped to meet them.'''
+        if not isinstance(max_size, int) or max_size < 0:
+            raise ValueError('`mock_queue_size` must be a non-negative int, got %r' % (max_size,))
+        if ttl is not None and (not isinstance(ttl, (int, float)) or ttl <= 0):
+            raise ValueError('`mock_queue_ttl` must be a positive number or None, got %r' % (ttl,))
+        if isinstance(delivery, str):
+            if delivery not in ('first', 'every'):
+                raise ValueError("`mock_delivery` must be 'first', 'every' or a list of pages, got %r" % (delivery,))
+            self._pages: Optional[Set[str]] = None
+        else:
+            self._pages = set(delivery)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.delivery = delivery
+        return self._trim()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def push(self, call_id: Any, name: str, msg: str) -> List[PendingCall]:
+        '''Queue the serialized call *msg*; returns the calls dropped to make room.'''
+        self._calls[call_id] = PendingCall(call_id, name, msg)
+        return self._trim()
+
+    def take(self, page: str) -> Tuple[List[str], List[PendingCall]]:
+        '''Messages to send to the newly connected *page*, and the calls that expired.'''
+        dropped = self._trim()
+        if self._pages is not None and page not in self._pages:
+            return [], dropped
+        messages = []
+        for call in list(self._calls.values()):
+            if page in call.delivered:
+                continue
+            call.delivered.add(page)
+            messages.append(call.msg)
+            self.delivered += 1
+            if self.delivery == 'first' or (self._pages is not None and call.delivered >= self._pages):
+                del self._calls[call.call_id]
+        return messages, dropped
+
+    def _trim(self) -> List[PendingCall]:
+        dropped = []
+        if self.ttl is not None:
+            oldest = time.monotonic() - self.ttl
+            while self._calls and next(iter(self._calls.values())).queued_at < oldest:
+                dropped.append(self._calls.popitem(last=False)[1])
+                self.expired += 1
+        while len(self._calls) > self.max_size:
+            dropped.append(self._calls.popitem(last=False)[1])
+            self.evicted += 1
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        return {'queued': len(self._calls),
+                'delivered': self.delivered,
+                'expired': self.expired,
+                'evicted': self.evicted}
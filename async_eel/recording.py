@@ -0,0 +1,86 @@
+from __future__ import annotations
+import gzip
+import json as jsn
+import time
+from typing import Any, Dict, IO, Iterator, List, Tuple
+
+# Recording of websocket traffic.
+#
+# The log is one JSON array per line, after a header object:
+#
+#     [seconds since start, connection number, kind, data]
+#
+# where kind is 'o' (connection opened, data is the page), '>' (frame received
+# from the page), '<' (frame sent to the page) or 'c' (connection closed, data
+# is null). Frames are stored as the raw text sent over the wire. Paths ending
+# in '.gz' are gzip compressed.
+
+FORMAT = 'async_eel-frames'
+VERSION = 1
+
+FrameT = Tuple[float, int, str, Any]
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class FrameRecorder:
+    '''Appends the websocket frames of every connection to *path*.'''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.frames = 0
+        self._file = _open(path, 'w')
+        self._started = time.perf_counter()
+        self._connections: Dict[int, int] = {}     # id(ws) -> connection number
+        self._next_connection = 1
+        self._file.write(jsn.dumps({'format': FORMAT, 'version': VERSION, 'started': time.time()}) + '\n')
+
+    def _write(self, connection: int, kind: str, data: Any) -> None:
+        offset = round(time.perf_counter() - self._started, 6)
+        self._file.write(jsn.dumps([offset, connection, kind, data], separators=(',', ':')) + '\n')
+        self.frames += 1
+
+    def opened(self, ws: Any, page: str) -> None:
+        connection = self._connections[id(ws)] = self._next_connection
+        self._next_connection += 1
+        self._write(connection, 'o', page)
+
+    def frame(self, ws: Any, kind: str, text: str) -> None:
+        '''Record *text* sent ('<') to or received ('>') from *ws*.'''
+        connection = self._connections.get(id(ws))
+        if connection is not None:
+            self._write(connection, kind, text)
+
+    def closed(self, ws: Any) -> None:
+        connection = self._connections.pop(id(ws), None)
+        if connection is not None:
+            self._write(connection, 'c', None)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_frames(path: str) -> Iterator[FrameT]:
+    '''Iterate over the frames of a log written by :class:`FrameRecorder`.'''
+    with _open(path, 'r') as f:
+        header = jsn.loads(f.readline())
+        if header.get('format') != FORMAT:
+            raise ValueError('%s is not an AsyncEel frame log' % path)
+        if header.get('version') != VERSION:
+            raise ValueError('Unsupported frame log version %r in %s' % (header.get('version'), path))
+        for line in f:
+            if line.strip():
+                offset, connection, kind, data = jsn.loads(line)
+                yield offset, connection, kind, data
+
+
+def split_connections(frames: Iterator[FrameT]) -> Dict[int, List[FrameT]]:
+    '''Group frames by connection number, keeping their order.'''
+    connections: Dict[int, List[FrameT]] = {}
+    for frame in frames:
+        connections.setdefault(frame[1], []).append(frame)
+    return connections
@@ -0,0 +1,76 @@
+from __future__ import annotations
+import functools
+from typing import Any, Callable, Dict, List, Optional
+
+from .cache import ResultCache
+
+# Exposed Python functions.
+#
+# `AsyncEel.expose` used on the class registers in the registry shared by every
+# instance; `eel.expose` used on an instance registers in that instance's own
+# registry, which falls back to the shared one. Several front ends can so be
+# served from one process, each with functions of its own.
+
+
+class hybridmethod:
+    '''Method bound to the instance when called on one, else to the class.'''
+
+    def __init__(self, function: Callable[..., Any]):
+        self.function = function
+        functools.update_wrapper(self, function)
+
+    def __get__(self, instance: Any, owner: type) -> Callable[..., Any]:
+        return functools.partial(self.function, owner if instance is None else instance)
+
+
+class FunctionRegistry:
+    '''Exposed functions, their options and result caches.
+
+    :param parent: Registry consulted for names not registered here.
+    '''
+
+    def __init__(self, parent: Optional[FunctionRegistry] = None):
+        self.parent = parent
+        self._functions: Dict[str, Callable[..., Any]] = {}
+        self._options: Dict[str, Dict[str, Any]] = {}
+        self._caches: Dict[str, ResultCache] = {}
+
+    def add(self, name: str, function: Callable[..., Any], options: Dict[str, Any],
+            cache: Optional[ResultCache] = None) -> None:
+        assert name not in self._functions, 'Already exposed function with name "%s"' % name
+        self._functions[name] = function
+        self._options[name] = options
+        if cache is not None:
+            self._caches[name] = cache
+
+    def _owner(self, name: str) -> Optional[FunctionRegistry]:
+        registry: Optional[FunctionRegistry] = self
+        while registry is not None and name not in registry._functions:
+            registry = registry.parent
+        return registry
+
+    def __contains__(self, name: str) -> bool:
+        return self._owner(name) is not None
+
+    def function(self, name: str) -> Callable[..., Any]:
+        owner = self._owner(name)
+        if owner is None:
+            raise KeyError(name)
+        return owner._functions[name]
+
+    def options(self, name: str) -> Dict[str, Any]:
+        owner = self._owner(name)
+        return owner._options[name] if owner is not None else {}
+
+    def cache(self, name: str) -> Optional[ResultCache]:
+        owner = self._owner(name)
+        return owner._caches.get(name) if owner is not None else None
+
+    def names(self) -> List[str]:
+        names = self.parent.names() if self.parent is not None else []
+        return names + [name for name in self._functions if name not in names]
+
+    def caches(self) -> Dict[str, ResultCache]:
+        caches = self.parent.caches() if self.parent is not None else {}
+        caches.update(self._caches)
+        return caches
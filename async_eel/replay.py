@@ -0,0 +1,164 @@
+'''Replay a websocket frame log against a running AsyncEel instance.
+
+Logs are recorded with :code:`eel.start(..., record_frames='frames.jsonl')`
+or :func:`AsyncEel.start_recording`. Every recorded connection is re-opened
+as a :class:`async_eel.headless.HeadlessPage` and its frames are sent with the
+recorded timing, optionally faster and multiplied::
+
+    python -m async_eel.replay frames.jsonl --url http://127.0.0.1:8000 --speed 4 --copies 20
+
+Calls from Python to JS are answered with the value the real page returned
+for the same function in the log. Handles and cursors returned by reference
+are not remapped, so calls through them fail on replay.
+'''
+from __future__ import annotations
+import argparse
+import asyncio
+import json as jsn
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .headless import HeadlessPage
+from .metrics import Histogram
+from .recording import FrameT, read_frames, split_connections
+
+
+def recorded_replies(connections: Dict[int, List[FrameT]]) -> Dict[str, Any]:
+    '''Last value returned by the pages for each JS function called from Python.'''
+    replies: Dict[str, Any] = {}
+    for frames in connections.values():
+        names: Dict[Any, str] = {}
+        for _, _, kind, data in frames:
+            if kind == '<' and '"call"' in data:
+                message = jsn.loads(data)
+                if 'name' in message:
+                    names[message['call']] = message['name']
+            elif kind == '>' and '"return"' in data:
+                message = jsn.loads(data)
+                name = names.get(message.get('return'))
+                if name is not None and message.get('status') == 'ok':
+                    replies[name] = message.get('value')
+    return replies
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.sent = 0
+        self.functions: Dict[str, Dict[str, Any]] = {}
+        self.unanswered = 0
+
+    def function(self, name: str) -> Dict[str, Any]:
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = {'calls': 0, 'errors': 0, 'latency': Histogram()}
+        return stats
+
+
+async def _replay_connection(url: str, frames: List[FrameT], replies: Dict[str, Any], speed: float,
+                             started: float, session: aiohttp.ClientSession, stats: _Stats,
+                             drain_timeout: float) -> None:
+    loop = asyncio.get_running_loop()
+    pending: Dict[Any, Tuple[str, float]] = {}
+    drained = asyncio.Event()
+
+    async def wait_until(offset: float) -> None:
+        delay = started + offset / speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def received(message: Dict[str, Any]) -> None:
+        if 'return' in message:
+            call = pending.pop(message['return'], None)
+            if call is not None:
+                function = stats.function(call[0])
+                function['latency'].observe(time.perf_counter() - call[1])
+                function['errors'] += message.get('status') != 'ok'
+                if not pending:
+                    drained.set()
+        elif 'call' in message and 'name' in message:
+            reply = {'return': message['call'], 'status': 'ok', 'value': replies.get(message['name'])}
+            asyncio.ensure_future(page.send_raw(jsn.dumps(reply)))
+
+    first = frames[0]
+    await wait_until(first[0])
+    page = HeadlessPage(url, first[3] if first[2] == 'o' else 'index.html', session)
+    page.on_message.append(received)
+    await page.connect()
+    try:
+        for offset, _, kind, data in frames:
+            if kind != '>':
+                continue
+            message = jsn.loads(data)
+            if 'return' in message:
+                continue        # Answered live by `received`
+            await wait_until(offset)
+            if 'call' in message:
+                name = message.get('name', 'handle')
+                stats.function(name)['calls'] += 1
+                drained.clear()
+                pending[message['call']] = (name, time.perf_counter())
+            await page.send_raw(data)
+            stats.sent += 1
+        await wait_until(frames[-1][0])
+        if pending:
+            try:
+                await asyncio.wait_for(drained.wait(), drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        stats.unanswered += len(pending)
+    finally:
+        await page.close()
+
+
+async def replay(path: str, url: str, speed: float = 1.0, copies: int = 1, drain_timeout: float = 10.0) -> Dict[str, Any]:
+    '''Replay the frame log *path* against the Eel server at *url*.
+
+    :param speed: Time scale, e.g. 4 replays four times faster than recorded.
+    :param copies: Number of simulated connections per recorded connection.
+    :param drain_timeout: Seconds to wait for outstanding replies before a
+        connection is closed.
+    :return: Frames sent, and calls, errors and latency per function.
+    '''
+    if speed <= 0:
+        raise ValueError('`speed` must be positive, got %r' % speed)
+    connections = split_connections(read_frames(path))
+    replies = recorded_replies(connections)
+    stats = _Stats()
+    started_wall = time.perf_counter()
+    # Websockets hold their connection, so the default pool limit of 100 would serialize large replays
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        started = asyncio.get_running_loop().time()
+        await asyncio.gather(*(_replay_connection(url, frames, replies, speed, started, session, stats, drain_timeout)
+                               for frames in connections.values() for _ in range(copies)))
+    return {'connections': len(connections) * copies,
+            'frames_sent': stats.sent,
+            'unanswered': stats.unanswered,
+            'seconds': time.perf_counter() - started_wall,
+            'functions': {name: {'calls': function['calls'],
+                                 'errors': function['errors'],
+                                 'latency': function['latency'].summary()}
+                          for name, function in stats.functions.items()}}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Replay an AsyncEel websocket frame log.')
+    parser.add_argument('log', help='frame log written by record_frames / start_recording()')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='base URL of the Eel server')
+    parser.add_argument('--speed', type=float, default=1.0, help='time scale, 2 replays twice as fast')
+    parser.add_argument('--copies', type=int, default=1, help='simulated connections per recorded connection')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(replay(args.log, args.url, args.speed, args.copies))
+    text = jsn.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
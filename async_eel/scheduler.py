@@ -0,0 +1,153 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+# Scheduling of calls to exposed functions.
+#
+# Each exposed function may declare a maximum concurrency, a priority class
+# and a bounded queue. Calls that cannot run immediately wait in a single
+# priority queue shared by all connections, and freed slots go to the highest
+# priority call whose function still has capacity.
+
+PRIORITIES: Dict[str, int] = {'high': 0, 'normal': 1, 'low': 2}
+
+
+class SchedulerBusy(Exception):
+    '''Raised when a call is rejected because its queue is full.'''
+
+
+def priority_value(priority: Union[str, int]) -> int:
+    '''Convert a priority class name (or an int, lower runs first) to its rank.'''
+    if isinstance(priority, int):
+        return priority
+    try:
+        return PRIORITIES[priority]
+    except KeyError:
+        raise ValueError('Unknown priority %r, expected one of %s or an int' % (priority, list(PRIORITIES))) from None
+
+
+class _FunctionStats:
+    __slots__ = ('running', 'queued', 'admitted', 'rejected', 'wait_total', 'wait_max')
+
+    def __init__(self) -> None:
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'running': self.running,
+                'queued': self.queued,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'wait_avg': self.wait_total / self.admitted if self.admitted else 0.0,
+                'wait_max': self.wait_max}
+
+
+# (priority, sequence, name, function limit, granted future)
+_PendingT = Tuple[int, int, str, Optional[int], 'asyncio.Future[None]']
+
+
+class CallScheduler:
+    '''Admission of exposed function calls by concurrency limit and priority.
+
+    :param max_concurrency: Limit of scheduled calls running at the same time
+        over all functions, or `None` for no global limit.
+    '''
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency
+        self._running = 0
+        self._pending: List[_PendingT] = []
+        self._sequence = itertools.count()
+        self._stats: Dict[str, _FunctionStats] = {}
+
+    def _has_capacity(self, stats: _FunctionStats, limit: Optional[int]) -> bool:
+        if self.max_concurrency is not None and self._running >= self.max_concurrency:
+            return False
+        return limit is None or stats.running < limit
+
+    def _start(self, stats: _FunctionStats, waited: float) -> None:
+        self._running += 1
+        stats.running += 1
+        stats.admitted += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+
+    @asynccontextmanager
+    async def slot(self, name: str, options: Dict[str, Any]) -> AsyncIterator[None]:
+        '''Wait for permission to run a call to *name*, configured by its expose *options*.'''
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _FunctionStats()
+        limit = options.get('max_concurrency')
+
+        if self._has_capacity(stats, limit):
+            # Every queued call is blocked by a limit, so running now cannot overtake one that could run.
+            self._start(stats, 0.0)
+        else:
+            max_queue = options.get('max_queue')
+            if max_queue is not None and stats.queued >= max_queue:
+                stats.rejected += 1
+                raise SchedulerBusy('Queue of "%s" is full (%d calls waiting)' % (name, stats.queued))
+            granted: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            entry = (priority_value(options.get('priority', 'normal')), next(self._sequence), name, limit, granted)
+            heapq.heappush(self._pending, entry)
+            stats.queued += 1
+            queued_at = time.perf_counter()
+            try:
+                await granted
+            except asyncio.CancelledError:
+                if granted.done() and not granted.cancelled():
+                    self._release(stats)     # Slot was granted just before the cancellation
+                else:
+                    stats.queued -= 1
+                    granted.cancel()
+                raise
+            waited = time.perf_counter() - queued_at
+            stats.wait_total += waited
+            stats.wait_max = max(stats.wait_max, waited)
+
+        try:
+            yield
+        finally:
+            self._release(stats)
+
+    def _release(self, stats: _FunctionStats) -> None:
+        self._running -= 1
+        stats.running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        blocked: List[_PendingT] = []
+        while self._pending:
+            if self.max_concurrency is not None and self._running >= self.max_concurrency:
+                break
+            entry = heapq.heappop(self._pending)
+            _, _, name, limit, granted = entry
+            if granted.cancelled():
+                continue
+            stats = self._stats[name]
+            if limit is not None and stats.running >= limit:
+                blocked.append(entry)
+                continue
+            stats.queued -= 1
+            self._running += 1
+            stats.running += 1
+            stats.admitted += 1
+            granted.set_result(None)
+        for entry in blocked:
+            heapq.heappush(self._pending, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        '''Queue depth, running calls and wait times, per function and in total.'''
+        functions = {name: stats.as_dict() for name, stats in self._stats.items()}
+        return {'running': self._running,
+                'queued': sum(stats.queued for stats in self._stats.values()),
+                'functions': functions}
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from typing import Any, Deque, Optional, Tuple
+
+# Resumable page sessions.
+#
+# async_eel.js connects with its `eel._guid` as session id and reconnects with
+# backoff when the websocket drops. A Session stands in for the websocket in
+# the rest of AsyncEel (as owner of handles, in the connection registry),
+# numbers every message sent to the page, and keeps those the page has not
+# acknowledged. On reconnect the page reports how many messages it received,
+# and the rest are sent again on the new websocket, so replies to in-flight
+# calls arrive.
+#
+# Pages acknowledge at least every ACK_MESSAGES messages or ACK_CHARS
+# characters received, so the characters not acknowledged yet also tell how
+# much is on its way to the page; bulk lane frames wait on it (see lanes.py).
+
+ACK_MESSAGES = 32
+ACK_CHARS = 256 * 1024
+
+
+class Session:
+    '''Outbound side of a page's connection that survives reconnects.
+
+    :param session_id: The page's :code:`eel._guid`.
+    :param max_buffer: Maximum number of unacknowledged messages kept. Older
+        ones are dropped, which makes the session impossible to resume.
+    :param max_buffer_chars: Maximum number of unacknowledged characters
+        kept, dropping older messages the same way.
+    '''
+
+    def __init__(self, session_id: str, page: str, ws: Any, max_buffer: int = 1000,
+                 max_buffer_chars: int = 64 * 1024 * 1024):
+        self.id = session_id
+        self.page = page
+        self.ws: Optional[Any] = ws
+        self.max_buffer = max_buffer
+        self.max_buffer_chars = max_buffer_chars
+        self.sent = 0          # Sequence number of the last message sent
+        self.resumes = 0
+        self.expiry: Optional[asyncio.TimerHandle] = None
+        self.unacked_chars = 0      # Characters sent and not acknowledged yet
+        self._unacked: Deque[Tuple[int, str]] = deque()
+        self._acked = asyncio.Event()     # Set when messages are acknowledged, or the websocket is gone
+
+    @property
+    def connected(self) -> bool:
+        return self.ws is not None
+
+    async def send_str(self, msg: str) -> None:
+        '''Send *msg* now if connected, and keep it until acknowledged.'''
+        self.sent += 1
+        self._unacked.append((self.sent, msg))
+        self.unacked_chars += len(msg)
+        while self._unacked and (len(self._unacked) > self.max_buffer
+                                 or self.unacked_chars > self.max_buffer_chars):
+            self.unacked_chars -= len(self._unacked.popleft()[1])
+        ws = self.ws
+        if ws is not None:
+            try:
+                await ws.send_str(msg)
+            except Exception:
+                pass        # Dropped connection, the message is sent again on resume
+
+    def ack(self, received: int) -> None:
+        '''Forget the messages the page has received, up to sequence number *received*.'''
+        unacked = self._unacked
+        while unacked and unacked[0][0] <= received:
+            self.unacked_chars -= len(unacked.popleft()[1])
+        self._acked.set()
+
+    async def wait_window(self, limit: int) -> None:
+        '''Wait while more than *limit* characters are not acknowledged, unless disconnected.'''
+        while self.ws is not None and self.unacked_chars > limit:
+            self._acked.clear()
+            await self._acked.wait()
+
+    def can_resume(self, received: int) -> bool:
+        first = self._unacked[0][0] if self._unacked else self.sent + 1
+        return first <= received + 1 <= self.sent + 1
+
+    async def attach(self, ws: Any, received: int) -> bool:
+        '''Resume on *ws* if the page has received message *received*, then resend the rest.'''
+        if not self.can_resume(received):
+            return False
+        if self.expiry is not None:
+            self.expiry.cancel()
+            self.expiry = None
+        self.ack(received)
+        resent = received
+        while self._unacked and self._unacked[-1][0] > resent:
+            # Messages sent meanwhile are buffered only, and picked up by the next round
+            for seq, msg in [entry for entry in self._unacked if entry[0] > resent]:
+                await ws.send_str(msg)
+                resent = seq
+        self.ws = ws
+        self.resumes += 1
+        return True
+
+    def detach(self) -> None:
+        self.ws = None
+        self._acked.set()       # Messages are only buffered until the page is back
+
+    @property
+    def unacked(self) -> int:
+        return len(self._unacked)
@@ -0,0 +1,274 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Callable, Iterable, Tuple
+
+# Observable shared state mirrored into the browser.
+#
+# A SharedState is a dict whose nested dicts and lists are replaced by tracked
+# containers. Every mutation is recorded as a JSON-patch (RFC 6902) operation
+# ('add', 'remove' or 'replace') with a JSON pointer path, so only the changed
+# part of the state is serialized and sent to the connected pages.
+
+PatchOpT = Dict[str, Any]
+
+
+def _escape(key: Any) -> str:
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _plain(value: Any) -> Any:
+    '''Deep copy *value* into plain JSON-compatible containers.'''
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+class _Tracked:
+    _parent: Optional[_Tracked]
+    _key: Any
+
+    def _path(self) -> str:
+        if self._parent is None:
+            return ''
+        return self._parent._path() + '/' + _escape(self._key)
+
+    def _root(self) -> Optional[SharedState]:
+        node: Optional[_Tracked] = self
+        while node is not None and node._parent is not None:
+            node = node._parent
+        return node if isinstance(node, SharedState) else None
+
+    def _record(self, op: str, key: Any, value: Any = None) -> None:
+        root = self._root()
+        if root is None:
+            return
+        entry: PatchOpT = {'op': op, 'path': self._path() + '/' + _escape(key)}
+        if op != 'remove':
+            entry['value'] = _plain(value)
+        root._push(entry)
+
+    def _wrap(self, key: Any, value: Any) -> Any:
+        if isinstance(value, _Tracked):
+            value = _plain(value)
+        if isinstance(value, dict):
+            return TrackedDict(value, parent=self, key=key)
+        if isinstance(value, (list, tuple)):
+            return TrackedList(value, parent=self, key=key)
+        return value
+
+    def _detach(self, value: Any) -> None:
+        if isinstance(value, _Tracked):
+            value._parent = None
+
+
+class TrackedDict(_Tracked, dict):
+    '''A :class:`dict` that reports its mutations to the owning :class:`SharedState`.'''
+
+    def __init__(self, value: Optional[Dict[Any, Any]] = None, parent: Optional[_Tracked] = None, key: Any = None):
+        dict.__init__(self)
+        self._parent = parent
+        self._key = key
+        for k, v in (value or {}).items():
+            dict.__setitem__(self, k, self._wrap(k, v))
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        op = 'replace' if key in self else 'add'
+        if op == 'replace':
+            self._detach(dict.__getitem__(self, key))
+        dict.__setitem__(self, key, self._wrap(key, value))
+        self._record(op, key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        self._detach(dict.__getitem__(self, key))
+        dict.__delitem__(self, key)
+        self._record('remove', key)
+
+    _missing = object()
+
+    def pop(self, key: Any, default: Any = _missing) -> Any:
+        if key not in self:
+            if default is TrackedDict._missing:
+                raise KeyError(key)
+            return default
+        value = dict.__getitem__(self, key)
+        del self[key]
+        return value
+
+    def popitem(self) -> Tuple[Any, Any]:
+        if not self:
+            raise KeyError('popitem(): dictionary is empty')
+        key = next(reversed(list(dict.keys(self))))
+        return key, self.pop(key)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self) -> None:
+        for key in list(dict.keys(self)):
+            del self[key]
+
+    def __ior__(self, other: Any) -> TrackedDict:
+        self.update(other)
+        return self
+
+
+class TrackedList(_Tracked, list):
+    '''A :class:`list` that reports its mutations to the owning :class:`SharedState`.'''
+
+    def __init__(self, value: Iterable[Any] = (), parent: Optional[_Tracked] = None, key: Any = None):
+        list.__init__(self)
+        self._parent = parent
+        self._key = key
+        for v in value:
+            list.append(self, self._wrap(len(self), v))
+
+    def _rekey(self, start: int) -> None:
+        # Tracked children store their index, which shifts on insert/delete.
+        for i in range(max(start, 0), len(self)):
+            item = list.__getitem__(self, i)
+            if isinstance(item, _Tracked):
+                item._key = i
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('list index out of range')
+        return index
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        if isinstance(index, slice):
+            items = list.__getitem__(self, slice(None))
+            items[index] = value
+            self._replace_all(items)
+            return
+        index = self._index(index)
+        self._detach(list.__getitem__(self, index))
+        list.__setitem__(self, index, self._wrap(index, value))
+        self._record('replace', index, value)
+
+    def __delitem__(self, index: Any) -> None:
+        if isinstance(index, slice):
+            for i in sorted(range(*index.indices(len(self))), reverse=True):
+                del self[i]
+            return
+        index = self._index(index)
+        self._detach(list.__getitem__(self, index))
+        list.__delitem__(self, index)
+        self._rekey(index)
+        self._record('remove', index)
+
+    def insert(self, index: int, value: Any) -> None:
+        length = len(self)
+        if index < 0:
+            index = max(length + index, 0)
+        index = min(index, length)
+        list.insert(self, index, self._wrap(index, value))
+        self._rekey(index + 1)
+        self._record('add', index, value)
+
+    def append(self, value: Any) -> None:
+        self.insert(len(self), value)
+
+    def extend(self, values: Iterable[Any]) -> None:
+        for value in list(values):
+            self.append(value)
+
+    def __iadd__(self, values: Iterable[Any]) -> TrackedList:  # type: ignore[override]
+        self.extend(values)
+        return self
+
+    def __imul__(self, times: int) -> TrackedList:  # type: ignore[override]
+        self._replace_all(list.__getitem__(self, slice(None)) * times)
+        return self
+
+    def pop(self, index: int = -1) -> Any:
+        index = self._index(index)
+        value = list.__getitem__(self, index)
+        del self[index]
+        return value
+
+    def remove(self, value: Any) -> None:
+        del self[self.index(value)]
+
+    def clear(self) -> None:
+        self._replace_all([])
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        items = list.__getitem__(self, slice(None))
+        items.sort(*args, **kwargs)
+        self._replace_all(items)
+
+    def reverse(self) -> None:
+        self._replace_all(list.__getitem__(self, slice(None))[::-1])
+
+    def _replace_all(self, items: List[Any]) -> None:
+        # Reordering operations are sent as a single 'replace' of the list.
+        plain = _plain(items)
+        for item in list.__iter__(self):
+            self._detach(item)
+        list.clear(self)
+        for v in plain:
+            list.append(self, self._wrap(len(self), v))
+        if self._parent is not None:
+            self._parent._record('replace', self._key, plain)
+
+
+class SharedState(TrackedDict):
+    '''A dict whose mutations are pushed to the browser as JSON-patch deltas.
+
+    Instances are created by :func:`AsyncEel.shared_state`. Mutations made in
+    the same event loop iteration are batched into one patch message and each
+    patch bumps :attr:`version` by one. Pages receive a full snapshot when they
+    connect, and request one again if they ever observe a version gap.
+
+    :Example:
+
+        >>> state = eel.shared_state('app', {'items': []})
+        >>> state['items'].append({'id': 1})     # sends one 'add' op
+    '''
+
+    def __init__(self, name: str, value: Optional[Dict[Any, Any]] = None,
+                 on_patch: Optional[Callable[[SharedState], None]] = None):
+        self.name = name
+        self.version = 0
+        self._pending: List[PatchOpT] = []
+        self._on_patch = on_patch
+        TrackedDict.__init__(self, value)
+
+    def _push(self, op: PatchOpT) -> None:
+        first = not self._pending
+        self._pending.append(op)
+        if first and self._on_patch is not None:
+            self._on_patch(self)
+
+    @property
+    def changed(self) -> bool:
+        '''Whether there are mutations not taken as a patch yet.'''
+        return bool(self._pending)
+
+    def take_patch(self) -> Optional[Dict[str, Any]]:
+        '''Return the pending delta message and advance the version, or `None`.'''
+        if not self._pending:
+            return None
+        ops, self._pending = self._pending, []
+        self.version += 1
+        return {'state': self.name, 'version': self.version, 'patch': ops}
+
+    def snapshot(self) -> Dict[str, Any]:
+        '''Return the full-resync message for the current version.
+
+        Any pending operations are folded into the version first, so a
+        snapshot never overlaps a patch that has not been sent yet.
+        '''
+        if self._pending:
+            self._pending = []
+            self.version += 1
+        return {'state': self.name, 'version': self.version, 'value': _plain(self)}
@@ -0,0 +1,77 @@
+from __future__ import annotations
+import json as jsn
+import threading
+import time
+from typing import Any, Callable, Dict, IO, Optional
+
+# Structured tracing for the hot paths of AsyncEel.
+#
+# Call sites guard every record with `if tracer.enabled:`, so when tracing is
+# off nothing is formatted or allocated. When on, each record is a flat dict
+# (span name, call id, function, connection, timings) handed to a sink.
+
+SinkT = Callable[[Dict[str, Any]], None]
+
+
+class JsonlSink:
+    '''Sink appending one JSON object per line to *path*.'''
+
+    def __init__(self, path: str):
+        self._file: IO[str] = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        line = jsn.dumps(record, default=repr) + '\n'
+        with self._lock:
+            self._file.write(line)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    '''Dispatches trace records to a sink while enabled.'''
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._sink: Optional[SinkT] = None
+
+    def enable(self, sink: SinkT) -> None:
+        '''Start tracing into *sink*, any callable taking a record dict.'''
+        self._sink = sink
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+        sink, self._sink = self._sink, None
+        close = getattr(sink, 'close', None)
+        if callable(close):
+            close()
+
+    def emit(self, span: str, **fields: Any) -> None:
+        '''Send a record; callers check :attr:`enabled` first.'''
+        sink = self._sink
+        if sink is not None:
+            fields['span'] = span
+            fields['ts'] = time.time()
+            sink(fields)
+
+
+tracer = Tracer()
+
+
+def enable(sink: SinkT) -> None:
+    '''Enable tracing of calls, replies and static requests into *sink*.
+
+    :Example:
+
+        >>> from async_eel import tracing
+        >>> tracing.enable(tracing.JsonlSink('eel_trace.jsonl'))
+    '''
+    tracer.enable(sink)
+
+
+def disable() -> None:
+    '''Disable tracing and close the sink if it has a ``close()`` method.'''
+    tracer.disable()
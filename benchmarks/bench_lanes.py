@@ -0,0 +1,198 @@
+'''Latency of interactive calls while exports are sent to the same page.
+
+Starts AsyncEel in its own process, and connects a page that reads what it
+receives at the pace of a network link (``--link-mbps``), so large replies
+back up in the socket buffers as they would on a real network. While
+``--exports`` calls download ``--export-mb`` each, the page makes small calls
+one after the other and measures their round trip. Runs once with the
+exports in the control lane and once in the bulk lane::
+
+    python benchmarks/bench_lanes.py --quick --output lanes.json
+
+The page speaks the wire protocol itself rather than through
+:class:`async_eel.headless.HeadlessPage`, to pace its reads. It has a
+session and acknowledges what it receives like async_eel.js, which the bulk
+lane needs.
+'''
+from __future__ import annotations
+import argparse
+import asyncio
+import json as jsn
+import os
+import platform
+import random as rnd
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_eel.async_eel import AsyncEel                    # noqa: E402
+from async_eel.chunking import PREFIX                       # noqa: E402
+from async_eel.sessions import ACK_CHARS, ACK_MESSAGES      # noqa: E402
+
+
+@AsyncEel.expose
+def bench_echo(payload: Any) -> Any:
+    return payload
+
+
+@AsyncEel.expose
+def bench_export(size: int) -> str:
+    return 'x' * size
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _latency_metrics(samples: List[float]) -> Dict[str, float]:
+    return {'count': len(samples),
+            'mean_ms': sum(samples) / len(samples) * 1000,
+            'p50_ms': _percentile(samples, 0.5) * 1000,
+            'p99_ms': _percentile(samples, 0.99) * 1000,
+            'max_ms': max(samples) * 1000}
+
+
+async def serve() -> None:
+    with tempfile.TemporaryDirectory() as web_dir:
+        eel = AsyncEel()
+        eel.init(web_dir)
+        # Port 0: the kernel picks a free port as the socket is bound, with no window for another process
+        await eel.start(mode=None, port=0, heartbeat=None, shutdown_delay=3600.0)
+        print('ready', eel._start_args['port'], flush=True)
+        await eel.wait_closed()
+
+
+class PacedPage:
+    '''A page reading at *link_mbps*, with a session acknowledged like async_eel.js.'''
+
+    def __init__(self, url: str, session: aiohttp.ClientSession, link_mbps: float):
+        self.url = url
+        self.session = session
+        self.seconds_per_char = 8 / (link_mbps * 1e6)
+        self.exports_done = 0
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._pending: Dict[float, asyncio.Future] = {}
+        self._calls = 0
+        self._reader: Optional[asyncio.Task] = None
+
+    async def connect(self, session_id: str) -> None:
+        self._ws = await self.session.ws_connect('%s/eel?page=bench.html&session=%s&ack=0' % (self.url, session_id),
+                                                 max_msg_size=0)
+        self._reader = asyncio.ensure_future(self._read())
+
+    async def close(self) -> None:
+        assert self._ws is not None and self._reader is not None
+        await self._ws.close()
+        await self._reader
+
+    async def call(self, name: str, *args: Any, lane: Optional[str] = None) -> 'asyncio.Future[Any]':
+        '''Send a call; returns the future of its reply.'''
+        assert self._ws is not None
+        self._calls += 1
+        call_id = self._calls + rnd.random()
+        message: Dict[str, Any] = {'call': call_id, 'name': name, 'args': list(args)}
+        if lane is not None:
+            message['lane'] = lane
+        future = self._pending[call_id] = asyncio.get_running_loop().create_future()
+        await self._ws.send_str(jsn.dumps(message))
+        return future
+
+    async def _read(self) -> None:
+        assert self._ws is not None
+        received = acked = acked_chars = 0
+        async for msg in self._ws:
+            data = msg.data
+            if data.startswith('{"session"'):
+                continue
+            received += 1
+            acked_chars += len(data)
+            if received - acked >= ACK_MESSAGES or acked_chars >= ACK_CHARS:
+                acked, acked_chars = received, 0
+                await self._ws.send_str(jsn.dumps({'ack': received}))
+            if data.startswith(PREFIX):
+                await asyncio.sleep(len(data) * self.seconds_per_char)   # Export frames, delivered at the link rate
+                part, parts = data[len(PREFIX):].split(':', 4)[1:3]
+                if int(part) + 1 == int(parts):
+                    self.exports_done += 1
+                continue
+            message = jsn.loads(data)
+            future = self._pending.pop(message.get('return'), None)
+            if future is not None:
+                future.set_result(message['value'])
+
+
+async def bench_ui_during_export(url: str, exports: int, export_bytes: int, link_mbps: float) -> List[Dict[str, Any]]:
+    results = []
+    async with aiohttp.ClientSession() as session:
+        for lane in ('control', 'bulk'):
+            page = PacedPage(url, session, link_mbps)
+            await page.connect('bench-%s' % lane)
+            await (await page.call('bench_echo', None))
+            started = time.perf_counter()
+            for _ in range(exports):
+                await page.call('bench_export', export_bytes, lane=lane)
+            await asyncio.sleep(0.1)        # Exports are under way
+            samples = []
+            while page.exports_done < exports:
+                call_started = time.perf_counter()
+                await (await page.call('bench_echo', 'ping'))
+                samples.append(time.perf_counter() - call_started)
+                await asyncio.sleep(0.005)
+            results.append({'benchmark': 'ui_during_export',
+                            'params': {'export_lane': lane, 'exports': exports, 'export_bytes': export_bytes,
+                                       'link_mbps': link_mbps},
+                            'metrics': dict(_latency_metrics(samples), export_seconds=time.perf_counter() - started)})
+            await page.close()
+    return results
+
+
+async def run(quick: bool, output: Optional[str], exports: int, export_mb: float, link_mbps: float) -> None:
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve'], stdout=subprocess.PIPE, text=True)
+    try:
+        assert server.stdout is not None
+        ready, port = (await asyncio.get_running_loop().run_in_executor(None, server.stdout.readline)).split()
+        assert ready == 'ready'
+        export_bytes = int(export_mb * 1e6 * (0.25 if quick else 1.0))
+        results = await bench_ui_during_export('http://127.0.0.1:%s' % port, exports, export_bytes, link_mbps)
+    finally:
+        server.terminate()
+        server.wait()
+    report = {'meta': {'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'aiohttp': aiohttp.__version__,
+                       'quick': quick,
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'results': results}
+    text = jsn.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--quick', action='store_true', help='smaller exports, for smoke runs')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--exports', type=int, default=2, help='exports sent at the same time')
+    parser.add_argument('--export-mb', type=float, default=20.0, help='size of each export, in MB')
+    parser.add_argument('--link-mbps', type=float, default=500.0, help='rate the page reads at, in Mbit/s')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)    # Server process
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(serve())
+    else:
+        asyncio.run(run(args.quick, args.output, args.exports, args.export_mb, args.link_mbps))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+'''Gains of the throughput profile over AsyncEel's default options.
+
+Runs ``bench_wire.py`` once with ``--profile default`` and once with
+``--profile throughput`` (``AsyncEel.THROUGHPUT_OPTIONS``, on uvloop when it
+is installed), each in its own process, and reports for every scenario the
+speedup of the throughput profile: the ratio of mean latencies, or of rates
+per second. Above 1 is a gain::
+
+    python benchmarks/bench_profile.py --quick --output profile.json
+'''
+from __future__ import annotations
+import argparse
+import json as jsn
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+BENCH_WIRE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_wire.py')
+
+
+def _run_profile(profile: str, quick: bool) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'bench.json')
+        subprocess.run([sys.executable, BENCH_WIRE, '--profile', profile, '--output', output]
+                       + (['--quick'] if quick else []), check=True)
+        with open(output) as f:
+            return jsn.load(f)
+
+
+def _key_metrics(metrics: Dict[str, Any], prefix: str = '') -> Iterator[Tuple[str, float, bool]]:
+    '''(name, value, higher is better) of the latency means and rates in *metrics*.'''
+    for name, value in metrics.items():
+        if isinstance(value, dict):
+            yield from _key_metrics(value, prefix + name + '.')
+        elif name == 'mean_ms':
+            yield prefix + name, value, False
+        elif name.endswith('_per_second'):
+            yield prefix + name, value, True
+
+
+def compare(default: Dict[str, Any], throughput: Dict[str, Any]) -> List[Dict[str, Any]]:
+    tuned = {(result['benchmark'], jsn.dumps(result['params'], sort_keys=True)): result
+             for result in throughput['results']}
+    gains = []
+    for result in default['results']:
+        other = tuned.get((result['benchmark'], jsn.dumps(result['params'], sort_keys=True)))
+        if other is None:
+            continue
+        tuned_metrics = {name: value for name, value, _ in _key_metrics(other['metrics'])}
+        for name, value, higher_is_better in _key_metrics(result['metrics']):
+            if name in tuned_metrics and value and tuned_metrics[name]:
+                speedup = tuned_metrics[name] / value if higher_is_better else value / tuned_metrics[name]
+                gains.append({'benchmark': result['benchmark'], 'params': result['params'], 'metric': name,
+                              'default': value, 'throughput': tuned_metrics[name], 'speedup': speedup})
+    return gains
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--quick', action='store_true', help='fewer iterations, for smoke runs')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    default = _run_profile('default', args.quick)
+    throughput = _run_profile('throughput', args.quick)
+    report = {'meta': dict(default['meta'], event_loop={'default': default['meta']['event_loop'],
+                                                        'throughput': throughput['meta']['event_loop']}),
+              'gains': compare(default, throughput)}
+    report['meta'].pop('profile', None)
+    text = jsn.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
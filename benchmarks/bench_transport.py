@@ -0,0 +1,75 @@
+'''Call latency over TCP loopback versus a Unix domain socket.
+
+Starts one AsyncEel instance serving both on a TCP port and on a Unix
+socket (``start(unix_socket=...)``) and measures the round trip of JS->Python
+calls by payload size over each, with the ``rtt`` scenario of
+``bench_wire.py``::
+
+    python benchmarks/bench_transport.py --output transport.json
+'''
+from __future__ import annotations
+import argparse
+import asyncio
+import json as jsn
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_wire import AsyncEel, HeadlessPage, bench_rtt     # noqa: E402
+
+
+async def run(quick: bool, output: Optional[str]) -> None:
+    calls = 40 if quick else 500
+    sizes = [64, 1024, 64 * 1024]
+    with tempfile.TemporaryDirectory() as web_dir:
+        socket_path = os.path.join(web_dir, 'eel.sock')
+        eel = AsyncEel()
+        eel.init(web_dir)
+        await eel.start(mode=None, port=0, unix_socket=socket_path, heartbeat=None)
+
+        results: List[Dict[str, Any]] = []
+        transports = {'tcp': ('http://127.0.0.1:%d' % eel._start_args['port'], aiohttp.TCPConnector(limit=0)),
+                      'unix': ('http://localhost', aiohttp.UnixConnector(socket_path, limit=0))}
+        for transport, (url, connector) in transports.items():
+            async with aiohttp.ClientSession(connector=connector) as session:
+                # Keeps Eel from shutting down between scenarios
+                anchor = HeadlessPage(url, 'anchor.html', session)
+                await anchor.connect()
+                for result in await bench_rtt(url, session, sizes, calls):
+                    result['params']['transport'] = transport
+                    results.append(result)
+                await anchor.close()
+
+        report = {'meta': {'python': platform.python_version(),
+                           'platform': platform.platform(),
+                           'aiohttp': aiohttp.__version__,
+                           'quick': quick,
+                           'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+                  'results': results}
+        text = jsn.dumps(report, indent=2)
+        if output:
+            with open(output, 'w') as f:
+                f.write(text + '\n')
+        else:
+            print(text)
+        await eel.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--quick', action='store_true', help='fewer iterations, for smoke runs')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    asyncio.run(run(args.quick, args.output))
+
+
+if __name__ == '__main__':
+    main()
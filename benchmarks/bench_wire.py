@@ -0,0 +1,270 @@
+'''Wire protocol benchmarks for AsyncEel.
+
+Starts AsyncEel without a browser (``mode=None``) and drives ``/eel`` with
+:class:`async_eel.headless.HeadlessPage` clients, which speak the same
+protocol as async_eel.js. Measures:
+
+* ``rtt``: round-trip latency of JS->Python calls, by payload size.
+* ``throughput``: JS->Python calls per second, by number of connections.
+* ``broadcast``: time for a Python->JS call to reach every connection.
+* ``js_calls``: Python->JS calls answered by the pages, awaited one by one
+  and with callbacks, by number of connections (windows).
+* ``static``: static file requests per second and bandwidth, by file size.
+
+Results are printed (or written with ``--output``) as JSON, so runs can be
+compared to catch regressions in the hot paths::
+
+    python benchmarks/bench_wire.py --quick --output bench.json
+
+``--profile throughput`` starts AsyncEel with ``AsyncEel.THROUGHPUT_OPTIONS``
+and runs on uvloop when it is installed; ``bench_profile.py`` compares both.
+'''
+from __future__ import annotations
+import argparse
+import asyncio
+import json as jsn
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_eel.async_eel import AsyncEel                # noqa: E402
+from async_eel.headless import HeadlessPage             # noqa: E402
+from async_eel import loops                             # noqa: E402
+
+PAGE_HTML = '''<html><head><script src="/eel.js"></script></head>
+<body><script>eel.expose(bench_sink); function bench_sink(x) {}</script></body></html>
+'''
+
+
+@AsyncEel.expose
+def bench_echo(payload: Any) -> Any:
+    return payload
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _latency_metrics(samples: List[float]) -> Dict[str, float]:
+    return {'count': len(samples),
+            'mean_ms': sum(samples) / len(samples) * 1000,
+            'p50_ms': _percentile(samples, 0.5) * 1000,
+            'p99_ms': _percentile(samples, 0.99) * 1000,
+            'max_ms': max(samples) * 1000}
+
+
+async def _close(pages: List[HeadlessPage]) -> None:
+    await asyncio.gather(*(page.close() for page in pages))
+
+
+async def _connect(url: str, count: int, session: aiohttp.ClientSession) -> List[HeadlessPage]:
+    pages = [HeadlessPage(url, 'bench.html', session) for _ in range(count)]
+    for page in pages:
+        page.expose(lambda x: x, 'bench_js_echo')
+    await asyncio.gather(*(page.connect() for page in pages))
+    # The first reply means Eel has registered the page, so broadcasts reach it
+    await asyncio.gather(*(page.call('bench_echo', None) for page in pages))
+    return pages
+
+
+async def bench_rtt(url: str, session: aiohttp.ClientSession, sizes: List[int], calls: int) -> List[Dict[str, Any]]:
+    results = []
+    page, = await _connect(url, 1, session)
+    for size in sizes:
+        payload = 'x' * size
+        samples = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            await page.call('bench_echo', payload)
+            samples.append(time.perf_counter() - started)
+        results.append({'benchmark': 'rtt', 'params': {'payload_bytes': size}, 'metrics': _latency_metrics(samples)})
+    await page.close()
+    return results
+
+
+async def bench_throughput(url: str, session: aiohttp.ClientSession, connections: List[int],
+                           duration: float, in_flight: int = 8) -> List[Dict[str, Any]]:
+    results = []
+    for count in connections:
+        pages = await _connect(url, count, session)
+        done = 0
+        stop_at = time.perf_counter() + duration
+
+        async def worker(page: HeadlessPage) -> None:
+            nonlocal done
+            while time.perf_counter() < stop_at:
+                await asyncio.gather(*(page.call('bench_echo', 'ping') for _ in range(in_flight)))
+                done += in_flight
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(page) for page in pages))
+        elapsed = time.perf_counter() - started
+        results.append({'benchmark': 'throughput',
+                        'params': {'connections': count, 'in_flight_per_connection': in_flight},
+                        'metrics': {'calls': done, 'seconds': elapsed, 'calls_per_second': done / elapsed}})
+        await _close(pages)
+    return results
+
+
+async def bench_broadcast(eel: AsyncEel, url: str, session: aiohttp.ClientSession, connections: List[int],
+                          sizes: List[int], rounds: int) -> List[Dict[str, Any]]:
+    results = []
+    for count in connections:
+        pages = await _connect(url, count, session)
+        for size in sizes:
+            payload = 'x' * size
+            samples = []
+            for _ in range(rounds):
+                remaining = count
+                all_received = asyncio.get_running_loop().create_future()
+
+                def received(message: Dict[str, Any]) -> None:
+                    nonlocal remaining
+                    if message.get('name') == 'bench_sink':
+                        remaining -= 1
+                        if remaining == 0 and not all_received.done():
+                            all_received.set_result(None)
+
+                for page in pages:
+                    page.on_message.append(received)
+                started = time.perf_counter()
+                eel.bench_sink(payload)
+                await asyncio.wait_for(all_received, 30)
+                samples.append(time.perf_counter() - started)
+                for page in pages:
+                    page.on_message.remove(received)
+            results.append({'benchmark': 'broadcast',
+                            'params': {'connections': count, 'payload_bytes': size},
+                            'metrics': _latency_metrics(samples)})
+        await _close(pages)
+    return results
+
+
+async def bench_js_calls(eel: AsyncEel, url: str, session: aiohttp.ClientSession, connections: List[int],
+                         calls: int) -> List[Dict[str, Any]]:
+    results = []
+    for count in connections:
+        pages = await _connect(url, count, session)
+        stale_before = len(eel._call_return_values)
+
+        samples = []
+        for i in range(calls):
+            started = time.perf_counter()
+            await eel.bench_js_echo(i)()
+            samples.append(time.perf_counter() - started)
+        metrics: Dict[str, Any] = {'awaited': _latency_metrics(samples)}
+
+        answered = 0
+        all_answered = asyncio.get_running_loop().create_future()
+
+        def callback(value: Any) -> None:
+            nonlocal answered
+            answered += 1
+            if answered == calls and not all_answered.done():
+                all_answered.set_result(None)
+
+        started = time.perf_counter()
+        for i in range(calls):
+            await eel.bench_js_echo(i)(callback)
+        await asyncio.wait_for(all_answered, 30)
+        elapsed = time.perf_counter() - started
+        metrics['callbacks'] = {'calls': calls, 'seconds': elapsed, 'calls_per_second': calls / elapsed}
+        # Every window answers a call; replies after the first one are left in _call_return_values
+        await asyncio.sleep(0.1)
+        metrics['stale_return_values'] = len(eel._call_return_values) - stale_before
+        results.append({'benchmark': 'js_calls', 'params': {'connections': count}, 'metrics': metrics})
+        await _close(pages)
+    return results
+
+
+async def bench_static(url: str, session: aiohttp.ClientSession, files: Dict[str, int],
+                       requests: int, in_flight: int = 16) -> List[Dict[str, Any]]:
+    results = []
+    for name, size in files.items():
+        semaphore = asyncio.Semaphore(in_flight)
+
+        async def fetch() -> int:
+            async with semaphore:
+                async with session.get('%s/%s' % (url, name)) as response:
+                    return len(await response.read())
+
+        started = time.perf_counter()
+        received = sum(await asyncio.gather(*(fetch() for _ in range(requests))))
+        elapsed = time.perf_counter() - started
+        results.append({'benchmark': 'static',
+                        'params': {'file_bytes': size, 'in_flight': in_flight},
+                        'metrics': {'requests': requests, 'seconds': elapsed,
+                                    'requests_per_second': requests / elapsed,
+                                    'megabytes_per_second': received / elapsed / 1e6}})
+    return results
+
+
+PROFILES: Dict[str, Dict[str, Any]] = {'default': {}, 'throughput': AsyncEel.THROUGHPUT_OPTIONS}
+
+
+async def run(quick: bool, output: Optional[str], profile: str = 'default') -> None:
+    scale = 0.2 if quick else 1.0
+    with tempfile.TemporaryDirectory() as web_dir:
+        with open(os.path.join(web_dir, 'bench.html'), 'w') as f:
+            f.write(PAGE_HTML)
+        files = {'static_1k.bin': 1024, 'static_100k.bin': 100 * 1024, 'static_1m.bin': 1024 * 1024}
+        for name, size in files.items():
+            with open(os.path.join(web_dir, name), 'wb') as f:
+                f.write(os.urandom(size))
+
+        eel = AsyncEel()
+        eel.init(web_dir)
+        eel.declare_js_functions('bench_js_echo')
+        await eel.start('bench.html', mode=None, port=0, **PROFILES[profile])
+        url = 'http://127.0.0.1:%d' % eel._start_args['port']
+
+        results: List[Dict[str, Any]] = []
+        # Websockets hold their connection, so the default pool limit of 100 would block the larger runs
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            # One page stays connected for the whole run, so Eel does not shut down between scenarios
+            anchor = HeadlessPage(url, 'anchor.html', session)
+            await anchor.connect()
+            results += await bench_rtt(url, session, [64, 1024, 64 * 1024, 1024 * 1024], max(int(200 * scale), 10))
+            results += await bench_throughput(url, session, [1, 8, 32], 2.0 * scale)
+            results += await bench_broadcast(eel, url, session, [1, 8, 32, 128], [64, 64 * 1024],
+                                             max(int(50 * scale), 5))
+            results += await bench_js_calls(eel, url, session, [1, 8], max(int(200 * scale), 10))
+            results += await bench_static(url, session, files, max(int(500 * scale), 20))
+
+            report = {'meta': {'python': platform.python_version(),
+                               'platform': platform.platform(),
+                               'aiohttp': aiohttp.__version__,
+                               'quick': quick,
+                               'profile': profile,
+                               'event_loop': loops.loop_name(),
+                               'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+                      'results': results}
+            text = jsn.dumps(report, indent=2)
+            if output:
+                with open(output, 'w') as f:
+                    f.write(text + '\n')
+            else:
+                print(text)
+            await eel.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--quick', action='store_true', help='fewer iterations, for smoke runs')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='default', help='start options to use')
+    args = parser.parse_args()
+
+    AsyncEel.run(run(args.quick, args.output, args.profile), uvloop=PROFILES[args.profile].get('uvloop', False))
+
+
+if __name__ == '__main__':
+    main()
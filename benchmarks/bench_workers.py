@@ -0,0 +1,124 @@
+'''Multi-worker throughput benchmark for AsyncEel.
+
+Runs AsyncEel in a separate process with ``start(workers=N)`` for each N and
+drives it from several client processes, so neither side is limited to one
+core by the benchmark itself. Measures JS->Python calls per second by number
+of workers. Gains are bounded by the number of cores (reported as
+``cpu_count``)::
+
+    python benchmarks/bench_workers.py --workers 1 2 4 --output workers.json
+'''
+from __future__ import annotations
+import argparse
+import asyncio
+import json as jsn
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_eel.async_eel import AsyncEel                # noqa: E402
+from async_eel.headless import HeadlessPage             # noqa: E402
+
+
+def serve(workers: int) -> None:
+    eel = AsyncEel()
+
+    @eel.expose
+    def bench_echo(payload: Any) -> Any:
+        return payload
+
+    async def run() -> None:
+        with tempfile.TemporaryDirectory() as web_dir:
+            eel.init(web_dir)
+            eel.declare_js_functions('bench_js_echo')
+            # Port 0: the kernel picks a free port as the socket is bound, with no window for another process
+            await eel.start(mode=None, port=0, workers=workers, heartbeat=None, shutdown_delay=3600)
+            print('ready', eel._start_args['port'], flush=True)
+            await eel.wait_closed()
+
+    asyncio.run(run())
+
+
+async def _client(url: str, connections: int, duration: float, in_flight: int) -> int:
+    done = 0
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        pages = [HeadlessPage(url, 'bench.html', session) for _ in range(connections)]
+        await asyncio.gather(*(page.connect() for page in pages))
+        stop_at = time.perf_counter() + duration
+
+        async def worker(page: HeadlessPage) -> None:
+            nonlocal done
+            while time.perf_counter() < stop_at:
+                await asyncio.gather(*(page.call('bench_echo', 'ping') for _ in range(in_flight)))
+                done += in_flight
+
+        await asyncio.gather(*(worker(page) for page in pages))
+        await asyncio.gather(*(page.close() for page in pages))
+    return done
+
+
+def _client_process(args: tuple) -> int:
+    return asyncio.run(_client(*args))
+
+
+def bench_workers(workers: int, clients: int, connections: int, duration: float, in_flight: int) -> Dict[str, Any]:
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', '--workers', str(workers)],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        assert server.stdout is not None
+        ready, port = server.stdout.readline().split()
+        assert ready == 'ready'
+        url = 'http://127.0.0.1:%s' % port
+        with multiprocessing.get_context('spawn').Pool(clients) as pool:
+            started = time.perf_counter()
+            calls = sum(pool.map(_client_process, [(url, connections, duration, in_flight)] * clients))
+            elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+    return {'benchmark': 'workers',
+            'params': {'workers': workers, 'client_processes': clients,
+                       'connections': clients * connections, 'in_flight_per_connection': in_flight},
+            'metrics': {'calls': calls, 'seconds': elapsed, 'calls_per_second': calls / elapsed}}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='worker counts to compare')
+    parser.add_argument('--clients', type=int, default=os.cpu_count() or 1, help='client processes')
+    parser.add_argument('--connections', type=int, default=8, help='connections per client process')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds per worker count')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)    # Server process
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.workers[0])
+        return
+
+    results = [bench_workers(count, args.clients, args.connections, args.duration, 8) for count in args.workers]
+    report = {'meta': {'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'aiohttp': aiohttp.__version__,
+                       'cpu_count': os.cpu_count(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'results': results}
+    text = jsn.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+from async_eel.browsers import _build_urls
+
+
+def test_urls_include_port_and_prefix():
+    options = {'host': 'localhost', 'port': 8000, 'path_prefix': '/admin'}
+    assert _build_urls(['main.html', {'path': 'x.html', 'port': 9000}], options) == \
+        ['http://localhost:8000/admin/main.html', 'http://localhost:9000/admin/x.html']
+
+
+def test_unix_socket_only_urls_have_no_port():
+    options = {'host': 'localhost', 'port': None}
+    assert _build_urls(['main.html'], options) == ['http://localhost/main.html']
@@ -0,0 +1,23 @@
+import time
+
+from async_eel.cache import ResultCache
+
+
+def test_lru_eviction_ttl_and_stats():
+    """Entries are evicted least-recently-used first and expire after ttl."""
+    cache = ResultCache(maxsize=2, ttl=0.05)
+    a, b, c = (ResultCache.key(args) for args in ([1], [2], [{'y': 1, 'x': 2}]))
+    assert c == ResultCache.key([{'x': 2, 'y': 1}])
+
+    cache.put(a, '"a"')
+    cache.put(b, '"b"')
+    assert cache.get(a) == '"a"'
+    cache.put(c, '"c"')
+    assert cache.get(b) is None
+
+    time.sleep(0.06)
+    assert cache.get(a) is None
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'evictions': 1, 'size': 1, 'maxsize': 2, 'ttl': 0.05}
+
+    cache.invalidate()
+    assert cache.stats()['size'] == 0
@@ -0,0 +1,95 @@
+import asyncio
+import itertools
+
+import aiohttp
+import pytest
+
+from async_eel.async_eel import AsyncEel
+from async_eel.chunking import MAX_PENDING, ChunkError, PREFIX, Reassembler, frames
+from async_eel.headless import HeadlessPage
+
+
+def test_frames_reassemble_interleaved():
+    first, second = '{"return": 1.5, "value": "%s"}' % ('a' * 95), '{"call": 2.5, "args": ["%s"]}' % ('b' * 40)
+    frames_a, frames_b = list(frames(first, 30, 1, '1.5')), list(frames(second, 30, 2))
+    assert all(frame.startswith(PREFIX) for frame in frames_a + frames_b)
+    assert frames_a[0].startswith('chunk:1:0:5:1.5:') and frames_b[0].startswith('chunk:2:0:3::')
+
+    reassembler = Reassembler()
+    done = []
+    for pair in itertools.zip_longest(frames_a, frames_b):
+        for frame in pair:
+            if frame is not None:
+                message = reassembler.feed(frame)
+                if message is not None:
+                    done.append(message)
+    assert done == [second, first] and len(reassembler) == 0
+
+
+def test_out_of_order_and_oversized_messages_are_rejected():
+    msg = 'x' * 100
+    parts = list(frames(msg, 10, 7))
+    with pytest.raises(ChunkError):
+        Reassembler().feed(parts[1])
+    with pytest.raises(ChunkError):
+        Reassembler().feed('chunk:7:zero:1::x')
+
+    small = Reassembler(max_size=50)
+    with pytest.raises(ChunkError):
+        for frame in parts:
+            small.feed(frame)
+    assert len(small) == 0
+
+    few = Reassembler(max_pending=2)
+    few.feed(list(frames(msg, 10, 1))[0])
+    few.feed(list(frames(msg, 10, 2))[0])
+    with pytest.raises(ChunkError):
+        few.feed(list(frames(msg, 10, 3))[0])
+
+
+def test_pages_start_no_more_chunked_messages_than_the_server_reassembles(tmp_path):
+    """More large calls at once than the server reassembles all get their replies, over one connection."""
+    eel = AsyncEel(shared_functions=False)
+    eel.expose('text_length')(len)
+    eel.init(str(tmp_path))
+    calls = MAX_PENDING + 8
+
+    async def main():
+        await eel.start(mode=None, port=0, heartbeat=None, chunk_size=1000)
+        url = 'http://127.0.0.1:%d' % eel._start_args['port']
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url + '/eel.js') as response:
+                    assert '_chunk_streams: %d,' % MAX_PENDING in await response.text()
+                page = HeadlessPage(url, session=session, chunk_size=1000)
+                await page.connect()
+                calls_made = asyncio.gather(*(page.call('text_length', 'x' * 5000) for _ in range(calls)))
+                lengths = await asyncio.wait_for(calls_made, 10)
+                assert len(eel._connections) == 1
+                await page.close()
+        finally:
+            await eel.shutdown()
+        return lengths
+
+    assert asyncio.run(main()) == [5000] * calls
+
+
+def test_pages_made_before_the_loop_runs_send_chunked_messages(tmp_path):
+    """A HeadlessPage made outside any event loop binds nothing to one until it connects."""
+    eel = AsyncEel(shared_functions=False)
+    eel.expose('text_length')(len)
+    eel.init(str(tmp_path))
+    page = HeadlessPage('http://127.0.0.1', chunk_size=1000)
+
+    async def main():
+        await eel.start(mode=None, port=0, heartbeat=None, chunk_size=1000)
+        page.url = 'http://127.0.0.1:%d' % eel._start_args['port']
+        try:
+            await page.connect()
+            length = await asyncio.wait_for(page.call('text_length', 'x' * 5000), 10)
+            await page.close()
+        finally:
+            await eel.shutdown()
+        return length
+
+    assert asyncio.run(main()) == 5000
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import socket
+import warnings
+
+import aiohttp
+import pytest
+
+from async_eel import cluster
+from async_eel.async_eel import AsyncEel
+from async_eel.cluster import Channel, Cluster, ClusterCallError
+from async_eel.headless import HeadlessCallError, HeadlessPage
+
+
+def test_requests_and_messages_over_a_channel():
+    """Requests get the handler's value or error back; other messages are just delivered."""
+    async def run():
+        ours, theirs = socket.socketpair()
+        seen = []
+
+        async def handle(channel, message):
+            if message['op'] == 'fail':
+                raise ValueError('nope')
+            seen.append(message['op'])
+            return message.get('x', 0) * 2
+
+        left, right = Channel(ours, 1), Channel(theirs, 0)
+        await left.open(handle, lambda channel: None)
+        closed = asyncio.Event()
+        await right.open(handle, lambda channel: closed.set())
+        right.send({'op': 'note'})
+        assert await right.request({'op': 'double', 'x': 21}) == 42
+        with pytest.raises(ClusterCallError, match='nope'):
+            await right.request({'op': 'fail'})
+        left.close()
+        await asyncio.wait_for(closed.wait(), 1)
+        return seen
+
+    assert asyncio.run(run()) == ['note', 'double']
+
+
+class _Recorder:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def test_replies_go_back_to_the_calling_process():
+    worker_a, worker_b = _Recorder(), _Recorder()
+    coordinator = Cluster(0, [worker_a, worker_b])
+    coordinator.publish('{"call": 1}', 1)
+    coordinator.relay('{"call": 2}', worker_a, 2)
+    assert worker_b.sent == [{'op': 'broadcast', 'msg': '{"call": 1}'}, {'op': 'broadcast', 'msg': '{"call": 2}'}]
+    assert len(worker_a.sent) == 1     # Not its own broadcast
+
+    assert coordinator.route_return({'return': 1}) is False     # Made here
+    assert coordinator.route_return({'return': 2}) is True
+    assert worker_a.sent[-1] == {'op': 'return', 'message': {'return': 2}}
+
+    to_coordinator = _Recorder()
+    worker = Cluster(1, [to_coordinator])
+    worker.publish('{"call": 3}', 3)
+    assert worker.route_return({'return': 3}) is False
+    assert worker.route_return({'return': 1}) is True
+    assert to_coordinator.sent[-1] == {'op': 'return', 'message': {'return': 1}}
+
+
+def test_workers_warn_once_when_changing_a_shared_state():
+    """A worker's changes to a shared state reach no page, which is reported once per state."""
+    eel = AsyncEel(shared_functions=False)
+    eel._cluster = Cluster(1, [])
+    state = eel.shared_state('orders', {'count': 0})
+
+    async def change(times):
+        eel._loop = asyncio.get_running_loop()     # As start() sets it
+        for _ in range(times):
+            state['count'] += 1
+            await asyncio.sleep(0)
+
+    with pytest.warns(RuntimeWarning, match="'orders' was changed in worker 1"):
+        asyncio.run(change(1))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        asyncio.run(change(2))
+    assert state.take_patch() is None
+
+
+@pytest.mark.skipif(not cluster.supported(), reason='needs fork and SO_REUSEPORT')
+def test_pages_of_every_worker_call_through(tmp_path):
+    """With workers=2 pages land on both processes, and coordinator=True functions run in the original one."""
+    eel = AsyncEel(shared_functions=False)
+    eel.init(str(tmp_path))
+    coordinator_pid, counter = os.getpid(), []
+    eel.expose('where')(os.getpid)
+
+    @eel.expose(coordinator=True)
+    def count():
+        counter.append(os.getpid())
+        return len(counter), os.getpid()
+
+    @eel.expose(coordinator=True)
+    def open_handle():
+        return eel.handle(object())
+
+    async def main():
+        await eel.start(mode=None, port=0, heartbeat=None, workers=2)
+        url = 'http://127.0.0.1:%d' % eel._start_args['port']
+        pids, counts, handle_errors = set(), [], []
+        try:
+            async with aiohttp.ClientSession() as session:
+                for _ in range(50):
+                    page = HeadlessPage(url, session=session)
+                    await page.connect()
+                    pid = await page.call('where')
+                    counts.append(await page.call('count'))
+                    if pid != coordinator_pid and not handle_errors:
+                        with pytest.raises(HeadlessCallError) as error:
+                            await page.call('open_handle')
+                        handle_errors.append(error.value.error['errorText'])
+                    pids.add(pid)
+                    await page.close()
+                    if len(pids) == 2:
+                        break
+        finally:
+            await eel.shutdown()
+        return pids, counts, handle_errors
+
+    pids, counts, handle_errors = asyncio.run(main())
+    assert len(pids) == 2 and coordinator_pid in pids
+    assert counts == [[n, coordinator_pid] for n in range(1, len(counts) + 1)]
+    assert 'coordinator=True' in handle_errors[0]
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from async_eel.async_eel import AsyncEel
+
+
+def _eel_with(function, **options):
+    eel = AsyncEel(shared_functions=False)
+    eel.expose(coalesce=True, **options)(function)
+    return eel
+
+
+def test_identical_concurrent_calls_run_once():
+    """Identical calls in flight share one execution, and each caller gets a reply to its own call."""
+    runs = []
+
+    async def report(month):
+        runs.append(month)
+        await asyncio.sleep(0.01)
+        return {'month': month}
+
+    eel = _eel_with(report)
+
+    async def main():
+        calls = [{'call': i + 0.5, 'name': 'report', 'args': [month]}
+                 for i, month in enumerate(['may', 'may', 'may', 'june'])]
+        return await asyncio.gather(*(eel._call_reply(call, 'ws%d' % i) for i, call in enumerate(calls)))
+
+    replies = asyncio.run(main())
+    assert sorted(runs) == ['june', 'may']
+    assert [json.loads(reply)['return'] for _, reply in replies] == [0.5, 1.5, 2.5, 3.5]
+    assert [json.loads(reply)['value'] for _, reply in replies] == [{'month': 'may'}] * 3 + [{'month': 'june'}]
+    assert eel.coalesce_stats() == {'report': 2}
+    assert eel._inflight_calls == {}
+
+
+def test_handles_are_registered_for_each_caller():
+    """A by-reference result shared by several calls gets a handle on each receiving connection."""
+    async def open_table():
+        await asyncio.sleep(0.01)
+        return AsyncEel.handle([1, 2, 3])
+
+    eel = _eel_with(open_table)
+
+    async def main():
+        return await asyncio.gather(eel._call_reply({'call': 1.5, 'name': 'open_table', 'args': []}, 'ws1'),
+                                    eel._call_reply({'call': 2.5, 'name': 'open_table', 'args': []}, 'ws2'))
+
+    (_, first), (_, second) = asyncio.run(main())
+    first_id = json.loads(first)['value']['__eel_handle__']
+    second_id = json.loads(second)['value']['__eel_handle__']
+    assert eel._handles.count('ws1') == 1 and eel._handles.count('ws2') == 1
+    assert eel._handles.get('ws1', first_id) is eel._handles.get('ws2', second_id)
+
+
+def test_each_caller_keeps_its_own_deadline():
+    """A caller's deadline or cancellation does not end the shared execution for the others."""
+    async def slow():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    eel = _eel_with(slow)
+
+    async def main():
+        leader = asyncio.ensure_future(eel._call_reply({'call': 1.5, 'name': 'slow', 'args': []}, 'ws1'))
+        await asyncio.sleep(0)
+        hurried = asyncio.ensure_future(eel._call_reply({'call': 2.5, 'name': 'slow', 'args': [], 'timeout': 10}, 'ws2'))
+        patient = asyncio.ensure_future(eel._call_reply({'call': 3.5, 'name': 'slow', 'args': []}, 'ws3'))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await hurried, await patient
+
+    (hurried_status, _), (patient_status, reply) = asyncio.run(main())
+    assert hurried_status == 'timeout'
+    assert patient_status == 'ok' and json.loads(reply)['value'] == 'done'
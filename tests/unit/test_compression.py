@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import aiohttp
+from aiohttp import web
+
+from async_eel import compression
+from async_eel.compression import CompressionStats, DeflateWebSocket
+
+
+async def _exchange(messages, **options):
+    """Send *messages* from a DeflateWebSocket to an aiohttp client; returns what it got and the handshake."""
+    stats = CompressionStats()
+    handshake = {}
+
+    async def handler(request):
+        ws = DeflateWebSocket(stats=stats, **options)
+        await ws.prepare(request)
+        handshake['extensions'] = ws.headers.get('Sec-WebSocket-Extensions', '')
+        for message in messages:
+            await ws.send_str(message)
+        await ws.close()
+        return ws
+
+    app = web.Application()
+    app.router.add_get('/ws', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect('http://127.0.0.1:%d/ws' % port, compress=15) as ws:
+                received = [msg.data async for msg in ws if msg.type == aiohttp.WSMsgType.TEXT]
+    finally:
+        await runner.cleanup()
+    return received, handshake['extensions'], stats
+
+
+def test_only_messages_over_the_threshold_are_deflated():
+    big = json.dumps([{'name': 'row', 'value': i} for i in range(2000)])    # Deflated in the executor
+    messages = ['{"return": 1}', 'x' * 2048, big, '{"return": 2}']
+    received, extensions, stats = asyncio.run(_exchange(messages, threshold=1024))
+
+    assert received == messages
+    assert 'permessage-deflate' in extensions and 'server_no_context_takeover' not in extensions
+    assert (stats.connections, stats.compressed, stats.skipped) == (1, 2, 2)
+    assert stats.bytes_in == 2048 + len(big) and stats.stats()['ratio'] < 0.2
+    assert stats.cpu.count == 2 and stats.stats()['cpu_seconds'] >= 0
+
+
+def test_without_shared_context_each_message_stands_alone():
+    messages = ['{"state": "table", "rows": %s}' % list(range(300))] * 3
+    received, extensions, stats = asyncio.run(_exchange(messages, threshold=0, shared_context=False))
+    _, _, shared = asyncio.run(_exchange(messages, threshold=0))
+
+    assert received == messages
+    assert 'server_no_context_takeover' in extensions
+    assert stats.bytes_out > shared.bytes_out     # Repeats are found only with the shared context
+
+
+def test_uncompressed_connections_are_left_alone():
+    received, extensions, stats = asyncio.run(_exchange(['a' * 5000], compress=False))
+    assert received == ['a' * 5000] and extensions == ''
+    assert stats.stats()['connections'] == 0 and stats.stats()['ratio'] == 1.0
+
+
+def test_falls_back_to_aiohttp_compression_without_its_frame_writer(monkeypatch):
+    """An aiohttp lacking the writer internals used still compresses, every message, on its own."""
+    monkeypatch.setattr(compression, '_WRITER_INTERNALS', compression._WRITER_INTERNALS + ('_missing',))
+    messages = ['{"return": 1}', 'x' * 2048]
+    received, extensions, stats = asyncio.run(_exchange(messages, threshold=1024))
+
+    assert received == messages
+    assert 'permessage-deflate' in extensions
+    assert (stats.connections, stats.compressed, stats.skipped) == (0, 0, 0)
+
+
+def test_sending_checks_the_socket_like_aiohttp():
+    """Bad arguments and sends after closing fail as they do on aiohttp's own websockets."""
+    errors = []
+
+    async def handler(request):
+        ws = DeflateWebSocket(threshold=16)
+        await ws.prepare(request)
+        assert ws.compressing
+        try:
+            await ws.send_str(b'{"return": 1}')
+        except TypeError:
+            errors.append('type')
+        await ws.close()
+        for message in ('{}', 'x' * 2048):
+            try:
+                await ws.send_str(message)
+            except ConnectionError:
+                errors.append('closed')
+        return ws
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/ws', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.ws_connect('http://127.0.0.1:%d/ws' % port, compress=15) as ws:
+                    async for _ in ws:
+                        pass
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+    assert errors == ['type', 'closed', 'closed']
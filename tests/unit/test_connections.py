@@ -0,0 +1,34 @@
+from async_eel.connections import ConnectionRegistry
+
+
+def test_indexes_follow_add_tag_and_remove():
+    """Connections are found by page, session and tag until removed; removing twice is harmless."""
+    registry = ConnectionRegistry()
+    a, b, c = object(), object(), object()
+    registry.add(a, 'main.html', 'guid-a', ['admin'])
+    registry.add(b, 'main.html', 'guid-b')
+    registry.add(c, 'other.html')
+    registry.tag(b, 'admin', 'beta')
+
+    assert len(registry) == 3 and b in registry
+    assert {conn.conn for conn in registry.by_page('main.html')} == {a, b}
+    assert registry.by_session('guid-a').conn is a
+    assert {conn.conn for conn in registry.by_tag('admin')} == {a, b}
+
+    registry.untag(b, 'admin')
+    assert [conn.conn for conn in registry.by_tag('admin')] == [a]
+    assert registry.remove(a).session_id == 'guid-a'
+    assert registry.remove(a) is None
+    assert registry.by_session('guid-a') is None and registry.by_tag('admin') == []
+    assert [conn.conn for conn in registry.by_page('main.html')] == [b]
+    assert registry.senders() == [b, c]
+
+
+def test_readding_replaces_the_entry():
+    registry = ConnectionRegistry()
+    conn = object()
+    registry.add(conn, 'main.html', tags=['old'])
+    registry.add(conn, 'next.html', tags=['new'])
+    assert len(registry) == 1
+    assert registry.by_page('main.html') == [] and registry.by_tag('old') == []
+    assert registry.get(conn).as_dict()['tags'] == ['new']
@@ -0,0 +1,42 @@
+import asyncio
+
+from async_eel.cursors import Cursor
+
+
+def test_cursor_pages_lazily_and_releases_when_exhausted():
+    """Only the requested page is pulled from the iterator."""
+    pulled = []
+    released = []
+
+    def rows():
+        for i in range(5):
+            pulled.append(i)
+            yield i
+
+    async def main():
+        cursor = Cursor(rows())
+        cursor._bind(lambda: released.append(True))
+        assert await cursor.next(2) == {'items': [0, 1], 'done': False}
+        assert pulled == [0, 1]
+        assert await cursor.next(10) == {'items': [2, 3, 4], 'done': True}
+        assert released == [True]
+
+    asyncio.run(main())
+
+
+def test_cursor_idle_timeout_closes_async_iterator():
+    """An idle cursor closes its iterator and releases itself."""
+    released = []
+
+    async def rows():
+        for i in range(100):
+            yield i
+
+    async def main():
+        cursor = Cursor(rows(), idle_timeout=0.01)
+        cursor._bind(lambda: released.append(True))
+        assert (await cursor.next(1))['items'] == [0]
+        await asyncio.sleep(0.05)
+        assert cursor.done and released == [True]
+
+    asyncio.run(main())
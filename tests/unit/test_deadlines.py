@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+from async_eel.async_eel import AsyncEel
+
+
+def test_deadline_expired_in_the_queue_skips_the_call():
+    """A call whose deadline passes while it waits for a slot never runs."""
+    runs = []
+    eel = AsyncEel(shared_functions=False)
+
+    @eel.expose(max_concurrency=1)
+    async def busy(label):
+        runs.append(label)
+        await asyncio.sleep(0.05)
+        return label
+
+    async def main():
+        first = asyncio.ensure_future(eel._call_reply({'call': 1.5, 'name': 'busy', 'args': ['first']}, 'ws'))
+        await asyncio.sleep(0)
+        late = await eel._call_reply({'call': 2.5, 'name': 'busy', 'args': ['late'], 'timeout': 10}, 'ws')
+        expired = await eel._call_reply({'call': 3.5, 'name': 'busy', 'args': ['expired'], 'timeout': -1}, 'ws')
+        return late, expired, await first
+
+    (late, _), (expired, _), (first, _) = asyncio.run(main())
+    assert (late, expired, first) == ('timeout', 'timeout', 'ok')
+    assert runs == ['first']
+    assert eel.scheduler_stats()['running'] == 0 and eel.scheduler_stats()['queued'] == 0
+
+
+def test_overrunning_call_is_cancelled():
+    """A call still running at its deadline is cancelled and replies 'timeout'."""
+    finished = []
+    eel = AsyncEel(shared_functions=False)
+
+    @eel.expose
+    async def slow():
+        await asyncio.sleep(1)
+        finished.append(True)
+
+    status, reply = asyncio.run(eel._call_reply({'call': 1.5, 'name': 'slow', 'args': [], 'timeout': 20}, 'ws'))
+    assert status == 'timeout' and json.loads(reply)['status'] == 'timeout'
+    assert 'Deadline of 20 ms exceeded' in json.loads(reply)['error']['errorText']
+    assert finished == []
+
+
+def test_calls_without_deadline_are_unaffected():
+    """Without a timeout a call runs to the end, and a TimeoutError of its own is an error with a traceback."""
+    eel = AsyncEel(shared_functions=False)
+
+    @eel.expose
+    async def steady():
+        await asyncio.sleep(0.03)
+        return 'done'
+
+    @eel.expose
+    def fails():
+        raise asyncio.TimeoutError('upstream service')
+
+    async def main():
+        return (await eel._call_reply({'call': 1.5, 'name': 'steady', 'args': []}, 'ws'),
+                await eel._call_reply({'call': 2.5, 'name': 'fails', 'args': []}, 'ws'),
+                await eel._call_reply({'call': 3.5, 'name': 'fails', 'args': [], 'timeout': 1000}, 'ws'))
+
+    (status, reply), (no_deadline, error), (with_deadline, _) = asyncio.run(main())
+    assert status == 'ok' and json.loads(reply)['value'] == 'done'
+    assert no_deadline == 'error' and with_deadline == 'error'
+    assert 'TimeoutError' in json.loads(error)['error']['errorTraceback']
+
+
+def test_invalid_timeouts_are_an_error_reply():
+    """A timeout that is not a number of milliseconds gets an error reply rather than no reply."""
+    eel = AsyncEel(shared_functions=False)
+    eel.expose('quick')(lambda: 'quick')
+
+    async def main():
+        return [await eel._call_reply({'call': n + 0.5, 'name': 'quick', 'args': [], 'timeout': timeout}, 'ws')
+                for n, timeout in enumerate(['5s', True, float('nan'), [500]])]
+
+    for status, reply in asyncio.run(main()):
+        assert status == 'error' and json.loads(reply)['status'] == 'error'
+        assert 'Invalid timeout' in json.loads(reply)['error']['errorText']
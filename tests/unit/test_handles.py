@@ -0,0 +1,25 @@
+import pytest
+
+from async_eel.handles import HandleRegistry
+
+
+def test_handle_operations_and_release():
+    """Handles give item/slice/method access and are scoped to their owner."""
+    registry = HandleRegistry()
+    info = registry.add('ws1', list(range(10)))
+    handle_id = info['__eel_handle__']
+    assert info == {'__eel_handle__': handle_id, 'kind': 'object', 'type': 'list', 'length': 10}
+
+    assert registry.invoke('ws1', handle_id, '__slice__', [2, 5]) == [2, 3, 4]
+    assert registry.invoke('ws1', handle_id, '__getitem__', [-1]) == 9
+    assert registry.invoke('ws1', handle_id, 'index', [4]) == 4
+    with pytest.raises(AttributeError):
+        registry.invoke('ws1', handle_id, '__class__', [])
+    with pytest.raises(KeyError):
+        registry.invoke('ws2', handle_id, '__len__', [])
+
+    registry.add('ws1', {})
+    assert registry.release('ws1', handle_id) == list(range(10))
+    assert registry.count('ws1') == 1
+    assert registry.release_all('ws1') == [{}]
+    assert registry.count() == 0
@@ -0,0 +1,37 @@
+import asyncio
+import json
+
+from async_eel.headless import HeadlessPage
+
+
+class _StubWebsocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_str(self, text):
+        self.sent.append(json.loads(text))
+
+
+def test_exposed_functions_answer_python_calls():
+    """Calls to exposed names get 'ok' or 'error' replies; unknown names get none, like eel.js."""
+    async def run():
+        page = HeadlessPage('http://127.0.0.1:8000')
+        page._ws = _StubWebsocket()
+        page.expose(lambda a, b: a + b, 'js_add')
+
+        @page.expose
+        async def js_fail():
+            raise ValueError('nope')
+
+        page._dispatch({'call': 1.5, 'name': 'js_add', 'args': [2, 3]})
+        page._dispatch({'call': 2.5, 'name': 'js_fail', 'args': []})
+        page._dispatch({'call': 3.5, 'name': 'js_missing', 'args': []})
+        await asyncio.sleep(0.01)
+        return page
+
+    page = asyncio.run(run())
+    replies = {reply['return']: reply for reply in page._ws.sent}
+    assert page.calls_received == 3
+    assert replies[1.5] == {'return': 1.5, 'status': 'ok', 'value': 5}
+    assert replies[2.5]['status'] == 'error' and replies[2.5]['error'] == 'nope'
+    assert 3.5 not in replies
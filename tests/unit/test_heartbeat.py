@@ -0,0 +1,59 @@
+import asyncio
+
+import aiohttp
+
+from async_eel.async_eel import AsyncEel
+from async_eel.heartbeat import RECONNECT, HeartbeatMonitor
+
+
+class _StubWebsocket:
+    def __init__(self):
+        self.pings = 0
+
+    async def ping(self):
+        self.pings += 1
+
+
+def test_silent_connections_are_reaped():
+    """A connection that stops answering is reported dead; one that pongs stays tracked."""
+    async def run():
+        reaped = []
+        monitor = HeartbeatMonitor(0.02, 0.02, reaped.append)
+        alive_ws, silent_ws = _StubWebsocket(), _StubWebsocket()
+        alive = monitor.add(alive_ws, alive_ws, 'alive.html')
+        monitor.add(silent_ws, silent_ws, 'silent.html')
+        for _ in range(15):
+            await asyncio.sleep(0.01)
+            alive.pong()
+        monitor.stop()
+        return monitor, reaped, alive_ws
+
+    monitor, reaped, alive_ws = asyncio.run(run())
+    assert [liveness.page for liveness in reaped] == ['silent.html'] and reaped[0].reaped
+    assert monitor.reaped == 1
+    assert [stats['page'] for stats in monitor.stats()] == ['alive.html']
+    assert alive_ws.pings > 0
+
+
+def test_reaped_pages_are_told_to_reconnect(tmp_path):
+    """A reaped websocket closes with a code pages reconnect on, and its session is kept for them to resume."""
+    eel = AsyncEel(shared_functions=False)
+    eel.init(str(tmp_path))
+
+    async def main():
+        await eel.start(mode=None, port=0, heartbeat=0.02, heartbeat_timeout=0.02)
+        url = 'http://127.0.0.1:%d/eel?page=index.html&session=silent' % eel._start_args['port']
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.ws_connect(url, autoping=False) as ws:
+                    await ws.receive()          # The session message, then no answer to pings
+                    await asyncio.sleep(0.2)
+                    msg = await ws.receive()
+                    while msg.type == aiohttp.WSMsgType.PING:
+                        msg = await ws.receive()
+            assert msg.type == aiohttp.WSMsgType.CLOSE
+            return msg.data, eel._connections.by_session('silent') is not None
+        finally:
+            await eel.shutdown()
+
+    assert asyncio.run(main()) == (RECONNECT, True)
@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import pytest
+
+from async_eel.async_eel import AsyncEel
+from async_eel.lanes import LaneScheduler, check_lane
+from async_eel.sessions import Session
+
+
+def _send_all(lanes, frames):
+    """Queue *frames* (lane, size) while the websocket is busy; returns the order they are sent in."""
+    sent = []
+
+    async def send(lane, size, label):
+        async with lanes.turn(lane, size):
+            sent.append(label)
+            await asyncio.sleep(0)
+
+    async def main():
+        async with lanes.turn('bulk', 1000):    # A frame being written holds up the rest
+            tasks = [asyncio.ensure_future(send(lane, size, label)) for label, (lane, size) in enumerate(frames)]
+            await asyncio.sleep(0)
+            assert len(lanes) == len(frames)
+        await asyncio.gather(*tasks)
+        assert len(lanes) == 0
+
+    asyncio.run(main())
+    return sent
+
+
+def test_control_frames_overtake_queued_bulk_frames():
+    frames = [('bulk', 1000), ('bulk', 1000), ('control', 100), ('bulk', 1000), ('control', 100)]
+    lanes = LaneScheduler()
+    assert _send_all(lanes, frames) == [2, 4, 0, 1, 3]
+
+    stats = lanes.stats.stats()
+    assert stats['control']['frames'] == 2 and stats['control']['bytes'] == 200
+    assert stats['bulk']['frames'] == 4 and stats['bulk']['wait']['count'] == 4
+
+
+def test_weights_share_the_websocket():
+    # Equal weights alternate between the lanes, keeping each lane's order
+    frames = [('bulk', 100)] * 3 + [('control', 100)] * 3
+    assert _send_all(LaneScheduler({'control': 1}), frames) == [0, 3, 1, 4, 2, 5]
+    # Control gets 4 frames of the same size for each bulk frame
+    frames = [('bulk', 100)] * 2 + [('control', 100)] * 8
+    assert _send_all(LaneScheduler({'control': 4}), frames) == [2, 3, 4, 0, 5, 6, 7, 8, 1, 9]
+
+
+def test_cancelled_frames_give_up_their_turn():
+    lanes = LaneScheduler()
+    sent = []
+
+    async def send(lane, label):
+        async with lanes.turn(lane, 10):
+            sent.append(label)
+
+    async def main():
+        async with lanes.turn('bulk', 10):
+            waiting = asyncio.ensure_future(send('control', 'cancelled'))
+            other = asyncio.ensure_future(send('bulk', 'sent'))
+            await asyncio.sleep(0)
+            waiting.cancel()
+        await asyncio.gather(waiting, other, return_exceptions=True)
+        async with lanes.turn('control', 10):     # Free again
+            pass
+
+    asyncio.run(main())
+    assert sent == ['sent']
+    with pytest.raises(ValueError):
+        check_lane('fast')
+
+
+class _StubWebsocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_str(self, text):
+        self.sent.append(text)
+
+
+def _eel_with_lanes():
+    eel = AsyncEel(shared_functions=False)
+    eel.expose('export', lane='bulk')(lambda: 'x' * 1000)
+    eel.expose('ping')(lambda: 'pong')
+    return eel
+
+
+def test_replies_take_the_lane_of_the_call_or_its_function():
+    eel = _eel_with_lanes()
+    assert eel._reply_lane({'call': 1.5, 'name': 'export'}) == 'bulk'
+    assert eel._reply_lane({'call': 1.5, 'name': 'ping'}) == 'control'
+    assert eel._reply_lane({'call': 1.5, 'name': 'export', 'lane': 'control'}) == 'control'
+    assert eel._reply_lane({'call': 1.5, 'name': 'ping', 'lane': 'bulk'}) == 'bulk'
+    # Lanes the page made up are ignored
+    assert eel._reply_lane({'call': 1.5, 'name': 'export', 'lane': 'fast'}) == 'bulk'
+    assert eel._reply_lane({'call': 1.5, 'name': 'ping', 'lane': 'fast'}) == 'control'
+
+
+def test_bulk_replies_wait_for_the_window_while_control_replies_pass():
+    eel = _eel_with_lanes()
+    eel._start_args['bulk_window'] = 500
+    ws = _StubWebsocket()
+
+    async def main():
+        session = Session('guid', 'main.html', ws)
+        eel._connections.add(session, 'main.html', session.id, []).lanes = LaneScheduler()
+        await session.send_str('y' * 600)       # Not acknowledged yet: the window is full
+
+        export = asyncio.ensure_future(eel._process_call({'call': 1.5, 'name': 'export', 'args': []}, session))
+        await eel._process_call({'call': 2.5, 'name': 'ping', 'args': []}, session)
+        await eel._process_call({'call': 3.5, 'name': 'export', 'args': [], 'lane': 'control'}, session)
+        await asyncio.sleep(0.01)
+        assert not export.done()
+        session.ack(session.sent)
+        await asyncio.wait_for(export, 1)
+        return [json.loads(text)['return'] for text in ws.sent[1:]]
+
+    assert asyncio.run(main()) == [2.5, 3.5, 1.5]
@@ -0,0 +1,39 @@
+import asyncio
+import sys
+
+import pytest
+
+from async_eel import loops
+
+
+async def _loop_name():
+    return loops.loop_name()
+
+
+def test_run_without_uvloop_uses_asyncio():
+    assert loops.run(_loop_name(), use_uvloop=False) == 'asyncio'
+    assert loops.loop_name(asyncio.new_event_loop()) == 'asyncio'
+
+
+def test_run_falls_back_when_uvloop_is_missing(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'uvloop', None)    # Makes `import uvloop` fail
+    assert not loops.uvloop_available()
+    assert loops.run(_loop_name()) == 'asyncio'
+
+
+def test_run_on_uvloop_when_installed():
+    pytest.importorskip('uvloop')
+    policy = asyncio.get_event_loop_policy()
+    assert loops.run(_loop_name()) == 'uvloop'
+    assert asyncio.get_event_loop_policy() is policy     # Only the loop of this run is uvloop's
+
+
+def test_run_cancels_leftover_tasks_and_closes_its_loop():
+    leftover = []
+
+    async def main():
+        leftover.append(asyncio.ensure_future(asyncio.sleep(3600)))
+        return asyncio.get_running_loop()
+
+    loop = loops.run(main(), use_uvloop=False)
+    assert loop.is_closed() and leftover[0].cancelled()
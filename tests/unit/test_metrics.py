@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+from async_eel.async_eel import AsyncEel
+
+from async_eel.loop_monitor import LoopLagMonitor
+from async_eel.metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_quantiles():
+    """Quantiles are bucket upper bounds, capped by the largest value seen."""
+    histogram = Histogram(buckets=(1, 2, 5))
+    for value in [0.5] * 90 + [1.5] * 9 + [7]:
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 1
+    assert histogram.quantile(0.99) == 2
+    assert histogram.quantile(1.0) == 7
+    assert histogram.summary()['count'] == 100
+
+
+def test_loop_lag_monitor_attributes_stalls():
+    """A blocking activity shows up as a stall naming that activity."""
+    async def main():
+        monitor = LoopLagMonitor(interval=0.01, stall_threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        with monitor.activity('blocking_export'):
+            time.sleep(0.1)
+        await asyncio.sleep(0.03)
+        monitor.stop()
+        return monitor.stats()
+
+    stats = asyncio.run(main())
+    assert stats['max'] >= 0.05
+    assert stats['stalls'][0]['started'] == ['blocking_export']
+
+
+def test_prometheus_rendering():
+    """Counters and cumulative histogram buckets are rendered per kind/name."""
+    registry = MetricsRegistry()
+    registry.record('py', 'say "hi"', 0.002, bytes_in=10, bytes_out=20)
+    registry.record('py', 'say "hi"', 0.2, error=True)
+    text = registry.prometheus()
+    assert 'async_eel_calls_total{kind="py",name="say \\"hi\\""} 2' in text
+    assert 'async_eel_errors_total{kind="py",name="say \\"hi\\""} 1' in text
+    assert 'async_eel_call_duration_seconds_bucket{kind="py",name="say \\"hi\\"",le="0.0025"} 1' in text
+    assert 'async_eel_call_duration_seconds_bucket{kind="py",name="say \\"hi\\"",le="+Inf"} 2' in text
+    assert registry.snapshot()['py']['say "hi"']['bytes_out'] == 20
+
+
+class _StubWebsocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_str(self, text):
+        self.sent.append(text)
+
+
+def test_calls_to_unexposed_names_share_one_series():
+    """Names a page makes up do not add series; they are all counted as 'unknown'."""
+    eel = AsyncEel(shared_functions=False)
+    eel.expose('add')(lambda a, b: a + b)
+    eel._metrics = MetricsRegistry()
+    ws = _StubWebsocket()
+
+    async def main():
+        for call, name in enumerate(['add', 'made_up_1', 'made_up_2', 'add']):
+            await eel._process_call({'call': call + 0.5, 'name': name, 'args': [1, 2]}, ws, 10)
+
+    asyncio.run(main())
+    py = eel.metrics()['py']
+    assert sorted(py) == ['add', 'unknown']
+    assert py['add']['calls'] == 2 and py['add']['errors'] == 0
+    assert py['unknown']['calls'] == 2 and py['unknown']['errors'] == 2
+    assert len(ws.sent) == 4
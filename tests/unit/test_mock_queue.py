@@ -0,0 +1,49 @@
+import pytest
+
+from async_eel.mock_queue import MockQueue
+
+
+def test_every_page_gets_each_call_once():
+    """With the default delivery, every page that connects gets each queued call, once."""
+    queue = MockQueue()
+    queue.push(1, 'show', '{"call": 1}')
+    queue.push(2, 'show', '{"call": 2}')
+    assert queue.take('main.html') == (['{"call": 1}', '{"call": 2}'], [])
+    assert queue.take('main.html') == ([], [])
+    assert queue.take('other.html')[0] == ['{"call": 1}', '{"call": 2}']
+    assert len(queue) == 2
+
+
+def test_first_page_and_named_pages():
+    """'first' delivers a call to one page only; a list of pages delivers it to each of them."""
+    first = MockQueue(delivery='first')
+    first.push(1, 'show', 'a')
+    assert first.take('main.html')[0] == ['a'] and first.take('other.html')[0] == []
+    assert len(first) == 0
+
+    named = MockQueue(delivery=['a.html', 'b.html'])
+    named.push(1, 'show', 'x')
+    assert named.take('other.html')[0] == []
+    assert named.take('a.html')[0] == ['x'] and len(named) == 1
+    assert named.take('b.html')[0] == ['x'] and len(named) == 0
+
+
+def test_size_and_ttl_bound_the_queue(monkeypatch):
+    """The oldest calls are evicted past max_size, and calls older than ttl expire."""
+    queue = MockQueue(max_size=2, ttl=10)
+    assert queue.push(1, 'f', 'a') == []
+    queue.push(2, 'f', 'b')
+    assert [call.call_id for call in queue.push(3, 'f', 'c')] == [1]
+
+    import async_eel.mock_queue as mock_queue
+    now = mock_queue.time.monotonic()
+    monkeypatch.setattr(mock_queue.time, 'monotonic', lambda: now + 11)
+    messages, expired = queue.take('main.html')
+    assert messages == [] and [call.call_id for call in expired] == [2, 3]
+    assert queue.stats() == {'queued': 0, 'delivered': 0, 'expired': 2, 'evicted': 1}
+
+
+def test_invalid_delivery():
+    """Unknown delivery modes are refused."""
+    with pytest.raises(ValueError):
+        MockQueue(delivery='some')
@@ -0,0 +1,23 @@
+from async_eel.recording import FrameRecorder, read_frames, split_connections
+from async_eel.replay import recorded_replies
+
+
+def test_recorded_frames_read_back_by_connection(tmp_path):
+    """Frames come back grouped per connection, and JS replies are found by function name."""
+    path = str(tmp_path / 'frames.jsonl.gz')
+    first, second = object(), object()
+    recorder = FrameRecorder(path)
+    recorder.opened(first, 'main.html')
+    recorder.opened(second, 'other.html')
+    recorder.frame(first, '>', '{"call": 1.5, "name": "add", "args": [1, 2]}')
+    recorder.frame(second, '<', '{"call": 7.5, "name": "js_total", "args": []}')
+    recorder.frame(second, '>', '{"return": 7.5, "status": "ok", "value": 99}')
+    recorder.closed(first)
+    recorder.frame(first, '>', 'ignored after close')
+    recorder.close()
+
+    connections = split_connections(read_frames(path))
+    assert [kind for _, _, kind, _ in connections[1]] == ['o', '>', 'c']
+    assert connections[1][0][3] == 'main.html'
+    assert [kind for _, _, kind, _ in connections[2]] == ['o', '<', '>']
+    assert recorded_replies(connections) == {'js_total': 99}
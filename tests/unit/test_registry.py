@@ -0,0 +1,35 @@
+import pytest
+
+from async_eel.registry import FunctionRegistry, hybridmethod
+
+
+def test_lookups_fall_back_to_the_parent():
+    shared = FunctionRegistry()
+    own = FunctionRegistry(shared)
+    shared.add('ping', len, {'priority': 'high'})
+    own.add('pong', abs, {})
+    own.add('ping', max, {})        # Shadows the shared function for this registry only
+
+    assert own.function('ping') is max and shared.function('ping') is len
+    assert own.function('pong') is abs and 'pong' not in shared
+    assert own.options('ping') == {} and own.options('missing') == {}
+    assert own.names() == ['ping', 'pong']
+    with pytest.raises(KeyError):
+        FunctionRegistry().function('ping')
+    with pytest.raises(AssertionError):
+        own.add('pong', abs, {})
+
+
+def test_hybridmethod_binds_class_or_instance():
+    class Front:
+        registry = 'class'
+
+        def __init__(self):
+            self.registry = 'instance'
+
+        @hybridmethod
+        def which(target):
+            return target.registry
+
+    assert Front.which() == 'class'
+    assert Front().which() == 'instance'
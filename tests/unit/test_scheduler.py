@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from async_eel.scheduler import CallScheduler, SchedulerBusy
+
+
+def test_priority_order_limits_and_rejection():
+    """Queued calls start by priority and a full queue rejects new calls."""
+    order = []
+
+    async def call(scheduler, name, options, hold=0.01):
+        async with scheduler.slot(name, options):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def main():
+        scheduler = CallScheduler(max_concurrency=1)
+        export = {'priority': 'low', 'max_concurrency': 1, 'max_queue': 1}
+        ui = {'priority': 'high'}
+        tasks = [asyncio.ensure_future(call(scheduler, 'export', export))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(call(scheduler, 'export', export)))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusy):
+            await call(scheduler, 'export', export)
+        tasks.append(asyncio.ensure_future(call(scheduler, 'ui', ui)))
+        await asyncio.gather(*tasks)
+
+        stats = scheduler.stats()
+        assert stats['running'] == 0 and stats['queued'] == 0
+        assert stats['functions']['export']['rejected'] == 1
+        assert stats['functions']['ui']['admitted'] == 1
+
+    asyncio.run(main())
+    assert order == ['export', 'ui', 'export']
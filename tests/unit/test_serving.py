@@ -0,0 +1,158 @@
+import asyncio
+import os
+import socket
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from async_eel.async_eel import AsyncEel
+from async_eel.headless import HeadlessPage
+
+unix_only = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='needs Unix domain sockets')
+
+
+def _eel(web_dir):
+    eel = AsyncEel(shared_functions=False)
+    eel.expose('echo')(lambda value: value)
+    eel.init(str(web_dir))
+    return eel
+
+
+def test_port_zero_binds_once(tmp_path):
+    """With port=0 the socket bound to find the port is the one served on."""
+    eel = _eel(tmp_path)
+
+    async def main():
+        await eel.start(mode=None, port=0, heartbeat=None)
+        try:
+            sites = list(eel.runner.sites)
+            assert [type(site) for site in sites] == [web.SockSite]
+            assert eel._listen_socket.getsockname()[1] == eel._start_args['port']
+            async with aiohttp.ClientSession() as session:
+                page = HeadlessPage('http://127.0.0.1:%d' % eel._start_args['port'], session=session)
+                await page.connect()
+                value = await page.call('echo', 'tcp')
+                await page.close()
+        finally:
+            await eel.shutdown()
+        return value
+
+    assert asyncio.run(main()) == 'tcp'
+
+
+def _has_ipv6():
+    try:
+        with socket.socket(socket.AF_INET6) as sock:
+            sock.bind(('::1', 0))
+    except OSError:
+        return False
+    return True
+
+
+@pytest.mark.skipif(not _has_ipv6(), reason='needs IPv6 on the loopback')
+def test_port_zero_on_an_ipv6_host(tmp_path):
+    """The socket bound for port=0 has the address family of the host."""
+    eel = _eel(tmp_path)
+
+    async def main():
+        await eel.start(mode=None, host='::1', port=0, heartbeat=None)
+        try:
+            assert eel._listen_socket.family == socket.AF_INET6
+            async with aiohttp.ClientSession() as session:
+                page = HeadlessPage('http://[::1]:%d' % eel._start_args['port'], session=session)
+                await page.connect()
+                value = await page.call('echo', 'ipv6')
+                await page.close()
+        finally:
+            await eel.shutdown()
+        return value
+
+    assert asyncio.run(main()) == 'ipv6'
+
+
+@unix_only
+def test_serving_on_a_unix_socket_only(tmp_path):
+    """port=None serves on the Unix socket alone, and shutdown removes the socket file."""
+    path = str(tmp_path / 'eel.sock')
+    eel = _eel(tmp_path)
+
+    async def main():
+        await eel.start(mode=None, port=None, unix_socket=path, heartbeat=None)
+        try:
+            assert [type(site) for site in eel.runner.sites] == [web.UnixSite]
+            page = HeadlessPage('http://localhost', unix_socket=path)
+            await page.connect()
+            value = await page.call('echo', 'uds')
+            await page.close()
+        finally:
+            await eel.shutdown()
+        return value
+
+    assert asyncio.run(main()) == 'uds'
+    assert not os.path.exists(path)
+
+
+@unix_only
+def test_stale_socket_files_are_replaced(tmp_path):
+    """A socket file left by a run that did not shut down does not stop the next one."""
+    path = str(tmp_path / 'eel.sock')
+    with socket.socket(socket.AF_UNIX) as stale:
+        stale.bind(path)
+    eel = _eel(tmp_path)
+
+    async def main():
+        await eel.start(mode=None, port=None, unix_socket=path, heartbeat=None)
+        try:
+            page = HeadlessPage('http://localhost', unix_socket=path)
+            await page.connect()
+            value = await page.call('echo', 'again')
+            await page.close()
+        finally:
+            await eel.shutdown()
+        return value
+
+    assert os.path.exists(path)
+    assert asyncio.run(main()) == 'again'
+
+
+def test_unix_socket_only_needs_a_mode_without_browser(tmp_path):
+    """Pages, Electron's included, load over TCP, so port=None is refused unless no window is opened."""
+    eel = _eel(tmp_path)
+    with pytest.raises(ValueError, match='port=None'):
+        asyncio.run(eel.start(mode=None, port=None))
+    with pytest.raises(ValueError, match='mode'):
+        asyncio.run(eel.start(mode='chrome', port=None, unix_socket=str(tmp_path / 'eel.sock')))
+    with pytest.raises(ValueError, match='mode'):
+        asyncio.run(eel.start(mode='electron', port=None, unix_socket=str(tmp_path / 'eel.sock')))
+
+
+def test_websockets_failing_to_open_leave_nothing_behind(tmp_path, monkeypatch):
+    """A request that never became a connection leaves nothing behind, and later pages connect as usual."""
+    eel = _eel(tmp_path)
+
+    async def broken_session(request, ws, page):
+        raise RuntimeError('session store down')
+
+    async def main():
+        await eel.start(mode=None, port=0, heartbeat=None)
+        url = 'http://127.0.0.1:%d' % eel._start_args['port']
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url + '/eel') as response:
+                    plain_status = response.status      # Not a websocket handshake
+                with monkeypatch.context() as patch:
+                    patch.setattr(eel, '_open_session', broken_session)
+                    async with session.ws_connect(url + '/eel?page=index.html') as ws:
+                        await ws.receive()
+                assert len(eel._connections) == 0
+                page = HeadlessPage(url, session=session)
+                await page.connect()
+                value = await page.call('echo', 'still up')
+                await page.close()
+        finally:
+            await eel.shutdown()
+        return plain_status, value
+
+    plain_status, value = asyncio.run(main())
+    assert plain_status == 400 and value == 'still up'
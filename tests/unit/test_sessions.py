@@ -0,0 +1,119 @@
+import asyncio
+
+import aiohttp
+
+from async_eel.async_eel import AsyncEel
+from async_eel.headless import HeadlessPage
+from async_eel.sessions import Session
+
+
+class _StubWebsocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_str(self, text):
+        self.sent.append(text)
+
+
+def test_session_resends_unacknowledged_messages_on_resume():
+    """Messages the page did not receive are sent again, in order, on the new websocket."""
+    async def run():
+        first, second = _StubWebsocket(), _StubWebsocket()
+        session = Session('guid', 'main.html', first, max_buffer=3)
+        for text in ('a', 'b', 'c'):
+            await session.send_str(text)
+        session.ack(1)
+        session.detach()
+        await session.send_str('d')          # Buffered while disconnected
+        assert await session.attach(second, 2)
+        return first, second, session
+
+    first, second, session = asyncio.run(run())
+    assert first.sent == ['a', 'b', 'c']
+    assert second.sent == ['c', 'd']
+    assert session.connected and session.unacked == 2
+
+
+def test_session_cannot_resume_past_a_gap():
+    """Once unacknowledged messages overflowed the buffer, resuming from before them is refused."""
+    async def run():
+        session = Session('guid', 'main.html', None, max_buffer=2)
+        for text in ('a', 'b', 'c'):
+            await session.send_str(text)
+        return session
+
+    session = asyncio.run(run())
+    assert not session.can_resume(0)
+    assert session.can_resume(1) and session.can_resume(3)
+    assert not session.can_resume(4)
+
+
+def test_session_buffer_is_bounded_in_characters():
+    """Unacknowledged messages past max_buffer_chars are dropped however few they are."""
+    async def run():
+        session = Session('guid', 'main.html', None, max_buffer_chars=250)
+        for text in ('a' * 100, 'b' * 100, 'c' * 100):
+            await session.send_str(text)
+        return session
+
+    session = asyncio.run(run())
+    assert session.unacked == 2 and session.unacked_chars == 200
+    assert not session.can_resume(0)
+    assert session.can_resume(1)
+
+def test_window_waits_for_acknowledgements():
+    """Bulk senders wait while too much is unacknowledged, until the page acknowledges or is gone."""
+    async def run():
+        session = Session('guid', 'main.html', _StubWebsocket())
+        for text in ('a' * 100, 'b' * 100, 'c' * 100):
+            await session.send_str(text)
+        assert session.unacked_chars == 300
+        await asyncio.wait_for(session.wait_window(300), 1)     # Within the window
+
+        waiting = asyncio.ensure_future(session.wait_window(150))
+        await asyncio.sleep(0)
+        session.ack(1)
+        await asyncio.sleep(0)
+        assert not waiting.done() and session.unacked_chars == 200
+        session.ack(2)
+        await asyncio.wait_for(waiting, 1)
+
+        waiting = asyncio.ensure_future(session.wait_window(0))
+        await asyncio.sleep(0)
+        session.detach()        # Buffered from now on, so no reason to wait
+        await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(run())
+
+
+def test_closed_pages_end_their_session_at_once(tmp_path):
+    """A dropped websocket keeps its session for resume; a page closing with 'going away' ends it."""
+    eel = AsyncEel(shared_functions=False)
+    eel.init(str(tmp_path))
+
+    async def wait_until(condition):
+        for _ in range(100):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await eel.start(mode=None, port=0, heartbeat=None, resume_window=30)
+        url = 'http://127.0.0.1:%d' % eel._start_args['port']
+        try:
+            async with aiohttp.ClientSession() as session:
+                dropped = HeadlessPage(url, session=session, session_id='dropped')
+                closed = HeadlessPage(url, session=session, session_id='closed')
+                await dropped.connect()
+                await closed.connect()
+                await dropped.drop()
+                await closed.close()
+                await wait_until(lambda: eel._connections.by_session('dropped').conn.ws is None)
+                await wait_until(lambda: eel._connections.by_session('closed') is None)
+                return eel._connections.by_session('dropped'), eel._connections.by_session('closed')
+        finally:
+            await eel.shutdown()
+
+    dropped, closed = asyncio.run(main())
+    assert dropped is not None and dropped.conn.expiry is not None
+    assert closed is None
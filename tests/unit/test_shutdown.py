@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from aiohttp import WSCloseCode
+
+from async_eel.async_eel import AsyncEel
+from async_eel.headless import HeadlessCallError, HeadlessPage
+
+
+def _eel(web_dir):
+    eel = AsyncEel(shared_functions=False)
+    eel.init(str(web_dir))
+    return eel
+
+
+async def _serve(eel, **options):
+    await eel.start(mode=None, port=0, heartbeat=None, **options)
+    return 'http://127.0.0.1:%d' % eel._start_args['port']
+
+
+def test_running_calls_finish_and_new_ones_are_busy(tmp_path):
+    """While draining, new calls get 'busy' and a running call still gets its reply."""
+    eel = _eel(tmp_path)
+    started = asyncio.Event()
+
+    @eel.expose
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.1)
+        return 'done'
+
+    eel.expose('quick')(lambda: 'quick')
+
+    async def main():
+        url = await _serve(eel)
+        async with aiohttp.ClientSession() as session:
+            page = HeadlessPage(url, session=session)
+            await page.connect()
+            running = asyncio.ensure_future(page.call('slow'))
+            await started.wait()
+            draining = asyncio.ensure_future(eel.shutdown())
+            await asyncio.sleep(0)
+            with pytest.raises(HeadlessCallError) as busy:
+                await page.call('quick')
+            value = await running
+            await draining
+            await page._reader
+            return busy.value, value, page._ws.close_code
+
+    busy, value, close_code = asyncio.run(main())
+    assert busy.status == 'busy' and busy.error['errorText'] == 'Server shutting down'
+    assert value == 'done'
+    assert close_code == WSCloseCode.GOING_AWAY
+    assert eel.runner is None and len(eel._connections) == 0
+
+
+def test_calls_running_past_the_timeout_are_cancelled(tmp_path):
+    """shutdown(timeout=...) cancels the calls still running when it passes."""
+    eel = _eel(tmp_path)
+    started, cancelled = asyncio.Event(), []
+
+    @eel.expose
+    async def stuck():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        url = await _serve(eel)
+        async with aiohttp.ClientSession() as session:
+            page = HeadlessPage(url, session=session)
+            await page.connect()
+            call = asyncio.ensure_future(page.call('stuck'))
+            await started.wait()
+            began = time.monotonic()
+            await eel.shutdown(timeout=0.1)
+            took = time.monotonic() - began
+            await asyncio.gather(call, return_exceptions=True)
+            return took
+
+    took = asyncio.run(main())
+    assert cancelled == [True]
+    assert 0.1 <= took < 2
+
+
+def test_the_app_closes_shutdown_delay_after_the_last_page(tmp_path):
+    """Once the last page is gone, the app waits shutdown_delay for another before closing."""
+    eel = _eel(tmp_path)
+
+    async def main():
+        url = await _serve(eel, shutdown_delay=0.3)
+        closed = asyncio.ensure_future(eel.wait_closed())
+        async with aiohttp.ClientSession() as session:
+            page = HeadlessPage(url, session=session)
+            await page.connect()
+            await page.close()
+            left = time.monotonic()
+            await asyncio.sleep(0.15)
+            assert not closed.done()
+            await asyncio.wait_for(closed, 2)
+            return time.monotonic() - left
+
+    waited = asyncio.run(main())
+    assert waited >= 0.3
+    assert eel.runner is None
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from async_eel import loops
+from async_eel.async_eel import AsyncEel
+
+
+@pytest.mark.parametrize('options, message', [
+    ({'ws_receive_timeout': 5, 'heartbeat': 5}, 'longer than `heartbeat`'),
+    ({'ws_receive_timeout': 0, 'heartbeat': None}, '`ws_receive_timeout` must be a positive number'),
+    ({'backlog': -1}, '`backlog`'),
+    ({'keepalive_timeout': -1}, '`keepalive_timeout`'),
+    ({'ws_max_msg_size': -1}, '`ws_max_msg_size`'),
+    ({'ws_compress_level': 10}, '`ws_compress_level`'),
+    ({'chunk_size': 0}, '`chunk_size` must be a positive int'),
+    ({'chunk_size': 2 * 1024 * 1024}, '`chunk_size` frames must fit'),
+    ({'lane_weights': {'fast': 2}}, 'fast'),
+    ({'lane_weights': {'bulk': 0}}, '`lane_weights`'),
+    ({'bulk_window': 1024}, '`bulk_window`'),
+    ({'heartbeat': -1}, '`heartbeat`'),
+    ({'resume_buffer': 0}, '`resume_buffer`'),
+    ({'resume_buffer_chars': 1024}, '`resume_buffer_chars`'),
+    ({'max_concurrent_calls': 0}, '`max_concurrent_calls`'),
+    ({'path_prefix': 'app'}, '`path_prefix`'),
+    ({'workers': 0}, '`workers`'),
+])
+def test_invalid_options_are_refused(tmp_path, options, message):
+    """start() checks its options before serving anything."""
+    eel = AsyncEel(shared_functions=False)
+    eel.init(str(tmp_path))
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(eel.start(mode=None, port=0, **options))
+    assert eel.runner is None
+
+
+def test_missing_uvloop_is_a_warning(tmp_path, monkeypatch):
+    """Asking for uvloop without it installed warns and serves on the asyncio loop."""
+    monkeypatch.setattr(loops, 'uvloop_available', lambda: False)
+    eel = AsyncEel(shared_functions=False)
+    eel.init(str(tmp_path))
+
+    async def main():
+        await eel.start(mode=None, port=0, heartbeat=None, uvloop=True)
+        await eel.shutdown()
+
+    with pytest.warns(RuntimeWarning, match='uvloop is not installed'):
+        asyncio.run(main())
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+import aiohttp
+
+from async_eel.async_eel import AsyncEel
+from async_eel.headless import HeadlessPage
+from async_eel.state import SharedState
+
+
+def test_mutations_are_recorded_as_json_patch():
+    """Nested mutations produce JSON-patch ops and bump the version once per batch."""
+    state = SharedState('app', {'items': [], 'a/b': {'x': 1}})
+    state['items'].append({'id': 1})
+    state['items'][0]['id'] = 2
+    state['a/b']['y'] = 3
+    del state['a/b']['x']
+
+    patch = state.take_patch()
+    assert patch == {'state': 'app', 'version': 1, 'patch': [
+        {'op': 'add', 'path': '/items/0', 'value': {'id': 1}},
+        {'op': 'replace', 'path': '/items/0/id', 'value': 2},
+        {'op': 'add', 'path': '/a~1b/y', 'value': 3},
+        {'op': 'remove', 'path': '/a~1b/x'},
+    ]}
+    assert state.take_patch() is None
+
+
+def test_list_children_follow_index_shifts():
+    """Tracked children of a list keep a correct path after inserts/removals."""
+    state = SharedState('app', {'rows': [{'v': 0}, {'v': 1}]})
+    state['rows'].insert(0, {'v': -1})
+    state['rows'][2]['v'] = 10
+    state['rows'].pop(0)
+    state['rows'][1]['v'] = 11
+
+    ops = state.take_patch()['patch']
+    assert [op['path'] for op in ops] == ['/rows/0', '/rows/2/v', '/rows/0', '/rows/1/v']
+    assert state.snapshot() == {'state': 'app', 'version': 1, 'value': {'rows': [{'v': 0}, {'v': 11}]}}
+
+
+def test_values_are_copied_at_mutation_time():
+    """Later mutations of an assigned value do not leak into earlier ops."""
+    state = SharedState('app')
+    state['list'] = [1]
+    state['list'].append(2)
+    ops = state.take_patch()['patch']
+    assert ops[0]['value'] == [1]
+    assert ops[1] == {'op': 'add', 'path': '/list/1', 'value': 2}
+
+
+def test_repeating_a_list_is_recorded():
+    """`lst *= n` is sent as one replace of the list, like the other reordering operations."""
+    state = SharedState('app', {'rows': [{'v': 1}]})
+    rows = state['rows']
+    rows *= 3
+    rows[2]['v'] = 3
+    ops = state.take_patch()['patch']
+    assert ops == [{'op': 'replace', 'path': '/rows', 'value': [{'v': 1}] * 3},
+                   {'op': 'replace', 'path': '/rows/2/v', 'value': 3}]
+    assert state.snapshot()['value'] == {'rows': [{'v': 1}, {'v': 1}, {'v': 3}]}
+
+
+def test_changes_made_off_the_loop_reach_the_pages(tmp_path):
+    """Changes made before start() and from other threads are sent, not dropped."""
+    eel = AsyncEel(shared_functions=False)
+    eel.init(str(tmp_path))
+    state = eel.shared_state('progress', {'done': 0})
+    state['done'] = 1       # No loop yet
+
+    async def main():
+        await eel.start(mode=None, port=0, heartbeat=None)
+        url = 'http://127.0.0.1:%d' % eel._start_args['port']
+        try:
+            async with aiohttp.ClientSession() as session:
+                page = HeadlessPage(url, session=session)
+                received = asyncio.Queue()
+                page.on_message.append(received.put_nowait)
+                await page.connect()
+                snapshot = await asyncio.wait_for(received.get(), 1)
+                thread = threading.Thread(target=state.__setitem__, args=('done', 2))
+                thread.start()
+                thread.join()
+                patch = await asyncio.wait_for(received.get(), 1)
+                state['done'] = 3
+                later = await asyncio.wait_for(received.get(), 1)
+                await page.close()
+        finally:
+            await eel.shutdown()
+        return snapshot, patch, later
+
+    snapshot, patch, later = asyncio.run(main())
+    assert snapshot['value'] == {'done': 1}
+    assert patch['patch'] == [{'op': 'replace', 'path': '/done', 'value': 2}]
+    assert later['version'] == patch['version'] + 1
@@ -0,0 +1,18 @@
+import json
+
+from async_eel.tracing import JsonlSink, Tracer
+
+
+def test_tracer_writes_jsonl_only_while_enabled(tmp_path):
+    """Records reach the sink only between enable() and disable()."""
+    path = tmp_path / 'trace.jsonl'
+    tracer = Tracer()
+    assert not tracer.enabled
+    tracer.enable(JsonlSink(str(path)))
+    tracer.emit('py_call', call=1.5, name='add', duration=0.001)
+    tracer.disable()
+    tracer.emit('py_call', call=2.5, name='add', duration=0.001)
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 1
+    assert records[0]['span'] == 'py_call' and records[0]['call'] == 1.5